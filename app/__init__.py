@@ -2,10 +2,15 @@ from flask import Flask
 from flask_cors import CORS
 from app.config import Config
 from app.extensions import db
+from app.json_provider import OrjsonProvider
+from app.services import metrics
+from app.services.upload_buffer import SpooledUploadRequest
 
 
 def create_app(config_class=Config):
     app = Flask(__name__)
+    app.request_class = SpooledUploadRequest
+    app.json = OrjsonProvider(app)
     app.config.from_object(config_class)
     
     config_class.init_app(app)
@@ -28,8 +33,13 @@ def create_app(config_class=Config):
     
     from app.routes.invoices import invoices_bp
     from app.routes.files import files_bp
+    from app.routes.jobs import jobs_bp
+    from app.routes.reports import reports_bp
     app.register_blueprint(invoices_bp, url_prefix='/api')
     app.register_blueprint(files_bp, url_prefix='/api')
+    app.register_blueprint(jobs_bp, url_prefix='/api')
+    app.register_blueprint(reports_bp, url_prefix='/api')
+    metrics.init_app(app)
     
     with app.app_context():
         db.create_all()
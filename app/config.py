@@ -8,6 +8,11 @@ if env_path.exists():
 else:
     load_dotenv()
 
+
+def _replica_binds(urls, engine_options):
+    return {f'replica_{index}': {'url': url, **engine_options} for index, url in enumerate(urls)}
+
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') 
 
@@ -19,16 +24,50 @@ class Config:
         )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = os.environ.get('SQLALCHEMY_ECHO', 'False').lower() == 'true'
+    # Requests one process serves at once (gunicorn threads); connection
+    # pools default to at least this size so threads do not queue for them.
+    REQUEST_THREADS = int(os.environ.get('GUNICORN_THREADS', '1'))
+    # Processes sharing this host's connection budget (gunicorn workers).
+    REQUEST_WORKERS = int(os.environ.get('GUNICORN_WORKERS', '1'))
+    
+    # With DB_MAX_CONNECTIONS set, each worker's pool gets an equal share of
+    # it and no overflow, so the host never opens more than that many
+    # connections to any one database, however many workers it runs.
+    DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', '0'))
+    if DB_MAX_CONNECTIONS:
+        DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', str(max(1, DB_MAX_CONNECTIONS // REQUEST_WORKERS))))
+        DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', '0'))
+    else:
+        DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', str(max(10, REQUEST_THREADS))))
+        DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', '20'))
+    
     SQLALCHEMY_ENGINE_OPTIONS = {
         'pool_pre_ping': True,
         'pool_recycle': 300,
-        'pool_size': 10,
-        'max_overflow': 20
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', '30'))
     }
     
+    # Read replicas for read-only routes, comma-separated. Each becomes a bind
+    # with the same pool settings as the primary.
+    DATABASE_REPLICA_URLS = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    SQLALCHEMY_BINDS = _replica_binds(DATABASE_REPLICA_URLS, SQLALCHEMY_ENGINE_OPTIONS)
+    SQLALCHEMY_REPLICA_BINDS = list(SQLALCHEMY_BINDS)
+    
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or 'uploads'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024
     ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'webp', 'txt'}
+    UPLOAD_SPOOL_MAX_SIZE = int(os.environ.get('UPLOAD_SPOOL_MAX_SIZE', str(1024 * 1024)))
+    
+    INVOICES_PAGE_SIZE = int(os.environ.get('INVOICES_PAGE_SIZE', '50'))
+    INVOICES_MAX_PAGE_SIZE = int(os.environ.get('INVOICES_MAX_PAGE_SIZE', '200'))
+    REPORTS_MAX_ROWS = int(os.environ.get('REPORTS_MAX_ROWS', '1000'))
+    SEARCH_MAX_CANDIDATES = int(os.environ.get('SEARCH_MAX_CANDIDATES', '2000'))
+    INVOICE_LIST_ITEMS_LOADING = os.environ.get('INVOICE_LIST_ITEMS_LOADING', 'selectin')
+    INVOICE_DETAIL_ITEMS_LOADING = os.environ.get('INVOICE_DETAIL_ITEMS_LOADING', 'joined')
+    INVOICE_SERIALIZATION = os.environ.get('INVOICE_SERIALIZATION', 'rows')
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
     
     R2_ACCOUNT_ID = os.environ.get('R2_ACCOUNT_ID', '')
     R2_ACCESS_KEY_ID = os.environ.get('R2_ACCESS_KEY_ID', '')
@@ -36,6 +75,20 @@ class Config:
     R2_BUCKET_NAME = os.environ.get('R2_BUCKET_NAME', '')
     R2_PUBLIC_URL = os.environ.get('R2_PUBLIC_URL', '')
     R2_PRESIGNED_URL_EXPIRATION = int(os.environ.get('R2_PRESIGNED_URL_EXPIRATION', '3600'))
+    R2_DOWNLOAD_REDIRECT = os.environ.get('R2_DOWNLOAD_REDIRECT', 'False').lower() == 'true'
+    R2_DOWNLOAD_CHUNK_SIZE = int(os.environ.get('R2_DOWNLOAD_CHUNK_SIZE', str(64 * 1024)))
+    R2_UPLOAD_CONCURRENT = os.environ.get('R2_UPLOAD_CONCURRENT', 'True').lower() == 'true'
+    R2_ENDPOINT_URL = os.environ.get('R2_ENDPOINT_URL', '')
+    R2_MAX_POOL_CONNECTIONS = int(os.environ.get('R2_MAX_POOL_CONNECTIONS', str(max(32, 2 * REQUEST_THREADS))))
+    R2_CONNECT_TIMEOUT = float(os.environ.get('R2_CONNECT_TIMEOUT', '5'))
+    R2_READ_TIMEOUT = float(os.environ.get('R2_READ_TIMEOUT', '60'))
+    R2_MAX_ATTEMPTS = int(os.environ.get('R2_MAX_ATTEMPTS', '5'))
+    R2_RETRY_MODE = os.environ.get('R2_RETRY_MODE', 'standard')
+    R2_MULTIPART_THRESHOLD = int(os.environ.get('R2_MULTIPART_THRESHOLD', str(8 * 1024 * 1024)))
+    R2_MULTIPART_CHUNKSIZE = int(os.environ.get('R2_MULTIPART_CHUNKSIZE', str(8 * 1024 * 1024)))
+    R2_TRANSFER_CONCURRENCY = int(os.environ.get('R2_TRANSFER_CONCURRENCY', '8'))
+    DIRECT_UPLOAD_EXPIRATION = int(os.environ.get('DIRECT_UPLOAD_EXPIRATION', '900'))
+    DIRECT_UPLOAD_MAX_SIZE = int(os.environ.get('DIRECT_UPLOAD_MAX_SIZE', str(16 * 1024 * 1024)))
     
     _explicit_r2_setting = os.environ.get('USE_R2_STORAGE', '').lower()
     if _explicit_r2_setting == 'false':
@@ -52,6 +105,60 @@ class Config:
     
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
     OPENAI_MODEL = os.environ.get('OPENAI_MODEL') or 'gpt-4o-mini'
+    OPENAI_CONNECT_TIMEOUT = float(os.environ.get('OPENAI_CONNECT_TIMEOUT', '5'))
+    OPENAI_READ_TIMEOUT = float(os.environ.get('OPENAI_READ_TIMEOUT', '120'))
+    OPENAI_MAX_CONCURRENCY = int(os.environ.get('OPENAI_MAX_CONCURRENCY', str(max(8, REQUEST_THREADS))))
+    OPENAI_MAX_RETRIES = int(os.environ.get('OPENAI_MAX_RETRIES', '5'))
+    OPENAI_BACKOFF_BASE = float(os.environ.get('OPENAI_BACKOFF_BASE', '1.0'))
+    OPENAI_BACKOFF_MAX = float(os.environ.get('OPENAI_BACKOFF_MAX', '60'))
+    OPENAI_RATE_LIMIT_RPM = int(os.environ.get('OPENAI_RATE_LIMIT_RPM', '0'))
+    OPENAI_RATE_LIMIT_TPM = int(os.environ.get('OPENAI_RATE_LIMIT_TPM', '0'))
+    OPENAI_RATE_LIMIT_FILE = os.environ.get('OPENAI_RATE_LIMIT_FILE', '')
+    
+    EXTRACTION_BACKEND = os.environ.get('EXTRACTION_BACKEND', 'openai')
+    EXTRACTION_FALLBACK_BACKEND = os.environ.get('EXTRACTION_FALLBACK_BACKEND', 'openai')
+    EXTRACTION_ALLOWED_BACKENDS = os.environ.get('EXTRACTION_ALLOWED_BACKENDS', 'openai,local')
+    FAKE_EXTRACTION_LATENCY = os.environ.get('FAKE_EXTRACTION_LATENCY', 'lognormal')
+    FAKE_EXTRACTION_LATENCY_MS = float(os.environ.get('FAKE_EXTRACTION_LATENCY_MS', '800'))
+    FAKE_EXTRACTION_LATENCY_STDDEV_MS = float(os.environ.get('FAKE_EXTRACTION_LATENCY_STDDEV_MS', '300'))
+    FAKE_EXTRACTION_FAILURE_RATE = float(os.environ.get('FAKE_EXTRACTION_FAILURE_RATE', '0'))
+    FAKE_EXTRACTION_SEED = os.environ.get('FAKE_EXTRACTION_SEED')
+    
+    PDF_MAX_PAGES = int(os.environ.get('PDF_MAX_PAGES', '20'))
+    PDF_MAX_CHARS = int(os.environ.get('PDF_MAX_CHARS', '20000'))
+    PDF_MIN_PAGE_CHARS = int(os.environ.get('PDF_MIN_PAGE_CHARS', '20'))
+    PDF_MAX_RASTER_PAGES = int(os.environ.get('PDF_MAX_RASTER_PAGES', '5'))
+    PDF_RASTER_DPI = int(os.environ.get('PDF_RASTER_DPI', '150'))
+    PDF_SPLIT_PAGES = os.environ.get('PDF_SPLIT_PAGES', 'True').lower() == 'true'
+    PDF_PAGE_CONCURRENCY = int(os.environ.get('PDF_PAGE_CONCURRENCY', '8'))
+    
+    IMAGE_PREPROCESS_ENABLED = os.environ.get('IMAGE_PREPROCESS_ENABLED', 'True').lower() == 'true'
+    IMAGE_MAX_EDGE = int(os.environ.get('IMAGE_MAX_EDGE', '2048'))
+    IMAGE_GRAYSCALE = os.environ.get('IMAGE_GRAYSCALE', 'True').lower() == 'true'
+    IMAGE_JPEG_QUALITY = int(os.environ.get('IMAGE_JPEG_QUALITY', '80'))
+    OPENAI_IMAGE_DETAIL = os.environ.get('OPENAI_IMAGE_DETAIL', 'auto')
+    
+    ASYNC_EXTRACTION = os.environ.get('ASYNC_EXTRACTION', 'False').lower() == 'true'
+    EXTRACTION_WORKER_CONCURRENCY = int(os.environ.get('EXTRACTION_WORKER_CONCURRENCY', '4'))
+    EXTRACTION_WORKER_POLL_INTERVAL = float(os.environ.get('EXTRACTION_WORKER_POLL_INTERVAL', '1.0'))
+    EXTRACTION_JOB_TIMEOUT = int(os.environ.get('EXTRACTION_JOB_TIMEOUT', '300'))
+    EXTRACTION_JOB_MAX_ATTEMPTS = int(os.environ.get('EXTRACTION_JOB_MAX_ATTEMPTS', '3'))
+    
+    EXTRACTION_CACHE_ENABLED = os.environ.get('EXTRACTION_CACHE_ENABLED', 'True').lower() == 'true'
+    EXTRACTION_CACHE_TTL = int(os.environ.get('EXTRACTION_CACHE_TTL', str(30 * 24 * 3600)))
+    EXTRACTION_CACHE_MAX_ENTRIES = int(os.environ.get('EXTRACTION_CACHE_MAX_ENTRIES', '10000'))
+    EXTRACTION_CACHE_EVICT_INTERVAL = int(os.environ.get('EXTRACTION_CACHE_EVICT_INTERVAL', '300'))
+    
+    RESPONSE_CACHE_URL = os.environ.get('RESPONSE_CACHE_URL', '')
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', '30'))
+    RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+    
+    BATCH_MAX_CONCURRENCY = int(os.environ.get('BATCH_MAX_CONCURRENCY', '8'))
+    BATCH_FILE_TIMEOUT = int(os.environ.get('BATCH_FILE_TIMEOUT', '120'))
+    BATCH_MAX_FILES = int(os.environ.get('BATCH_MAX_FILES', '500'))
+    BATCH_MAX_CONTENT_LENGTH = int(os.environ.get('BATCH_MAX_CONTENT_LENGTH', str(512 * 1024 * 1024)))
+    
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
     
     @staticmethod
     def init_app(app):
@@ -0,0 +1,53 @@
+import random
+import time
+from functools import wraps
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy.pool import QueuePool
+
+
+class RoutingSession(Session):
+    # Sends statements to the replica picked for the request by use_replica.
+    # Flushes and explicit INSERT/UPDATE/DELETE always go to the primary.
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context():
+            replica = g.get('db_replica')
+            if replica is not None and not getattr(clause, 'is_dml', False):
+                return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def use_replica(view):
+    # For read-only views that can tolerate replication lag. Without
+    # DATABASE_REPLICA_URLS this is a no-op and the primary serves the read.
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        replicas = current_app.config.get('SQLALCHEMY_REPLICA_BINDS') or []
+        if replicas:
+            g.db_replica = random.choice(replicas)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+class TimedQueuePool(QueuePool):
+    # QueuePool that reports how long each checkout waited for a connection,
+    # including opening a new one. app.services.metrics sets on_wait and
+    # bind_name.
+    on_wait = None
+    bind_name = 'primary'
+
+    def _do_get(self):
+        started = time.perf_counter()
+        failed = True
+        try:
+            connection = super()._do_get()
+            failed = False
+            return connection
+        finally:
+            if TimedQueuePool.on_wait is not None:
+                TimedQueuePool.on_wait(self.bind_name, time.perf_counter() - started, failed)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.bind_name = self.bind_name
+        return pool
@@ -1,4 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
+from app.database import RoutingSession, TimedQueuePool
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession}, engine_options={'poolclass': TimedQueuePool})
 
@@ -1,6 +1,12 @@
 from app.models.sales_order import SalesOrderHeader, SalesOrderDetail
-
-__all__ = ['SalesOrderHeader', 'SalesOrderDetail']
+from app.models.extraction_job import ExtractionJob
+from app.models.extraction_cache import ExtractionCacheEntry
+from app.models.invoice_rollup import InvoiceDailyRollup, CustomerRollup, ProductRollup
+from app.models.invoice_search import InvoiceSearchDocument, InvoiceSearchTerm
+
+__all__ = ['SalesOrderHeader', 'SalesOrderDetail', 'ExtractionJob', 'ExtractionCacheEntry',
+           'InvoiceDailyRollup', 'CustomerRollup', 'ProductRollup', 'InvoiceSearchDocument',
+           'InvoiceSearchTerm']
 
 
 
@@ -0,0 +1,24 @@
+import json
+from datetime import datetime, timezone
+from app.extensions import db
+from sqlalchemy import Column, Integer, String, DateTime, Text
+
+
+class ExtractionCacheEntry(db.Model):
+    __tablename__ = 'ExtractionCache'
+
+    CacheKey = Column(String(64), primary_key=True)
+    FileHash = Column(String(64), nullable=False)
+    Model = Column(String(100), nullable=False)
+    PromptVersion = Column(String(20), nullable=False)
+    Result = Column(Text, nullable=False)
+    HitCount = Column(Integer, default=0, nullable=False)
+    CreatedAt = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False, index=True)
+    LastAccessedAt = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False, index=True)
+
+    @property
+    def result_data(self):
+        return json.loads(self.Result)
+
+    def __repr__(self):
+        return f'<ExtractionCacheEntry {self.CacheKey[:12]} {self.Model}>'
@@ -0,0 +1,70 @@
+import json
+import uuid
+from datetime import datetime, timezone
+from app.extensions import db
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Index
+
+
+class ExtractionJob(db.Model):
+    __tablename__ = 'ExtractionJob'
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+
+    JobID = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    Status = Column(String(20), default=STATUS_QUEUED, nullable=False)
+    FileName = Column(String(255), nullable=False)
+    FileType = Column(String(10), nullable=False)
+    DocumentPath = Column(String(500), nullable=False)
+    DocumentUrl = Column(String(1000), nullable=True)
+    SalesOrderID = Column(Integer, ForeignKey('SalesOrderHeader.SalesOrderID', ondelete='SET NULL'), nullable=True)
+    Result = Column(Text, nullable=True)
+    Error = Column(Text, nullable=True)
+    Attempts = Column(Integer, default=0, nullable=False)
+    BypassCache = Column(Boolean, default=False, nullable=False)
+    Backend = Column(String(20), nullable=True)
+    TruncatedPages = Column(Integer, default=0, nullable=False)
+    CreatedAt = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    StartedAt = Column(DateTime, nullable=True)
+    CompletedAt = Column(DateTime, nullable=True)
+    UpdatedAt = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), nullable=False)
+
+    __table_args__ = (
+        Index('ix_extraction_job_status_created', 'Status', 'CreatedAt'),
+    )
+
+    @property
+    def result_invoices(self):
+        # Older rows hold a single invoice object, newer ones a list.
+        data = json.loads(self.Result) if self.Result else None
+        if data is None:
+            return []
+        return data if isinstance(data, list) else [data]
+
+    @property
+    def result_data(self):
+        invoices = self.result_invoices
+        return invoices[0] if invoices else None
+
+    def to_dict(self):
+        return {
+            'jobId': self.JobID,
+            'status': self.Status,
+            'fileName': self.FileName,
+            'fileType': self.FileType,
+            'documentPath': self.DocumentPath,
+            'documentUrl': self.DocumentUrl,
+            'salesOrderId': self.SalesOrderID,
+            'error': self.Error,
+            'attempts': self.Attempts,
+            'backend': self.Backend,
+            'truncatedPages': self.TruncatedPages,
+            'createdAt': self.CreatedAt.isoformat() if self.CreatedAt else None,
+            'startedAt': self.StartedAt.isoformat() if self.StartedAt else None,
+            'completedAt': self.CompletedAt.isoformat() if self.CompletedAt else None
+        }
+
+    def __repr__(self):
+        return f'<ExtractionJob {self.JobID} {self.Status}>'
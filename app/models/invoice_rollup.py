@@ -0,0 +1,42 @@
+from app.extensions import db
+from sqlalchemy import Column, Integer, String, Numeric, Date
+
+
+class InvoiceDailyRollup(db.Model):
+    __tablename__ = 'InvoiceDailyRollup'
+
+    Day = Column(Date, primary_key=True)
+    Status = Column(String(50), primary_key=True)
+    InvoiceCount = Column(Integer, default=0, nullable=False)
+    SubTotal = Column(Numeric(16, 2), default=0, nullable=False)
+    TaxAmount = Column(Numeric(16, 2), default=0, nullable=False)
+    TotalAmount = Column(Numeric(16, 2), default=0, nullable=False)
+    ItemQuantity = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f'<InvoiceDailyRollup {self.Day} {self.Status}>'
+
+
+class CustomerRollup(db.Model):
+    __tablename__ = 'CustomerRollup'
+
+    CustomerName = Column(String(255), primary_key=True)
+    InvoiceCount = Column(Integer, default=0, nullable=False)
+    SubTotal = Column(Numeric(16, 2), default=0, nullable=False)
+    TaxAmount = Column(Numeric(16, 2), default=0, nullable=False)
+    TotalAmount = Column(Numeric(16, 2), default=0, nullable=False)
+
+    def __repr__(self):
+        return f'<CustomerRollup {self.CustomerName}>'
+
+
+class ProductRollup(db.Model):
+    __tablename__ = 'ProductRollup'
+
+    ProductName = Column(String(255), primary_key=True)
+    LineCount = Column(Integer, default=0, nullable=False)
+    Quantity = Column(Integer, default=0, nullable=False)
+    Revenue = Column(Numeric(16, 2), default=0, nullable=False)
+
+    def __repr__(self):
+        return f'<ProductRollup {self.ProductName}>'
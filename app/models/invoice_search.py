@@ -0,0 +1,50 @@
+from app.extensions import db
+from sqlalchemy import Column, Integer, String, Float, Text, Index, DDL, event
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+
+class InvoiceSearchDocument(db.Model):
+    # Postgres search index: one weighted tsvector per invoice for full-text
+    # matches and the flattened text for trigram (fuzzy) matches.
+    __tablename__ = 'InvoiceSearchDocument'
+
+    SalesOrderID = Column(Integer, primary_key=True, autoincrement=False)
+    Document = Column(Text, nullable=False)
+    SearchVector = Column(TSVECTOR().with_variant(Text(), 'sqlite'), nullable=True)
+
+    __table_args__ = (
+        Index('ix_invoice_search_vector', 'SearchVector', postgresql_using='gin').ddl_if(dialect='postgresql'),
+        Index(
+            'ix_invoice_search_trigram',
+            'Document',
+            postgresql_using='gin',
+            postgresql_ops={'Document': 'gin_trgm_ops'}
+        ).ddl_if(dialect='postgresql'),
+    )
+
+    def __repr__(self):
+        return f'<InvoiceSearchDocument {self.SalesOrderID}>'
+
+
+class InvoiceSearchTerm(db.Model):
+    # Inverted index for SQLite, where neither tsvector nor pg_trgm exist:
+    # one row per distinct term per invoice, weighted by the field it came from.
+    __tablename__ = 'InvoiceSearchTerm'
+
+    Term = Column(String(100), primary_key=True)
+    SalesOrderID = Column(Integer, primary_key=True, autoincrement=False)
+    Weight = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index('ix_invoice_search_term_order', 'SalesOrderID'),
+    )
+
+    def __repr__(self):
+        return f'<InvoiceSearchTerm {self.Term} {self.SalesOrderID}>'
+
+
+event.listen(
+    InvoiceSearchDocument.__table__,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
@@ -1,21 +1,21 @@
 from datetime import datetime, timezone
 from app.extensions import db
 from sqlalchemy.orm import relationship
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Numeric, Date, DateTime, ForeignKey, Text, Index, func
 
 
 class SalesOrderHeader(db.Model):
     __tablename__ = 'SalesOrderHeader'
     
     SalesOrderID = Column(Integer, primary_key=True, autoincrement=True)
-    OrderDate = Column(String(50), nullable=False)
-    DueDate = Column(String(50), nullable=True)
+    OrderDate = Column(Date, nullable=False)
+    DueDate = Column(Date, nullable=True)
     CustomerName = Column(String(255), nullable=False)
     CustomerAddress = Column(Text, nullable=True)
     InvoiceNumber = Column(String(100), unique=True, nullable=True)
-    SubTotal = Column(Float, default=0.0, nullable=False)
-    TaxAmount = Column(Float, default=0.0, nullable=False)
-    TotalAmount = Column(Float, default=0.0, nullable=False)
+    SubTotal = Column(Numeric(14, 2), default=0, nullable=False)
+    TaxAmount = Column(Numeric(14, 2), default=0, nullable=False)
+    TotalAmount = Column(Numeric(14, 2), default=0, nullable=False)
     Status = Column(String(50), default='Pending', nullable=False)
     CreatedAt = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
     UpdatedAt = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), nullable=False)
@@ -23,11 +23,32 @@ class SalesOrderHeader(db.Model):
     
     items = relationship('SalesOrderDetail', back_populates='header', cascade='all, delete-orphan')
     
-    def to_dict(self):
-        return {
+    __table_args__ = (
+        Index('ix_sales_order_header_created_id', 'CreatedAt', 'SalesOrderID'),
+        Index('ix_sales_order_header_status_created', 'Status', 'CreatedAt', 'SalesOrderID'),
+        Index('ix_sales_order_header_order_date', 'OrderDate'),
+        # Status and date-range filters together, as the list and export
+        # endpoints apply them.
+        Index('ix_sales_order_header_status_order_date', 'Status', 'OrderDate'),
+        # Deleting an invoice checks whether others share its document.
+        Index('ix_sales_order_header_document_path', 'DocumentPath'),
+        Index(
+            'ix_sales_order_header_customer_lower',
+            func.lower(CustomerName).label('customer_name_lower'),
+            postgresql_ops={'customer_name_lower': 'text_pattern_ops'}
+        ),
+        Index(
+            'ix_sales_order_header_invoice_number_pattern',
+            'InvoiceNumber',
+            postgresql_ops={'InvoiceNumber': 'varchar_pattern_ops'}
+        ),
+    )
+    
+    def to_dict(self, include_items=True, fields=None):
+        data = {
             'SalesOrderID': self.SalesOrderID,
-            'OrderDate': self.OrderDate,
-            'DueDate': self.DueDate,
+            'OrderDate': self.OrderDate.isoformat() if self.OrderDate else None,
+            'DueDate': self.DueDate.isoformat() if self.DueDate else None,
             'CustomerName': self.CustomerName,
             'CustomerAddress': self.CustomerAddress,
             'InvoiceNumber': self.InvoiceNumber,
@@ -37,9 +58,13 @@ class SalesOrderHeader(db.Model):
             'Status': self.Status,
             'CreatedAt': self.CreatedAt.isoformat() if self.CreatedAt else None,
             'UpdatedAt': self.UpdatedAt.isoformat() if self.UpdatedAt else None,
-            'DocumentPath': self.DocumentPath,
-            'items': [item.to_dict() for item in self.items]
+            'DocumentPath': self.DocumentPath
         }
+        if fields:
+            data = {field: data[field] for field in fields}
+        if include_items:
+            data['items'] = [item.to_dict() for item in self.items]
+        return data
     
     def __repr__(self):
         return f'<SalesOrderHeader {self.InvoiceNumber or self.SalesOrderID}>'
@@ -53,11 +78,17 @@ class SalesOrderDetail(db.Model):
     ProductName = Column(String(255), nullable=False)
     ProductDescription = Column(Text, nullable=True)
     Quantity = Column(Integer, default=1, nullable=False)
-    UnitPrice = Column(Float, nullable=False)
-    LineTotal = Column(Float, nullable=False)
+    UnitPrice = Column(Numeric(14, 4), nullable=False)
+    LineTotal = Column(Numeric(14, 2), nullable=False)
     
     header = relationship('SalesOrderHeader', back_populates='items')
     
+    __table_args__ = (
+        # Serves fetch_items and the export join in their (invoice, line) order,
+        # and every other lookup of an invoice's items.
+        Index('ix_sales_order_detail_order_line', 'SalesOrderID', 'SalesOrderDetailID'),
+    )
+    
     def to_dict(self):
         return {
             'SalesOrderDetailID': self.SalesOrderDetailID,
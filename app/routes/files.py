@@ -1,13 +1,15 @@
-from flask import Blueprint, send_file, current_app, jsonify
+from flask import Blueprint, Response, send_file, current_app, jsonify, redirect, request
+from werkzeug.http import http_date
+from app.database import use_replica
 from app.models.sales_order import SalesOrderHeader
 from app.services.r2_storage import get_r2_storage
 import os
-import tempfile
 
 files_bp = Blueprint('files', __name__)
 
 
 @files_bp.route('/files/<int:sales_order_id>', methods=['GET'])
+@use_replica
 def download_file(sales_order_id):
     try:
         invoice = SalesOrderHeader.query.get_or_404(sales_order_id)
@@ -19,22 +21,20 @@ def download_file(sales_order_id):
         
         if use_r2:
             r2_storage = get_r2_storage()
-            file_content = r2_storage.download_file(invoice.DocumentPath)
+            filename = os.path.basename(invoice.DocumentPath)
             
-            temp_file = tempfile.NamedTemporaryFile(delete=False)
-            temp_file.write(file_content)
-            temp_file.close()
+            redirect_param = request.args.get('redirect')
+            if redirect_param is None:
+                use_redirect = current_app.config.get('R2_DOWNLOAD_REDIRECT', False)
+            else:
+                use_redirect = redirect_param.lower() in ('1', 'true', 'yes', 'on')
             
-            filename = os.path.basename(invoice.DocumentPath)
-            if filename.startswith('invoices/'):
-                filename = filename.replace('invoices/', '')
+            if use_redirect:
+                expiration = int(current_app.config.get('R2_PRESIGNED_URL_EXPIRATION', 3600))
+                url = r2_storage.get_presigned_url(invoice.DocumentPath, expiration=expiration, download_name=filename)
+                return redirect(url, code=302)
             
-            return send_file(
-                temp_file.name,
-                as_attachment=True,
-                download_name=filename,
-                mimetype='application/octet-stream'
-            )
+            return _stream_r2_object(r2_storage, invoice.DocumentPath, filename)
         else:
             upload_folder = current_app.config['UPLOAD_FOLDER']
             file_path = os.path.join(upload_folder, invoice.DocumentPath)
@@ -49,6 +49,7 @@ def download_file(sales_order_id):
 
 
 @files_bp.route('/files/<int:sales_order_id>/url', methods=['GET'])
+@use_replica
 def get_file_url(sales_order_id):
     try:
         invoice = SalesOrderHeader.query.get_or_404(sales_order_id)
@@ -73,3 +74,47 @@ def get_file_url(sales_order_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+
+def _stream_r2_object(r2_storage, object_key: str, filename: str):
+    obj = r2_storage.get_object_stream(
+        object_key,
+        byte_range=request.headers.get('Range'),
+        if_none_match=request.headers.get('If-None-Match'),
+        if_modified_since=request.if_modified_since
+    )
+    status = obj['StatusCode']
+    
+    if status == 404:
+        return jsonify({'error': 'File not found'}), 404
+    if status == 416:
+        return jsonify({'error': 'Requested range not satisfiable'}), 416
+    if status in (304, 412):
+        response = Response(status=304)
+        if request.headers.get('If-None-Match'):
+            response.headers['ETag'] = request.headers['If-None-Match']
+        return response
+    
+    body = obj['Body']
+    chunk_size = current_app.config.get('R2_DOWNLOAD_CHUNK_SIZE', 64 * 1024)
+    
+    def generate():
+        try:
+            for chunk in body.iter_chunks(chunk_size=chunk_size):
+                yield chunk
+        finally:
+            body.close()
+    
+    response = Response(generate(), status=status, mimetype='application/octet-stream', direct_passthrough=True)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Accept-Ranges'] = 'bytes'
+    if obj.get('ContentLength') is not None:
+        response.headers['Content-Length'] = str(obj['ContentLength'])
+    if obj.get('ContentRange'):
+        response.headers['Content-Range'] = obj['ContentRange']
+    if obj.get('ETag'):
+        response.headers['ETag'] = obj['ETag']
+    if obj.get('LastModified'):
+        response.headers['Last-Modified'] = http_date(obj['LastModified'])
+    response.call_on_close(body.close)
+    return response
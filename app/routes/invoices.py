@@ -1,121 +1,698 @@
 import os
+import re
+import time
 import uuid
-from datetime import datetime
-from flask import Blueprint, request, jsonify, current_app
+import shutil
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timezone
+from flask import Blueprint, Response, request, jsonify, current_app, url_for, stream_with_context
 from werkzeug.utils import secure_filename
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import load_only
+from app.database import use_replica
 from app.extensions import db
+from app.models.extraction_job import ExtractionJob
 from app.models.sales_order import SalesOrderHeader, SalesOrderDetail
 from app.services.document_extractor import DocumentExtractor
+from app.services.extraction_backends import resolve_backend_name
+from app.services.extraction_cache import get_extraction_cache
+from app.services.invoice_export import EXPORT_FORMATS, export_invoices
+from app.services.invoice_query import (
+    apply_invoice_filters, apply_keyset, encode_cursor, items_loader, parse_fields, parse_limit, parse_offset
+)
+from app.services.invoice_normalizer import UNIT_PRICE_PLACES, normalize_amount, normalize_date, normalize_quantity
+from app.services.invoice_rollups import rollup_snapshot, update_rollups
+from app.services.invoice_search import refresh_search_index, search_invoices
+from app.services.invoice_store import save_invoices
+from app.services.invoice_serializer import attach_items, header_select, iter_json_array, rows_to_dicts
+from app.services.job_queue import enqueue_extraction_job
 from app.services.r2_storage import get_r2_storage
+from app.services.response_cache import (
+    INVOICE_LIST_NAMESPACE, get_response_cache, invalidate_invoices, invoice_namespace, request_key
+)
+from app.services.timing import StageTimer
+from app.services.upload_buffer import UploadBuffer
 
 invoices_bp = Blueprint('invoices', __name__)
 
+CONTENT_TYPES = {
+    'pdf': 'application/pdf',
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'webp': 'image/webp',
+    'txt': 'text/plain'
+}
+
+# Keys handed out by presign_upload, in the same layout _store_document uses.
+DIRECT_UPLOAD_KEY = re.compile(r'^invoices/[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}_([^/]+\.[A-Za-z0-9]+)$')
+
 
 @invoices_bp.route('/health', methods=['GET'])
 def health():
     return jsonify({'status': 'healthy'}), 200
 
 
+@invoices_bp.route('/extraction-cache/stats', methods=['GET'])
+def extraction_cache_stats():
+    try:
+        return jsonify(get_extraction_cache().stats()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @invoices_bp.route('/upload', methods=['POST'])
 def upload_file():
-    if 'file' not in request.files:
+    timer = StageTimer()
+    with timer.stage('parse'):
+        files = request.files
+    
+    if 'file' not in files:
         return jsonify({'error': 'No file provided'}), 400
     
-    file = request.files['file']
+    file = files['file']
     if file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
     
-    extractor = DocumentExtractor()
+    try:
+        backend = resolve_backend_name(request.args.get('backend', request.form.get('backend')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    extractor = DocumentExtractor(backend)
     
     if not extractor.allowed_file(file.filename):
         return jsonify({'error': 'File type not allowed'}), 400
     
     use_r2 = current_app.config.get('USE_R2_STORAGE', False)
-    temp_file_path = None
+    run_async = _is_truthy(
+        request.args.get('async', request.form.get('async')),
+        default=current_app.config.get('ASYNC_EXTRACTION', False)
+    )
+    bypass_cache = _is_truthy(request.args.get('bypass_cache', request.form.get('bypass_cache')))
     
     try:
         filename = secure_filename(file.filename)
         file_type = filename.rsplit('.', 1)[1].lower()
-        unique_filename = f"{uuid.uuid4()}_{filename}"
+        buffer = UploadBuffer(file.stream)
         
+        r2_storage = None
         if use_r2:
             try:
                 r2_storage = get_r2_storage()
             except ValueError as e:
                 current_app.logger.error(f"R2 storage initialization failed: {str(e)}")
                 return jsonify({'error': f'R2 storage not configured: {str(e)}'}), 500
-            
-            content_type_map = {
-                'pdf': 'application/pdf',
-                'png': 'image/png',
-                'jpg': 'image/jpeg',
-                'jpeg': 'image/jpeg',
-                'webp': 'image/webp',
-                'txt': 'text/plain'
-            }
-            content_type = content_type_map.get(file_type, 'application/octet-stream')
-            
-            object_key = f"invoices/{unique_filename}"
+        else:
+            current_app.logger.warning("Using local file storage - R2 storage is not enabled")
+        
+        if run_async:
             try:
-                r2_url = r2_storage.upload_file(file, object_key, content_type=content_type)
+                with timer.stage('store'):
+                    document_path, document_url = _store_document(buffer, filename, r2_storage)
             except Exception as e:
-                current_app.logger.error(f"Failed to upload file to R2: {str(e)}")
-                return jsonify({'error': f'Failed to upload file to R2: {str(e)}'}), 500
-            
+                current_app.logger.error(f"Failed to store uploaded file: {str(e)}")
+                return jsonify({'error': str(e)}), 500
+            return _enqueue_response(filename, file_type, document_path, document_url, bypass_cache, backend)
+        
+        if r2_storage is not None and current_app.config.get('R2_UPLOAD_CONCURRENT', True):
+            # The R2 put and the model call both only read the buffer, so
+            # they overlap instead of running back to back.
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix='r2-upload') as executor:
+                store_future = executor.submit(_timed_store, timer, buffer, filename, r2_storage)
+                with timer.stage('extract'):
+                    invoices = extractor.extract_invoices(buffer, file_type, bypass_cache=bypass_cache)
+                try:
+                    document_path, document_url = store_future.result()
+                except Exception as e:
+                    current_app.logger.error(f"Failed to store uploaded file: {str(e)}")
+                    return jsonify({'error': str(e)}), 500
+        else:
             try:
-                temp_file_path = r2_storage.download_to_temp_file(object_key)
-                file_path = temp_file_path
+                document_path, document_url = _timed_store(timer, buffer, filename, r2_storage)
             except Exception as e:
-                current_app.logger.error(f"Failed to download file from R2 for processing: {str(e)}")
-                return jsonify({'error': f'Failed to process file: {str(e)}'}), 500
-            
-            document_path = object_key
-        else:
-            current_app.logger.warning("Using local file storage - R2 storage is not enabled")
-            upload_folder = current_app.config['UPLOAD_FOLDER']
-            os.makedirs(upload_folder, exist_ok=True)
-            file_path = os.path.join(upload_folder, unique_filename)
-            file.save(file_path)
-            document_path = unique_filename
+                current_app.logger.error(f"Failed to store uploaded file: {str(e)}")
+                return jsonify({'error': str(e)}), 500
+            with timer.stage('extract'):
+                invoices = extractor.extract_invoices(buffer, file_type, bypass_cache=bypass_cache)
         
-        extracted_data = extractor.extract_invoice_data(file_path, file_type)
+        with timer.stage('save'):
+            sales_order_ids = save_invoices([(invoice, document_path) for invoice in invoices])
         
-        sales_order_id = _save_invoice_to_db(extracted_data, document_path)
+        timings = timer.as_dict()
+        current_app.logger.info(f"Upload {filename} ({buffer.size} bytes) timings ms: {timings}")
         
         return jsonify({
             'success': True,
-            'salesOrderId': sales_order_id,
-            'data': extracted_data,
-            'documentUrl': r2_url if use_r2 else None
+            'salesOrderId': sales_order_ids[0],
+            'salesOrderIds': sales_order_ids,
+            'data': invoices[0],
+            'invoices': invoices,
+            'documentUrl': document_url,
+            'cached': extractor.last_cache_hit,
+            'backend': extractor.last_backend,
+            'truncatedPages': extractor.last_truncated_pages,
+            'timings': timings,
+            'imagePreprocessing': extractor.last_image_stats
         }), 200
         
     except ValueError as e:
         return jsonify({'error': str(e)}), 500
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        if temp_file_path and os.path.exists(temp_file_path):
+
+
+@invoices_bp.route('/upload/batch', methods=['POST'])
+def upload_batch():
+    request.max_content_length = current_app.config.get('BATCH_MAX_CONTENT_LENGTH')
+    
+    uploads = [f for f in request.files.getlist('files') + request.files.getlist('file') if f.filename]
+    if not uploads:
+        return jsonify({'error': 'No files provided'}), 400
+    
+    try:
+        backend = resolve_backend_name(request.args.get('backend', request.form.get('backend')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    extractor = DocumentExtractor(backend)
+    use_r2 = current_app.config.get('USE_R2_STORAGE', False)
+    run_async = _is_truthy(
+        request.args.get('async', request.form.get('async')),
+        default=current_app.config.get('ASYNC_EXTRACTION', False)
+    )
+    bypass_cache = _is_truthy(request.args.get('bypass_cache', request.form.get('bypass_cache')))
+    max_files = current_app.config.get('BATCH_MAX_FILES', 500)
+    max_file_size = current_app.config.get('MAX_CONTENT_LENGTH')
+    
+    results = []
+    sources = []
+    archives = []
+    
+    try:
+        for upload in uploads:
+            filename = secure_filename(upload.filename)
+            if filename.lower().endswith('.zip'):
+                archive = zipfile.ZipFile(upload.stream)
+                archives.append(archive)
+                for info in archive.infolist():
+                    if info.is_dir() or os.path.basename(info.filename).startswith('.'):
+                        continue
+                    member_name = secure_filename(os.path.basename(info.filename))
+                    if not extractor.allowed_file(member_name):
+                        results.append(_batch_result(member_name, 'skipped', error='File type not allowed'))
+                    elif max_file_size and info.file_size > max_file_size:
+                        results.append(_batch_result(member_name, 'skipped', error='File too large'))
+                    else:
+                        sources.append((member_name, lambda a=archive, i=info: _buffer_zip_member(a, i)))
+            elif extractor.allowed_file(filename):
+                # The request is capped at BATCH_MAX_CONTENT_LENGTH; each file
+                # still gets the single-upload limit, as zip members do.
+                buffer = UploadBuffer(upload.stream)
+                if max_file_size and buffer.size > max_file_size:
+                    results.append(_batch_result(filename, 'skipped', error='File too large'))
+                else:
+                    sources.append((filename, lambda b=buffer: b))
+            else:
+                results.append(_batch_result(filename, 'skipped', error='File type not allowed'))
+        
+        if len(sources) > max_files:
+            return jsonify({'error': f'Too many files in batch (max {max_files})'}), 400
+        
+        r2_storage = None
+        if use_r2:
             try:
+                r2_storage = get_r2_storage()
+            except ValueError as e:
+                current_app.logger.error(f"R2 storage initialization failed: {str(e)}")
+                return jsonify({'error': f'R2 storage not configured: {str(e)}'}), 500
+        
+        processed = _run_batch(sources, r2_storage, run_async, bypass_cache, backend)
+        
+        if run_async:
+            for result, stored in processed:
+                if stored is not None:
+                    filename, file_type, document_path, document_url = stored
+                    job = enqueue_extraction_job(
+                        filename, file_type, document_path, document_url, bypass_cache=bypass_cache, backend=backend
+                    )
+                    result.update({'status': job.Status, 'jobId': job.JobID})
+                results.append(result)
+            return jsonify(_batch_summary(results)), 202
+        
+        completed = [(result, stored) for result, stored in processed if stored is not None]
+        try:
+            sales_order_ids = iter(save_invoices([
+                (invoice, stored[2]) for result, stored in completed for invoice in result['invoices']
+            ]))
+            for result, _ in completed:
+                result['salesOrderIds'] = [next(sales_order_ids) for _ in result['invoices']]
+                result['salesOrderId'] = result['salesOrderIds'][0]
+        except Exception as e:
+            current_app.logger.warning(f"Bulk invoice save failed, saving individually: {str(e)}")
+            for result, stored in completed:
+                try:
+                    result['salesOrderIds'] = save_invoices([(invoice, stored[2]) for invoice in result['invoices']])
+                    result['salesOrderId'] = result['salesOrderIds'][0]
+                except Exception as save_error:
+                    result.update({'status': 'error', 'error': str(save_error)})
+        
+        results.extend(result for result, _ in processed)
+        return jsonify(_batch_summary(results)), 200
+    
+    except zipfile.BadZipFile as e:
+        return jsonify({'error': f'Invalid zip archive: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        for archive in archives:
+            archive.close()
+
+
+def _run_batch(sources, r2_storage, run_async: bool, bypass_cache: bool, backend: str):
+    app = current_app._get_current_object()
+    max_workers = app.config.get('BATCH_MAX_CONCURRENCY', 8)
+    file_timeout = app.config.get('BATCH_FILE_TIMEOUT', 120)
+    started_at = {}
+    
+    def process(index, filename, make_buffer):
+        started_at[index] = time.monotonic()
+        with app.app_context():
+            return _process_batch_file(filename, make_buffer, r2_storage, run_async, bypass_cache, backend)
+    
+    processed = [None] * len(sources)
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='batch-upload')
+    try:
+        futures = {
+            executor.submit(process, index, filename, make_buffer): index
+            for index, (filename, make_buffer) in enumerate(sources)
+        }
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = futures[future]
+                try:
+                    processed[index] = future.result()
+                except Exception as e:
+                    processed[index] = (_batch_result(sources[index][0], 'error', error=str(e)), None)
+            
+            # A stuck document is reported as timed out instead of holding the
+            # whole batch; its thread is abandoned rather than waited on.
+            now = time.monotonic()
+            for future in list(pending):
+                index = futures[future]
+                if index in started_at and now - started_at[index] > file_timeout:
+                    pending.discard(future)
+                    processed[index] = (_batch_result(
+                        sources[index][0], 'timeout',
+                        error=f'Extraction did not finish within {file_timeout}s'
+                    ), None)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    return processed
+
+
+def _process_batch_file(filename: str, make_buffer, r2_storage, run_async: bool, bypass_cache: bool, backend: str):
+    file_type = filename.rsplit('.', 1)[1].lower()
+    timer = StageTimer()
+    try:
+        buffer = make_buffer()
+        document_path, document_url = _timed_store(timer, buffer, filename, r2_storage)
+        
+        if run_async:
+            return _batch_result(filename, 'stored', documentUrl=document_url), (filename, file_type, document_path, document_url)
+        
+        extractor = DocumentExtractor(backend)
+        with timer.stage('extract'):
+            invoices = extractor.extract_invoices(buffer, file_type, bypass_cache=bypass_cache)
+        result = _batch_result(
+            filename, 'success',
+            data=invoices[0],
+            invoices=invoices,
+            documentUrl=document_url,
+            cached=extractor.last_cache_hit,
+            backend=extractor.last_backend,
+            truncatedPages=extractor.last_truncated_pages,
+            timings=timer.as_dict()
+        )
+        return result, (filename, file_type, document_path, document_url)
+    except Exception as e:
+        current_app.logger.error(f"Batch extraction failed for {filename}: {str(e)}")
+        return _batch_result(filename, 'error', error=str(e)), None
+
+
+def _buffer_zip_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> UploadBuffer:
+    with archive.open(info) as member:
+        return UploadBuffer.from_stream(member, current_app.config.get('UPLOAD_SPOOL_MAX_SIZE', 1024 * 1024))
+
+
+def _batch_result(filename: str, status: str, **fields) -> dict:
+    return {'fileName': filename, 'status': status, **fields}
+
+
+def _batch_summary(results: list) -> dict:
+    succeeded = sum(1 for result in results if result['status'] in ('success', 'queued'))
+    return {
+        'success': succeeded > 0,
+        'total': len(results),
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded,
+        'results': results
+    }
+
+
+def _store_document(buffer: UploadBuffer, filename: str, r2_storage=None):
+    file_type = filename.rsplit('.', 1)[1].lower()
+    unique_filename = f"{uuid.uuid4()}_{filename}"
+    
+    if r2_storage is not None:
+        object_key = f"invoices/{unique_filename}"
+        content_type = CONTENT_TYPES.get(file_type, 'application/octet-stream')
+        document_url = r2_storage.upload_file(buffer.reader(), object_key, content_type=content_type)
+        return object_key, document_url
+    
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    os.makedirs(upload_folder, exist_ok=True)
+    file_path = os.path.join(upload_folder, unique_filename)
+    with open(file_path, 'wb') as f:
+        shutil.copyfileobj(buffer.reader(), f)
+    return unique_filename, None
+
+
+def _timed_store(timer: StageTimer, buffer: UploadBuffer, filename: str, r2_storage=None):
+    with timer.stage('store'):
+        return _store_document(buffer, filename, r2_storage)
+
+
+def _is_truthy(value, default=False) -> bool:
+    if value is None:
+        return default
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+
+def _enqueue_response(filename: str, file_type: str, document_path: str, document_url,
+                      bypass_cache: bool = False, backend: str = None):
+    job = enqueue_extraction_job(filename, file_type, document_path, document_url, bypass_cache=bypass_cache, backend=backend)
+    return _job_response(job)
+
+
+def _job_response(job: ExtractionJob):
+    return jsonify({
+        'success': True,
+        'jobId': job.JobID,
+        'status': job.Status,
+        'statusUrl': url_for('jobs.get_job', job_id=job.JobID),
+        'resultUrl': url_for('jobs.get_job_result', job_id=job.JobID),
+        'documentUrl': job.DocumentUrl
+    }), 202
+
+
+@invoices_bp.route('/upload/presign', methods=['POST'])
+def presign_upload():
+    if not current_app.config.get('USE_R2_STORAGE', False):
+        return jsonify({'error': 'Direct uploads require R2 storage'}), 400
+    
+    data = request.get_json(silent=True) or {}
+    filename = secure_filename(data.get('fileName') or '')
+    if not filename:
+        return jsonify({'error': 'fileName is required'}), 400
+    if not DocumentExtractor().allowed_file(filename):
+        return jsonify({'error': 'File type not allowed'}), 400
+    
+    max_size = current_app.config.get('DIRECT_UPLOAD_MAX_SIZE') or current_app.config.get('MAX_CONTENT_LENGTH')
+    method = (data.get('method') or 'put').lower()
+    if method not in ('put', 'post'):
+        return jsonify({'error': "method must be 'put' or 'post'"}), 400
+    try:
+        size = int(data.get('size') or 0)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'size must be an integer'}), 400
+    if method == 'put' and size < 1:
+        return jsonify({'error': 'size is required for PUT uploads'}), 400
+    if size > max_size:
+        return jsonify({'error': f'File too large (max {max_size} bytes)'}), 400
+    
+    try:
+        file_type = filename.rsplit('.', 1)[1].lower()
+        content_type = CONTENT_TYPES.get(file_type, 'application/octet-stream')
+        object_key = f"invoices/{uuid.uuid4()}_{filename}"
+        expiration = current_app.config.get('DIRECT_UPLOAD_EXPIRATION', 900)
+        r2_storage = get_r2_storage()
+        
+        response = {
+            'objectKey': object_key,
+            'method': method.upper(),
+            'expiresIn': expiration,
+            'completeUrl': url_for('invoices.complete_upload')
+        }
+        if method == 'put':
+            response['url'] = r2_storage.get_presigned_put_url(object_key, content_type, size, expiration)
+            response['headers'] = {'Content-Type': content_type}
+        else:
+            post = r2_storage.get_presigned_post(object_key, content_type, max_size, expiration)
+            response.update({'url': post['url'], 'fields': post['fields']})
+        return jsonify(response), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@invoices_bp.route('/upload/complete', methods=['POST'])
+def complete_upload():
+    if not current_app.config.get('USE_R2_STORAGE', False):
+        return jsonify({'error': 'Direct uploads require R2 storage'}), 400
+    
+    data = request.get_json(silent=True) or {}
+    object_key = data.get('objectKey') or ''
+    match = DIRECT_UPLOAD_KEY.match(object_key)
+    if not match:
+        return jsonify({'error': 'Invalid objectKey'}), 400
+    filename = match.group(1)
+    file_type = filename.rsplit('.', 1)[1].lower()
+    
+    try:
+        backend = resolve_backend_name(data.get('backend'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    run_async = _is_truthy(data.get('async'), default=True)
+    bypass_cache = _is_truthy(data.get('bypass_cache'))
+    
+    try:
+        # Completing the same object twice returns the job already running
+        # for it instead of paying for a second extraction.
+        existing = ExtractionJob.query.filter_by(DocumentPath=object_key) \
+            .filter(ExtractionJob.Status != ExtractionJob.STATUS_FAILED) \
+            .order_by(ExtractionJob.CreatedAt.desc()) \
+            .first()
+        if existing is not None and run_async:
+            return _job_response(existing)
+        
+        r2_storage = get_r2_storage()
+        info = r2_storage.get_object_info(object_key)
+        if info is None:
+            return jsonify({'error': 'Uploaded object not found'}), 404
+        
+        max_size = current_app.config.get('DIRECT_UPLOAD_MAX_SIZE') or current_app.config.get('MAX_CONTENT_LENGTH')
+        expected_type = CONTENT_TYPES.get(file_type, 'application/octet-stream')
+        if info['size'] > max_size or (info['contentType'] or '').split(';')[0] != expected_type:
+            r2_storage.delete_file(object_key)
+            return jsonify({'error': 'Uploaded object does not match the requested size or type'}), 400
+        
+        document_url = r2_storage.public_object_url(object_key)
+        if run_async:
+            return _enqueue_response(filename, file_type, object_key, document_url, bypass_cache, backend)
+        
+        timer = StageTimer()
+        temp_file_path = None
+        try:
+            with timer.stage('store'):
+                temp_file_path = r2_storage.download_to_temp_file(object_key)
+            extractor = DocumentExtractor(backend)
+            with timer.stage('extract'):
+                invoices = extractor.extract_invoices(temp_file_path, file_type, bypass_cache=bypass_cache)
+            with timer.stage('save'):
+                sales_order_ids = save_invoices([(invoice, object_key) for invoice in invoices])
+        finally:
+            if temp_file_path and os.path.exists(temp_file_path):
                 os.unlink(temp_file_path)
-            except Exception:
-                pass
+        
+        return jsonify({
+            'success': True,
+            'salesOrderId': sales_order_ids[0],
+            'salesOrderIds': sales_order_ids,
+            'data': invoices[0],
+            'invoices': invoices,
+            'documentUrl': document_url,
+            'cached': extractor.last_cache_hit,
+            'backend': extractor.last_backend,
+            'truncatedPages': extractor.last_truncated_pages,
+            'timings': timer.as_dict(),
+            'imagePreprocessing': extractor.last_image_stats
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 
 @invoices_bp.route('/invoices', methods=['GET'])
+@use_replica
 def get_invoices():
     try:
-        invoices = SalesOrderHeader.query.order_by(SalesOrderHeader.CreatedAt.desc()).all()
-        return jsonify([invoice.to_dict() for invoice in invoices]), 200
+        limit = parse_limit(
+            request.args.get('limit'),
+            default=current_app.config.get('INVOICES_PAGE_SIZE', 50),
+            maximum=current_app.config.get('INVOICES_MAX_PAGE_SIZE', 200)
+        )
+        fields = parse_fields(request.args.get('fields'))
+        include_items = 'items' in request.args.get('include', '').split(',')
+        
+        if _is_truthy(request.args.get('stream')):
+            invoices, meta = _list_invoices(limit, fields, include_items)
+            return Response(_stream_page(invoices, meta, current_app.json.dumps_bytes), mimetype='application/json'), 200
+        
+        def render():
+            invoices, meta = _list_invoices(limit, fields, include_items)
+            return current_app.json.dumps_bytes({'invoices': invoices, **meta}) + b'\n', None
+        
+        return get_response_cache().respond(INVOICE_LIST_NAMESPACE, request_key(request.args), render)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def _list_invoices(limit: int, fields, include_items: bool):
+    if current_app.config.get('INVOICE_SERIALIZATION', 'rows') == 'orm':
+        invoices, next_cursor = _list_invoices_orm(limit, fields, include_items)
+    else:
+        invoices, next_cursor = _list_invoices_rows(limit, fields, include_items)
+    return invoices, {'nextCursor': next_cursor, 'hasMore': next_cursor is not None, 'limit': limit}
+
+
+def _list_invoices_rows(limit: int, fields, include_items: bool):
+    stmt = apply_invoice_filters(header_select(fields), request.args)
+    stmt = apply_keyset(stmt, request.args.get('cursor')).limit(limit + 1)
+    rows = db.session.execute(stmt).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].CreatedAt, rows[-1].SalesOrderID)
+    
+    invoices = rows_to_dicts(rows, fields)
+    if include_items:
+        attach_items(invoices, [row.SalesOrderID for row in rows])
+    return invoices, next_cursor
+
+
+def _list_invoices_orm(limit: int, fields, include_items: bool):
+    query = apply_invoice_filters(SalesOrderHeader.query, request.args)
+    query = apply_keyset(query, request.args.get('cursor'))
+    if fields:
+        columns = set(fields) | {'SalesOrderID', 'CreatedAt'}
+        query = query.options(load_only(*[getattr(SalesOrderHeader, c) for c in columns]))
+    if include_items:
+        # Batch-load items for the whole page in one extra query instead
+        # of one lazy load per invoice.
+        query = query.options(items_loader(current_app.config.get('INVOICE_LIST_ITEMS_LOADING', 'selectin')))
+    
+    headers = query.limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(headers) > limit:
+        headers = headers[:limit]
+        next_cursor = encode_cursor(headers[-1].CreatedAt, headers[-1].SalesOrderID)
+    
+    return [header.to_dict(include_items=include_items, fields=fields) for header in headers], next_cursor
+
+
+def _stream_page(invoices: list, meta: dict, dumps):
+    yield b'{"invoices":'
+    yield from iter_json_array(invoices, dumps)
+    for key, value in meta.items():
+        yield b',"' + key.encode('utf-8') + b'":' + dumps(value)
+    yield b'}\n'
+
+
+@invoices_bp.route('/invoices/search', methods=['GET'])
+@use_replica
+def search_invoices_route():
+    try:
+        query = (request.args.get('q') or '').strip()
+        if not query:
+            raise ValueError('q is required')
+        limit = parse_limit(
+            request.args.get('limit'),
+            default=current_app.config.get('INVOICES_PAGE_SIZE', 50),
+            maximum=current_app.config.get('INVOICES_MAX_PAGE_SIZE', 200)
+        )
+        offset = parse_offset(request.args.get('offset'))
+        fields = parse_fields(request.args.get('fields'))
+        include_items = 'items' in request.args.get('include', '').split(',')
+        
+        matches = search_invoices(
+            query, limit + 1, offset, max_candidates=current_app.config.get('SEARCH_MAX_CANDIDATES', 2000)
+        )
+        has_more = len(matches) > limit
+        matches = matches[:limit]
+        
+        # Headers come back in id order; put them back in rank order.
+        ids = [sales_order_id for sales_order_id, _ in matches]
+        rows = {row.SalesOrderID: row for row in db.session.execute(
+            header_select(fields).where(SalesOrderHeader.SalesOrderID.in_(ids))
+        )}
+        ranked = [(rows[sales_order_id], score) for sales_order_id, score in matches if sales_order_id in rows]
+        invoices = rows_to_dicts([row for row, _ in ranked], fields)
+        for invoice, (_, score) in zip(invoices, ranked):
+            invoice['score'] = round(score, 4)
+        if include_items:
+            attach_items(invoices, [row.SalesOrderID for row, _ in ranked])
+        
+        return jsonify({
+            'invoices': invoices,
+            'limit': limit,
+            'offset': offset,
+            'nextOffset': offset + limit if has_more else None,
+            'hasMore': has_more
+        }), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@invoices_bp.route('/invoices/export', methods=['GET'])
+@use_replica
+def export_invoices_route():
+    try:
+        export_format = request.args.get('format', 'ndjson').lower()
+        batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 1000)
+        chunks = export_invoices(export_format, request.args, batch_size=batch_size)
+        
+        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        response = Response(stream_with_context(chunks), mimetype=EXPORT_FORMATS[export_format])
+        response.headers['Content-Disposition'] = f'attachment; filename="invoices-{timestamp}.{export_format}"'
+        return response
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @invoices_bp.route('/invoices/<int:sales_order_id>', methods=['GET'])
+@use_replica
 def get_invoice(sales_order_id):
     try:
-        invoice = SalesOrderHeader.query.get_or_404(sales_order_id)
-        return jsonify(invoice.to_dict()), 200
+        def render():
+            invoice = SalesOrderHeader.query \
+                .options(items_loader(current_app.config.get('INVOICE_DETAIL_ITEMS_LOADING', 'joined'))) \
+                .filter_by(SalesOrderID=sales_order_id) \
+                .first_or_404()
+            # Every change to the invoice or its items moves UpdatedAt.
+            etag = f"{invoice.SalesOrderID}-{invoice.UpdatedAt.strftime('%Y%m%d%H%M%S%f')}"
+            return current_app.json.dumps_bytes(invoice.to_dict()) + b'\n', etag
+        
+        return get_response_cache().respond(invoice_namespace(sales_order_id), '', render)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -123,26 +700,33 @@ def get_invoice(sales_order_id):
 @invoices_bp.route('/invoices/<int:sales_order_id>', methods=['PUT'])
 def update_invoice(sales_order_id):
     try:
+        before = rollup_snapshot([sales_order_id])
         invoice = SalesOrderHeader.query.get_or_404(sales_order_id)
         data = request.json
         
         # Ensure OrderDate is never None
-        order_date = data.get('orderDate')
-        if order_date:
-            invoice.OrderDate = order_date
+        if data.get('orderDate'):
+            invoice.OrderDate = _parsed(normalize_date, data, 'orderDate')
         elif invoice.OrderDate is None:
-            invoice.OrderDate = datetime.now().strftime('%Y-%m-%d')
-        invoice.DueDate = data.get('dueDate', invoice.DueDate)
+            invoice.OrderDate = datetime.now().date()
+        if 'dueDate' in data:
+            invoice.DueDate = _parsed(normalize_date, data, 'dueDate')
         invoice.CustomerName = data.get('customerName', invoice.CustomerName)
         invoice.CustomerAddress = data.get('customerAddress', invoice.CustomerAddress)
         invoice.InvoiceNumber = data.get('invoiceNumber', invoice.InvoiceNumber)
-        invoice.SubTotal = data.get('subTotal', invoice.SubTotal)
-        invoice.TaxAmount = data.get('taxAmount', invoice.TaxAmount)
-        invoice.TotalAmount = data.get('totalAmount', invoice.TotalAmount)
+        for field, column in (('subTotal', 'SubTotal'), ('taxAmount', 'TaxAmount'), ('totalAmount', 'TotalAmount')):
+            if field in data:
+                setattr(invoice, column, _parsed(normalize_amount, data, field, required=True))
         invoice.Status = data.get('status', invoice.Status)
         
+        update_rollups(before, rollup_snapshot([sales_order_id]))
+        refresh_search_index([sales_order_id])
         db.session.commit()
+        invalidate_invoices([sales_order_id])
         return jsonify({'success': True}), 200
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -151,6 +735,7 @@ def update_invoice(sales_order_id):
 @invoices_bp.route('/invoices/<int:sales_order_id>/items/<int:item_id>', methods=['PUT'])
 def update_invoice_item(sales_order_id, item_id):
     try:
+        before = rollup_snapshot([sales_order_id])
         item = SalesOrderDetail.query.filter_by(
             SalesOrderDetailID=item_id,
             SalesOrderID=sales_order_id
@@ -160,151 +745,87 @@ def update_invoice_item(sales_order_id, item_id):
         
         item.ProductName = data.get('productName', item.ProductName)
         item.ProductDescription = data.get('productDescription', item.ProductDescription)
-        item.Quantity = data.get('quantity', item.Quantity)
-        item.UnitPrice = data.get('unitPrice', item.UnitPrice)
-        item.LineTotal = data.get('lineTotal', item.LineTotal)
+        if 'quantity' in data:
+            item.Quantity = _parsed(normalize_quantity, data, 'quantity', required=True)
+        if 'unitPrice' in data:
+            item.UnitPrice = _parsed(lambda value: normalize_amount(value, UNIT_PRICE_PLACES), data, 'unitPrice', required=True)
+        if 'lineTotal' in data:
+            item.LineTotal = _parsed(normalize_amount, data, 'lineTotal', required=True)
+        # The invoice's ETag is derived from its UpdatedAt.
+        item.header.UpdatedAt = datetime.now(timezone.utc)
         
+        update_rollups(before, rollup_snapshot([sales_order_id]))
+        refresh_search_index([sales_order_id])
         db.session.commit()
+        invalidate_invoices([sales_order_id])
         return jsonify({'success': True}), 200
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
+def _parsed(normalize, data: dict, field: str, required: bool = False):
+    # Explicit nulls clear optional fields; any other value must parse.
+    value = data.get(field)
+    if value is None and not required:
+        return None
+    parsed = normalize(value)
+    if parsed is None:
+        raise ValueError(f"Invalid {field} '{value}'")
+    return parsed
+
+
 @invoices_bp.route('/invoices/<int:sales_order_id>', methods=['DELETE'])
 def delete_invoice(sales_order_id):
     try:
+        before = rollup_snapshot([sales_order_id])
         invoice = SalesOrderHeader.query.get_or_404(sales_order_id)
-        
-        use_r2 = current_app.config.get('USE_R2_STORAGE', False)
-        if use_r2 and invoice.DocumentPath:
-            try:
-                r2_storage = get_r2_storage()
-                r2_storage.delete_file(invoice.DocumentPath)
-            except Exception as e:
-                current_app.logger.warning(f"Failed to delete file from R2: {str(e)}")
-        elif not use_r2 and invoice.DocumentPath:
-            upload_folder = current_app.config['UPLOAD_FOLDER']
-            file_path = os.path.join(upload_folder, invoice.DocumentPath)
-            if os.path.exists(file_path):
-                try:
-                    os.unlink(file_path)
-                except Exception:
-                    pass
+        document_path = invoice.DocumentPath
         
         db.session.delete(invoice)
+        db.session.flush()
+        update_rollups(before, {})
+        refresh_search_index([sales_order_id])
+        # Invoices split from one PDF share its document, so it is only
+        # removed with the last invoice or job that still points at it.
+        orphaned = document_path and not _document_in_use(document_path)
         db.session.commit()
+        invalidate_invoices([sales_order_id])
+        
+        if orphaned:
+            _delete_document(document_path)
         return jsonify({'success': True}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
-def _save_invoice_to_db(data: dict, document_path: str) -> int:
-    try:
-        invoice_number = data.get('invoiceNumber', '').strip()
-        
-        # Ensure OrderDate has a default value if not provided
-        order_date = data.get('orderDate')
-        if not order_date:
-            order_date = datetime.now().strftime('%Y-%m-%d')
-        
-        header = None
-        if invoice_number:
-            header = SalesOrderHeader.query.filter_by(InvoiceNumber=invoice_number).first()
-        
-        if header:
-            header.OrderDate = data.get('orderDate') or header.OrderDate or order_date
-            header.DueDate = data.get('dueDate', header.DueDate)
-            header.CustomerName = data.get('customerName', header.CustomerName)
-            header.CustomerAddress = data.get('customerAddress', header.CustomerAddress)
-            header.SubTotal = data.get('subTotal', header.SubTotal)
-            header.TaxAmount = data.get('taxAmount', header.TaxAmount)
-            header.TotalAmount = data.get('totalAmount', header.TotalAmount)
-            header.DocumentPath = document_path
-            
-            SalesOrderDetail.query.filter_by(SalesOrderID=header.SalesOrderID).delete()
-            
-            items = data.get('items', [])
-            for item_data in items:
-                item = SalesOrderDetail(
-                    SalesOrderID=header.SalesOrderID,
-                    ProductName=item_data.get('productName', ''),
-                    ProductDescription=item_data.get('productDescription', ''),
-                    Quantity=item_data.get('quantity', 1),
-                    UnitPrice=item_data.get('unitPrice', 0),
-                    LineTotal=item_data.get('lineTotal', 0)
-                )
-                db.session.add(item)
-        else:
-            header = SalesOrderHeader(
-                OrderDate=order_date,
-                DueDate=data.get('dueDate'),
-                CustomerName=data.get('customerName', ''),
-                CustomerAddress=data.get('customerAddress', ''),
-                InvoiceNumber=invoice_number,
-                SubTotal=data.get('subTotal', 0),
-                TaxAmount=data.get('taxAmount', 0),
-                TotalAmount=data.get('totalAmount', 0),
-                Status='Pending',
-                DocumentPath=document_path
-            )
-            
-            db.session.add(header)
-            db.session.flush()
-            
-            items = data.get('items', [])
-            for item_data in items:
-                item = SalesOrderDetail(
-                    SalesOrderID=header.SalesOrderID,
-                    ProductName=item_data.get('productName', ''),
-                    ProductDescription=item_data.get('productDescription', ''),
-                    Quantity=item_data.get('quantity', 1),
-                    UnitPrice=item_data.get('unitPrice', 0),
-                    LineTotal=item_data.get('lineTotal', 0)
-                )
-                db.session.add(item)
-        
-        db.session.commit()
-        return header.SalesOrderID
-    except IntegrityError as e:
-        db.session.rollback()
-        if 'InvoiceNumber' in str(e.orig):
-            invoice_number = data.get('invoiceNumber', '').strip()
-            if invoice_number:
-                header = SalesOrderHeader.query.filter_by(InvoiceNumber=invoice_number).first()
-                if header:
-                    # Ensure OrderDate has a value
-                    order_date = data.get('orderDate')
-                    if not order_date:
-                        order_date = datetime.now().strftime('%Y-%m-%d')
-                    header.OrderDate = order_date or header.OrderDate or datetime.now().strftime('%Y-%m-%d')
-                    header.DueDate = data.get('dueDate', header.DueDate)
-                    header.CustomerName = data.get('customerName', header.CustomerName)
-                    header.CustomerAddress = data.get('customerAddress', header.CustomerAddress)
-                    header.SubTotal = data.get('subTotal', header.SubTotal)
-                    header.TaxAmount = data.get('taxAmount', header.TaxAmount)
-                    header.TotalAmount = data.get('totalAmount', header.TotalAmount)
-                    header.DocumentPath = document_path
-                    
-                    SalesOrderDetail.query.filter_by(SalesOrderID=header.SalesOrderID).delete()
-                    
-                    items = data.get('items', [])
-                    for item_data in items:
-                        item = SalesOrderDetail(
-                            SalesOrderID=header.SalesOrderID,
-                            ProductName=item_data.get('productName', ''),
-                            ProductDescription=item_data.get('productDescription', ''),
-                            Quantity=item_data.get('quantity', 1),
-                            UnitPrice=item_data.get('unitPrice', 0),
-                            LineTotal=item_data.get('lineTotal', 0)
-                        )
-                        db.session.add(item)
-                    
-                    db.session.commit()
-                    return header.SalesOrderID
-        raise e
-    except Exception as e:
-        db.session.rollback()
-        raise e
+def _document_in_use(document_path: str) -> bool:
+    return db.session.query(
+        db.session.query(SalesOrderHeader.SalesOrderID).filter_by(DocumentPath=document_path).exists()
+    ).scalar() or db.session.query(
+        db.session.query(ExtractionJob.JobID).filter(
+            ExtractionJob.DocumentPath == document_path,
+            ExtractionJob.Status.in_([ExtractionJob.STATUS_QUEUED, ExtractionJob.STATUS_RUNNING])
+        ).exists()
+    ).scalar()
+
 
+def _delete_document(document_path: str) -> None:
+    # After the commit, so a failed delete never leaves invoices pointing at
+    # a removed file.
+    if current_app.config.get('USE_R2_STORAGE', False):
+        try:
+            get_r2_storage().delete_file(document_path)
+        except Exception as e:
+            current_app.logger.warning(f"Failed to delete file from R2: {str(e)}")
+    else:
+        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], document_path)
+        if os.path.exists(file_path):
+            try:
+                os.unlink(file_path)
+            except Exception:
+                pass
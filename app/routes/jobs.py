@@ -0,0 +1,44 @@
+from flask import Blueprint, jsonify
+from app.models.extraction_job import ExtractionJob
+from app.models.sales_order import SalesOrderHeader
+
+jobs_bp = Blueprint('jobs', __name__)
+
+
+@jobs_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    try:
+        job = ExtractionJob.query.get_or_404(job_id)
+        return jsonify(job.to_dict()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@jobs_bp.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    try:
+        job = ExtractionJob.query.get_or_404(job_id)
+
+        if job.Status == ExtractionJob.STATUS_COMPLETED:
+            # Every invoice split out of the document shares its DocumentPath.
+            sales_order_ids = [
+                row.SalesOrderID for row in SalesOrderHeader.query
+                .with_entities(SalesOrderHeader.SalesOrderID)
+                .filter_by(DocumentPath=job.DocumentPath)
+                .order_by(SalesOrderHeader.SalesOrderID)
+            ]
+            return jsonify({
+                'success': True,
+                'salesOrderId': job.SalesOrderID,
+                'salesOrderIds': sales_order_ids or [job.SalesOrderID],
+                'data': job.result_data,
+                'invoices': job.result_invoices,
+                'documentUrl': job.DocumentUrl
+            }), 200
+
+        if job.Status == ExtractionJob.STATUS_FAILED:
+            return jsonify({'error': job.Error, 'status': job.Status}), 500
+
+        return jsonify({'jobId': job.JobID, 'status': job.Status}), 202
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
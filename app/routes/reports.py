@@ -0,0 +1,69 @@
+from flask import Blueprint, request, jsonify, current_app
+from app.database import use_replica
+from app.services.invoice_query import parse_limit
+from app.services.invoice_reports import (
+    customer_report, product_report, revenue_report, status_report, summary_report
+)
+
+reports_bp = Blueprint('reports', __name__)
+
+
+@reports_bp.route('/reports/summary', methods=['GET'])
+@use_replica
+def get_summary():
+    try:
+        return jsonify({'summary': summary_report(request.args)}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@reports_bp.route('/reports/revenue', methods=['GET'])
+@use_replica
+def get_revenue():
+    try:
+        granularity = request.args.get('granularity', 'month')
+        return jsonify({
+            'granularity': granularity,
+            'revenue': revenue_report(granularity, request.args)
+        }), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@reports_bp.route('/reports/status', methods=['GET'])
+@use_replica
+def get_status_report():
+    try:
+        return jsonify({'statuses': status_report(request.args)}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@reports_bp.route('/reports/customers', methods=['GET'])
+@use_replica
+def get_customer_report():
+    try:
+        limit = parse_limit(request.args.get('limit'), default=50, maximum=current_app.config.get('REPORTS_MAX_ROWS', 1000))
+        return jsonify({'customers': customer_report(request.args.get('sort', 'totalAmount'), limit)}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@reports_bp.route('/reports/products', methods=['GET'])
+@use_replica
+def get_product_report():
+    try:
+        limit = parse_limit(request.args.get('limit'), default=20, maximum=current_app.config.get('REPORTS_MAX_ROWS', 1000))
+        return jsonify({'products': product_report(request.args.get('sort', 'revenue'), limit)}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
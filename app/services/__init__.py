@@ -1,6 +1,7 @@
 from app.services.document_extractor import DocumentExtractor
 from app.services.openai_client import OpenAIClient, get_openai_client, get_openai_model
 from app.services.r2_storage import R2Storage, get_r2_storage
+from app.services.extraction_cache import ExtractionCache, get_extraction_cache
 
 __all__ = [
     'DocumentExtractor',
@@ -8,6 +9,8 @@ __all__ = [
     'get_openai_client',
     'get_openai_model',
     'R2Storage',
-    'get_r2_storage'
+    'get_r2_storage',
+    'ExtractionCache',
+    'get_extraction_cache'
 ]
 
@@ -1,16 +1,31 @@
 import os
-import json
+import time
 import base64
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 from flask import current_app
-from app.services.openai_client import get_openai_client, get_openai_model
+from app.services.extraction_backends import BackendUnavailable, get_extraction_backend
+from app.services.extraction_cache import get_extraction_cache
+from app.services.image_preprocessor import prepare_image
+from app.services.invoice_splitter import PAGE_PROMPT, merge_pages
+from app.services.metrics import EXTRACTION_SECONDS, timed_stage
+from app.services.pdf_reader import count_pdf_pages, iter_pdf_pages, rasterize_pdf_pages
+from app.services.upload_buffer import open_source
 
 
 class DocumentExtractor:
+    # Bump whenever _get_extraction_prompt changes so cached results from the
+    # previous prompt are no longer served.
+    PROMPT_VERSION = '2'
     
-    def __init__(self):
-        self.client = get_openai_client()
-        self.model = get_openai_model()
+    def __init__(self, backend: Optional[str] = None):
+        self.backend = get_extraction_backend(backend)
+        self.model = self.backend.model
+        self.last_backend = None
+        self.last_cache_hit = False
+        self.last_image_stats = []
+        self.last_truncated_pages = 0
+        self._answered_by = set()
     
     def allowed_file(self, filename: str) -> bool:
         allowed = current_app.config.get('ALLOWED_EXTENSIONS', set())
@@ -18,78 +33,260 @@ class DocumentExtractor:
     
     def extract_text_from_file(self, file_path: str) -> str:
         ext = file_path.rsplit('.', 1)[1].lower()
-        
-        if ext == 'txt':
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        elif ext in ['png', 'jpg', 'jpeg', 'webp']:
-            with open(file_path, 'rb') as f:
+        return self.extract_text(file_path, ext)
+    
+    def extract_text(self, source, file_type: str) -> str:
+        if file_type == 'txt':
+            with open_source(source) as f:
+                return f.read().decode('utf-8')
+        elif file_type in ['png', 'jpg', 'jpeg', 'webp']:
+            with open_source(source) as f:
                 return base64.b64encode(f.read()).decode('utf-8')
-        elif ext == 'pdf':
-            return "PDF content extraction - would use PyPDF2 in production"
+        elif file_type == 'pdf':
+            text, _ = self.read_pdf_text(source)
+            return text
         
         return ""
     
-    def extract_invoice_data(self, file_path: str, file_type: str) -> Dict[str, Any]:
-        if file_type in ['png', 'jpg', 'jpeg', 'webp']:
-            return self._extract_from_image(file_path, file_type)
+    def read_pdf_text(self, source) -> Tuple[str, List[int]]:
+        max_pages = current_app.config.get('PDF_MAX_PAGES', 20)
+        max_chars = current_app.config.get('PDF_MAX_CHARS', 20000)
+        min_page_chars = current_app.config.get('PDF_MIN_PAGE_CHARS', 20)
+        
+        parts = []
+        pages_without_text = []
+        total_chars = 0
+        for page_number, text in iter_pdf_pages(source, max_pages):
+            if len(text) < min_page_chars:
+                pages_without_text.append(page_number)
+                continue
+            
+            text = text[:max_chars - total_chars]
+            parts.append(f"--- Page {page_number + 1} ---\n{text}")
+            total_chars += len(text)
+            if total_chars >= max_chars:
+                break
+        
+        return '\n\n'.join(parts), pages_without_text
+    
+    def extract_invoice_data(self, source, file_type: str, bypass_cache: bool = False) -> Dict[str, Any]:
+        return self._cached(
+            source, self._cache_version(file_type), bypass_cache,
+            lambda: self._extract_document(source, file_type)
+        )
+    
+    def extract_invoices(self, source, file_type: str, bypass_cache: bool = False) -> List[Dict[str, Any]]:
+        page_count = count_pdf_pages(source) if file_type == 'pdf' else 0
+        if page_count < 2 or not current_app.config.get('PDF_SPLIT_PAGES', True):
+            invoices = [self.extract_invoice_data(source, file_type, bypass_cache=bypass_cache)]
         else:
-            return self._extract_from_text(file_path)
+            result = self._cached(
+                source, f"{self._cache_version(file_type)}:p", bypass_cache,
+                lambda: {'invoices': self._extract_pages(source)}
+            )
+            if not result['invoices']:
+                raise ValueError('No invoice data found in the document')
+            invoices = result['invoices']
+        
+        # Pages past PDF_MAX_PAGES are never read, so invoices on them are
+        # missing from the result; callers report how many were skipped.
+        max_pages = current_app.config.get('PDF_MAX_PAGES', 20)
+        self.last_truncated_pages = max(page_count - max_pages, 0) if max_pages else 0
+        if self.last_truncated_pages:
+            current_app.logger.warning(
+                f"PDF has {page_count} pages; only the first {max_pages} were extracted (PDF_MAX_PAGES)"
+            )
+        return invoices
     
-    def _extract_from_image(self, file_path: str, file_type: str) -> Dict[str, Any]:
-        with open(file_path, 'rb') as image_file:
-            image_base64 = base64.b64encode(image_file.read()).decode('utf-8')
+    def _cached(self, source, version: str, bypass_cache: bool, extract) -> Dict[str, Any]:
+        cache = get_extraction_cache()
+        with timed_stage('hash'):
+            file_hash = cache.hash_file(source)
+        cache_key = cache.make_key(file_hash, self.model, version)
         
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": self._get_extraction_prompt()
-                },
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/{file_type};base64,{image_base64}"
-                            }
-                        },
-                        {
-                            "type": "text",
-                            "text": "Extract all invoice data from this image and return as JSON."
-                        }
-                    ]
-                }
-            ],
-            response_format={"type": "json_object"}
-        )
+        self.last_backend = None
+        self.last_cache_hit = False
+        self.last_image_stats = []
+        self._answered_by = set()
+        if not bypass_cache:
+            with timed_stage('cache_lookup'):
+                cached = cache.get(cache_key)
+            if cached is not None:
+                self.last_cache_hit = True
+                return cached
         
-        result = json.loads(response.choices[0].message.content)
+        result = extract()
+        # A fallback answer is stored under the model that produced it, so
+        # the cache never credits one backend with another's result. Pages
+        # answered by a mix of backends are not cached at all.
+        if len(self._answered_by) == 1:
+            model = next(iter(self._answered_by))
+            with timed_stage('cache_write'):
+                cache.set(cache.make_key(file_hash, model, version), file_hash, model, version, result)
         return result
     
-    def _extract_from_text(self, file_path: str) -> Dict[str, Any]:
-        text_content = self.extract_text_from_file(file_path)
+    def _extract_document(self, source, file_type: str) -> Dict[str, Any]:
+        if file_type in ['png', 'jpg', 'jpeg', 'webp']:
+            return self._extract_from_image(source, file_type)
+        elif file_type == 'pdf':
+            return self._extract_from_pdf(source)
+        return self._extract_from_text(source, file_type)
+    
+    def _extract_pages(self, source) -> List[Dict[str, Any]]:
+        max_pages = current_app.config.get('PDF_MAX_PAGES', 20)
+        max_chars = current_app.config.get('PDF_MAX_CHARS', 20000)
+        min_page_chars = current_app.config.get('PDF_MIN_PAGE_CHARS', 20)
+        dpi = current_app.config.get('PDF_RASTER_DPI', 150)
         
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": self._get_extraction_prompt()
-                },
-                {
-                    "role": "user",
-                    "content": f"Extract all invoice data from this text:\n\n{text_content}"
-                }
-            ],
-            response_format={"type": "json_object"}
-        )
+        contents = {}
+        scanned = []
+        with timed_stage('pdf_text'):
+            for page_number, text in iter_pdf_pages(source, max_pages):
+                if len(text) < min_page_chars:
+                    scanned.append(page_number)
+                else:
+                    contents[page_number] = f"Extract all invoice data from this page:\n\n{text[:max_chars]}"
+        
+        # pdfium is not thread-safe, so pages are rendered up front and only
+        # the model calls run in parallel. Each scanned page is its own call
+        # here, so PDF_MAX_PAGES rather than PDF_MAX_RASTER_PAGES bounds them.
+        with timed_stage('rasterize'):
+            rendered = list(rasterize_pdf_pages(source, scanned, dpi))
+        for page_number, png_bytes in rendered:
+            contents[page_number] = [
+                self._image_content(png_bytes, 'image/png'),
+                {"type": "text", "text": "Extract all invoice data from this page and return as JSON."}
+            ]
+        
+        app = current_app._get_current_object()
+        system_prompt = self._get_extraction_prompt() + PAGE_PROMPT
+        
+        def extract_page(content):
+            with app.app_context():
+                return self._request_extraction(content, system_prompt)
         
-        result = json.loads(response.choices[0].message.content)
+        page_numbers = sorted(contents)
+        max_workers = min(current_app.config.get('PDF_PAGE_CONCURRENCY', 8), len(page_numbers)) or 1
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pdf-page') as executor:
+            pages = list(executor.map(extract_page, [contents[page_number] for page_number in page_numbers]))
+        
+        return merge_pages(pages)
+    
+    def _extract_from_image(self, source, file_type: str) -> Dict[str, Any]:
+        with open_source(source) as image_file:
+            image_bytes = image_file.read()
+        
+        mime_type = f"image/{'jpeg' if file_type == 'jpg' else file_type}"
+        return self._request_extraction([
+            self._image_content(image_bytes, mime_type),
+            {
+                "type": "text",
+                "text": "Extract all invoice data from this image and return as JSON."
+            }
+        ])
+    
+    def _extract_from_text(self, source, file_type: str) -> Dict[str, Any]:
+        text_content = self.extract_text(source, file_type)
+        return self._request_extraction(f"Extract all invoice data from this text:\n\n{text_content}")
+    
+    def _extract_from_pdf(self, source) -> Dict[str, Any]:
+        with timed_stage('pdf_text'):
+            text_content, pages_without_text = self.read_pdf_text(source)
+        
+        if not pages_without_text:
+            return self._request_extraction(f"Extract all invoice data from this text:\n\n{text_content}")
+        
+        # Only scanned pages are rendered for the vision path; pages with a
+        # text layer still travel as plain text.
+        max_raster_pages = current_app.config.get('PDF_MAX_RASTER_PAGES', 5)
+        dpi = current_app.config.get('PDF_RASTER_DPI', 150)
+        content = []
+        if text_content:
+            content.append({
+                "type": "text",
+                "text": f"Text layer of the invoice pages that have one:\n\n{text_content}"
+            })
+        with timed_stage('rasterize'):
+            rendered = list(rasterize_pdf_pages(source, pages_without_text[:max_raster_pages], dpi))
+        for page_number, png_bytes in rendered:
+            content.append(self._image_content(png_bytes, 'image/png'))
+        content.append({
+            "type": "text",
+            "text": "Extract all invoice data from this document and return as JSON."
+        })
+        return self._request_extraction(content)
+    
+    def _image_content(self, image_bytes: bytes, mime_type: str) -> Dict[str, Any]:
+        if current_app.config.get('IMAGE_PREPROCESS_ENABLED', True):
+            try:
+                with timed_stage('preprocess'):
+                    image_bytes, mime_type, stats = prepare_image(
+                        image_bytes,
+                        mime_type,
+                        max_edge=current_app.config.get('IMAGE_MAX_EDGE', 2048),
+                        grayscale=current_app.config.get('IMAGE_GRAYSCALE', True),
+                        quality=current_app.config.get('IMAGE_JPEG_QUALITY', 80)
+                    )
+                self.last_image_stats.append(stats)
+                current_app.logger.info(f"Image pre-processing: {stats}")
+            except Exception as e:
+                current_app.logger.warning(f"Image pre-processing failed, sending original: {str(e)}")
+        
+        with timed_stage('encode'):
+            encoded = base64.b64encode(image_bytes).decode('utf-8')
+        return {
+            "type": "image_url",
+            "image_url": {
+                "url": f"data:{mime_type};base64,{encoded}",
+                "detail": current_app.config.get('OPENAI_IMAGE_DETAIL', 'auto')
+            }
+        }
+    
+    def _cache_version(self, file_type: str) -> str:
+        if file_type == 'txt' or not current_app.config.get('IMAGE_PREPROCESS_ENABLED', True):
+            return self.PROMPT_VERSION
+        # Pre-processing settings change what the model sees, so tuning them
+        # must not be answered from results cached under other settings.
+        return ':'.join(str(part) for part in (
+            self.PROMPT_VERSION,
+            current_app.config.get('IMAGE_MAX_EDGE', 2048),
+            int(current_app.config.get('IMAGE_GRAYSCALE', True)),
+            current_app.config.get('IMAGE_JPEG_QUALITY', 80),
+            current_app.config.get('OPENAI_IMAGE_DETAIL', 'auto')
+        ))
+    
+    def _request_extraction(self, user_content, system_prompt: Optional[str] = None) -> Dict[str, Any]:
+        system_prompt = system_prompt or self._get_extraction_prompt()
+        try:
+            result = self._timed_extract(self.backend, system_prompt, user_content)
+            self.last_backend = self.backend.name
+            self._answered_by.add(self.model)
+            return result
+        except BackendUnavailable as e:
+            fallback = current_app.config.get('EXTRACTION_FALLBACK_BACKEND', 'openai')
+            if not fallback or fallback == self.backend.name:
+                raise ValueError(str(e))
+            current_app.logger.info(f"{str(e)}, falling back to the {fallback} backend")
+        
+        fallback_backend = get_extraction_backend(fallback)
+        result = self._timed_extract(fallback_backend, system_prompt, user_content)
+        self.last_backend = fallback
+        self._answered_by.add(fallback_backend.model)
         return result
     
+    def _timed_extract(self, backend, system_prompt: str, user_content) -> Dict[str, Any]:
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            result = backend.extract(system_prompt, user_content)
+            outcome = 'success'
+            return result
+        except BackendUnavailable:
+            outcome = 'unavailable'
+            raise
+        finally:
+            EXTRACTION_SECONDS.labels(backend.name, outcome).observe(time.perf_counter() - started)
+    
     def _get_extraction_prompt(self) -> str:
         return """You are an expert at extracting structured data from invoices. 
         Extract the following information and return ONLY valid JSON:
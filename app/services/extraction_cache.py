@@ -0,0 +1,175 @@
+import json
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models.extraction_cache import ExtractionCacheEntry
+from app.services.metrics import EXTRACTION_CACHE_EVENTS
+from app.services.upload_buffer import open_source
+
+
+class ExtractionCache:
+    _lock = threading.Lock()
+    _counters = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+    _last_eviction = None
+
+    def __init__(self):
+        self.enabled = current_app.config.get('EXTRACTION_CACHE_ENABLED', True)
+        self.ttl = current_app.config.get('EXTRACTION_CACHE_TTL', 30 * 24 * 3600)
+        self.max_entries = current_app.config.get('EXTRACTION_CACHE_MAX_ENTRIES', 10000)
+        self.evict_interval = current_app.config.get('EXTRACTION_CACHE_EVICT_INTERVAL', 300)
+
+    @staticmethod
+    def hash_file(source, chunk_size: int = 1024 * 1024) -> str:
+        digest = hashlib.sha256()
+        with open_source(source) as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_key(file_hash: str, model: str, prompt_version: str) -> str:
+        return hashlib.sha256(f"{file_hash}:{model}:{prompt_version}".encode('utf-8')).hexdigest()
+
+    @classmethod
+    def _incr(cls, name: str, amount: int = 1) -> None:
+        with cls._lock:
+            cls._counters[name] += amount
+        EXTRACTION_CACHE_EVENTS.labels(name).inc(amount)
+
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+
+        try:
+            entry = db.session.get(ExtractionCacheEntry, cache_key)
+            now = datetime.now(timezone.utc)
+
+            if entry is None:
+                self._incr('misses')
+                return None
+
+            created_at = entry.CreatedAt.replace(tzinfo=timezone.utc) if entry.CreatedAt.tzinfo is None else entry.CreatedAt
+            if created_at < now - timedelta(seconds=self.ttl):
+                db.session.delete(entry)
+                db.session.commit()
+                self._incr('misses')
+                self._incr('evictions')
+                return None
+
+            entry.HitCount = (entry.HitCount or 0) + 1
+            entry.LastAccessedAt = now
+            result = entry.result_data
+            db.session.commit()
+            self._incr('hits')
+            return result
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning(f"Extraction cache lookup failed: {str(e)}")
+            self._incr('misses')
+            return None
+
+    def set(self, cache_key: str, file_hash: str, model: str, prompt_version: str, result: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+
+        try:
+            entry = db.session.get(ExtractionCacheEntry, cache_key)
+            if entry is None:
+                db.session.add(ExtractionCacheEntry(
+                    CacheKey=cache_key,
+                    FileHash=file_hash,
+                    Model=model,
+                    PromptVersion=prompt_version,
+                    Result=json.dumps(result)
+                ))
+            else:
+                # Forced re-extraction replaces the stored result.
+                now = datetime.now(timezone.utc)
+                entry.Result = json.dumps(result)
+                entry.CreatedAt = now
+                entry.LastAccessedAt = now
+            db.session.commit()
+            self._incr('writes')
+        except IntegrityError:
+            # A concurrent request already cached the same document.
+            db.session.rollback()
+            return
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning(f"Extraction cache write failed: {str(e)}")
+            return
+
+        self._maybe_evict()
+
+    def _maybe_evict(self) -> None:
+        # Eviction scans the table, so each process runs it at most once per
+        # interval instead of on every upload. get() already ignores expired
+        # entries; this only keeps the table near max_entries.
+        if self.evict_interval <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            last = ExtractionCache._last_eviction
+            if last is not None and now - last < self.evict_interval:
+                return
+            ExtractionCache._last_eviction = now
+        self.evict()
+
+    def evict(self) -> int:
+        try:
+            cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl)
+            evicted = ExtractionCacheEntry.query.filter(
+                ExtractionCacheEntry.CreatedAt < cutoff
+            ).delete(synchronize_session=False)
+
+            overflow = ExtractionCacheEntry.query.count() - self.max_entries
+            if overflow > 0:
+                oldest_keys = db.session.query(ExtractionCacheEntry.CacheKey) \
+                    .order_by(ExtractionCacheEntry.LastAccessedAt.asc()) \
+                    .limit(overflow) \
+                    .subquery()
+                evicted += ExtractionCacheEntry.query.filter(
+                    ExtractionCacheEntry.CacheKey.in_(db.session.query(oldest_keys.c.CacheKey))
+                ).delete(synchronize_session=False)
+
+            db.session.commit()
+            if evicted:
+                self._incr('evictions', evicted)
+            return evicted
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning(f"Extraction cache eviction failed: {str(e)}")
+            return 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+
+        lookups = counters['hits'] + counters['misses']
+        entries, total_hits = db.session.query(
+            func.count(ExtractionCacheEntry.CacheKey),
+            func.coalesce(func.sum(ExtractionCacheEntry.HitCount), 0)
+        ).one()
+
+        return {
+            'enabled': self.enabled,
+            'hits': counters['hits'],
+            'misses': counters['misses'],
+            'writes': counters['writes'],
+            'evictions': counters['evictions'],
+            'hitRate': counters['hits'] / lookups if lookups else 0.0,
+            'entries': entries,
+            'totalHits': int(total_hits),
+            'maxEntries': self.max_entries,
+            'ttl': self.ttl
+        }
+
+
+def get_extraction_cache() -> ExtractionCache:
+    return ExtractionCache()
@@ -0,0 +1,44 @@
+import io
+import time
+from typing import Any, Dict, Tuple
+from PIL import Image, ImageOps
+
+
+def prepare_image(data: bytes, mime_type: str, max_edge: int = 2048, grayscale: bool = True,
+                  quality: int = 80) -> Tuple[bytes, str, Dict[str, Any]]:
+    started = time.perf_counter()
+    with Image.open(io.BytesIO(data)) as original:
+        original_size = original.size
+        # draft() lets the JPEG decoder scale down by 1/2, 1/4 or 1/8 while
+        # decoding, so large phone photos are never fully materialised.
+        if max_edge:
+            original.draft('L' if grayscale else 'RGB', (max_edge, max_edge))
+        image = ImageOps.exif_transpose(original)
+
+        if image.mode in ('RGBA', 'LA', 'PA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGBA', image.size, 'white')
+            image = Image.alpha_composite(background, image)
+        image = image.convert('L' if grayscale else 'RGB')
+
+        if max_edge:
+            image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+
+        output = io.BytesIO()
+        image.save(output, format='JPEG', quality=quality, optimize=True)
+        processed = output.getvalue()
+        processed_size = image.size
+
+    stats = {
+        'originalBytes': len(data),
+        'processedBytes': len(processed),
+        'originalSize': list(original_size),
+        'processedSize': list(processed_size),
+        'ms': round((time.perf_counter() - started) * 1000, 2)
+    }
+    # Small, already compressed images can grow when re-encoded; keep
+    # whichever is smaller.
+    if len(processed) >= len(data):
+        stats.update({'processedBytes': len(data), 'processedSize': list(original_size), 'kept': 'original'})
+        return data, mime_type, stats
+    return processed, 'image/jpeg', stats
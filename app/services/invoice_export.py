@@ -0,0 +1,131 @@
+import csv
+import io
+from datetime import datetime
+from typing import Iterator, List, Mapping
+import orjson
+from sqlalchemy import select
+from app.extensions import db
+from app.json_provider import json_default
+from app.models.sales_order import SalesOrderHeader, SalesOrderDetail
+from app.services.invoice_query import HEADER_FIELDS, apply_invoice_filters
+
+ITEM_EXPORT_FIELDS = ['SalesOrderDetailID', 'ProductName', 'ProductDescription', 'Quantity', 'UnitPrice', 'LineTotal']
+EXPORT_FIELDS = HEADER_FIELDS + ITEM_EXPORT_FIELDS
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+
+def export_statement(filters: Mapping):
+    columns = [getattr(SalesOrderHeader, name) for name in HEADER_FIELDS] + \
+        [getattr(SalesOrderDetail, name) for name in ITEM_EXPORT_FIELDS]
+    stmt = select(*columns).outerjoin(SalesOrderDetail, SalesOrderDetail.SalesOrderID == SalesOrderHeader.SalesOrderID)
+    stmt = apply_invoice_filters(stmt, filters)
+    return stmt.order_by(SalesOrderHeader.SalesOrderID, SalesOrderDetail.SalesOrderDetailID)
+
+
+def iter_export_batches(filters: Mapping, batch_size: int) -> Iterator[List[tuple]]:
+    # yield_per streams from a server-side cursor on Postgres, so only one
+    # batch of joined rows is held in memory at a time.
+    result = db.session.execute(export_statement(filters).execution_options(yield_per=batch_size))
+    try:
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
+
+
+def iter_ndjson(batches: Iterator[List[tuple]]) -> Iterator[bytes]:
+    for batch in batches:
+        yield b''.join(
+            orjson.dumps(dict(zip(EXPORT_FIELDS, row)), default=json_default) + b'\n'
+            for row in batch
+        )
+
+
+def iter_csv(batches: Iterator[List[tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for batch in batches:
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row]
+            for row in batch
+        )
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_parquet(batches: Iterator[List[tuple]]) -> Iterator[bytes]:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Parquet export requires pyarrow. Install it with: pip install 'server[parquet]'")
+
+    types = {
+        'SalesOrderID': pa.int64(), 'SalesOrderDetailID': pa.int64(), 'Quantity': pa.int64(),
+        'OrderDate': pa.date32(), 'DueDate': pa.date32(),
+        'SubTotal': pa.decimal128(14, 2), 'TaxAmount': pa.decimal128(14, 2), 'TotalAmount': pa.decimal128(14, 2),
+        'UnitPrice': pa.decimal128(14, 4), 'LineTotal': pa.decimal128(14, 2),
+        'CreatedAt': pa.timestamp('us'), 'UpdatedAt': pa.timestamp('us')
+    }
+    schema = pa.schema([(name, types.get(name, pa.string())) for name in EXPORT_FIELDS])
+
+    sink = _ChunkSink()
+    # Each batch becomes one row group; bytes are handed to the client as
+    # soon as the writer flushes them instead of building the file in memory.
+    with pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema) as writer:
+        for batch in batches:
+            columns = list(zip(*batch)) if batch else [[] for _ in EXPORT_FIELDS]
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema
+            ))
+            data = sink.drain()
+            if data:
+                yield data
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def export_invoices(export_format: str, filters: Mapping, batch_size: int = 1000) -> Iterator[bytes]:
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{export_format}'. Use one of: {', '.join(EXPORT_FORMATS)}")
+
+    writers = {'ndjson': iter_ndjson, 'csv': iter_csv, 'parquet': iter_parquet}
+    stream = writers[export_format](iter_export_batches(filters, batch_size))
+    # Prime the generator so configuration errors (bad filters, missing
+    # pyarrow) surface before the response starts streaming.
+    first = next(stream, b'')
+    return _chain(first, stream)
+
+
+def _chain(first: bytes, rest: Iterator[bytes]) -> Iterator[bytes]:
+    if first:
+        yield first
+    yield from rest
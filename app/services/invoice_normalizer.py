@@ -0,0 +1,70 @@
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Any, Optional
+from app.services.text_invoice_parser import DATE_FORMATS
+
+# Scales of the NUMERIC columns in app.models.sales_order.
+AMOUNT_PLACES = Decimal('0.01')
+UNIT_PRICE_PLACES = Decimal('0.0001')
+
+ISO_DATE_PREFIX = re.compile(r'^\d{4}-\d{2}-\d{2}')
+AMOUNT_NOISE = re.compile(r'[^\d.\-]')
+
+
+def normalize_date(value: Any) -> Optional[date]:
+    # Model output is usually ISO, but "March 5, 2024", "05/03/2024" and full
+    # timestamps all turn up; anything unparseable becomes None.
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+
+    text = str(value).strip()
+    if not text:
+        return None
+    if ISO_DATE_PREFIX.match(text):
+        try:
+            return date.fromisoformat(text[:10])
+        except ValueError:
+            return None
+    if re.search(r'[A-Za-z]', text):
+        text = ' '.join(text.replace('.', ' ').replace(',', ', ').split()).replace(' ,', ',')
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def normalize_amount(value: Any, places: Decimal = AMOUNT_PLACES) -> Optional[Decimal]:
+    # Accepts numbers and strings such as "$1,234.50" or "(12.00)"; rounds
+    # half-up to the column scale. Anything unparseable becomes None.
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, float):
+        # repr() is the shortest string that round-trips, so 0.1 stays 0.1
+        # instead of its binary expansion.
+        value = repr(value)
+    if isinstance(value, str):
+        text = value.strip()
+        negative = text.startswith('(') and text.endswith(')')
+        text = AMOUNT_NOISE.sub('', text)
+        if negative and not text.startswith('-'):
+            text = '-' + text
+        value = text
+    try:
+        amount = Decimal(value)
+    except (InvalidOperation, ValueError):
+        return None
+    if not amount.is_finite():
+        return None
+    return amount.quantize(places, rounding=ROUND_HALF_UP)
+
+
+def normalize_quantity(value: Any) -> Optional[int]:
+    amount = normalize_amount(value, places=Decimal('1'))
+    return int(amount) if amount is not None else None
@@ -0,0 +1,123 @@
+import base64
+from datetime import date, datetime
+from typing import Optional, Tuple
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import joinedload, lazyload, selectinload, subqueryload
+from app.models.sales_order import SalesOrderHeader
+
+HEADER_FIELDS = [
+    'SalesOrderID', 'OrderDate', 'DueDate', 'CustomerName', 'CustomerAddress',
+    'InvoiceNumber', 'SubTotal', 'TaxAmount', 'TotalAmount', 'Status',
+    'CreatedAt', 'UpdatedAt', 'DocumentPath'
+]
+
+ITEM_LOADERS = {
+    'selectin': selectinload,
+    'joined': joinedload,
+    'subquery': subqueryload,
+    'lazy': lazyload
+}
+
+
+def items_loader(strategy: str):
+    try:
+        return ITEM_LOADERS[strategy](SalesOrderHeader.items)
+    except KeyError:
+        raise ValueError(f"Unknown item loading strategy '{strategy}'")
+
+
+def encode_cursor(created_at: datetime, sales_order_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{sales_order_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        created_at, sales_order_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(sales_order_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def _escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def apply_invoice_filters(query, args):
+    status = args.get('status')
+    if status:
+        statuses = [s.strip() for s in status.split(',') if s.strip()]
+        query = query.filter(SalesOrderHeader.Status.in_(statuses))
+
+    customer = args.get('customer')
+    if customer:
+        query = query.filter(
+            func.lower(SalesOrderHeader.CustomerName).like(f"{_escape_like(customer.lower())}%", escape='\\')
+        )
+
+    invoice_number = args.get('invoiceNumber')
+    if invoice_number:
+        query = query.filter(
+            SalesOrderHeader.InvoiceNumber.like(f"{_escape_like(invoice_number)}%", escape='\\')
+        )
+
+    date_from = args.get('dateFrom')
+    if date_from:
+        query = query.filter(SalesOrderHeader.OrderDate >= parse_date(date_from))
+
+    date_to = args.get('dateTo')
+    if date_to:
+        query = query.filter(SalesOrderHeader.OrderDate <= parse_date(date_to))
+
+    return query
+
+
+def apply_keyset(query, cursor: Optional[str]):
+    if cursor:
+        created_at, sales_order_id = decode_cursor(cursor)
+        query = query.filter(
+            tuple_(SalesOrderHeader.CreatedAt, SalesOrderHeader.SalesOrderID) < tuple_(created_at, sales_order_id)
+        )
+    return query.order_by(SalesOrderHeader.CreatedAt.desc(), SalesOrderHeader.SalesOrderID.desc())
+
+
+def parse_fields(value: Optional[str]) -> Optional[list]:
+    if not value:
+        return None
+    fields = [f.strip() for f in value.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in HEADER_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def parse_limit(value: Optional[str], default: int, maximum: int) -> int:
+    if value is None:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be at least 1')
+    return min(limit, maximum)
+
+
+def parse_offset(value: Optional[str]) -> int:
+    if value is None:
+        return 0
+    try:
+        offset = int(value)
+    except ValueError:
+        raise ValueError('offset must be an integer')
+    if offset < 0:
+        raise ValueError('offset must not be negative')
+    return offset
+
+
+def parse_date(value: str) -> date:
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD")
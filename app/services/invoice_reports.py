@@ -0,0 +1,103 @@
+from typing import Any, Dict, List
+from sqlalchemy import String, cast, func, select
+from app.extensions import db
+from app.models.invoice_rollup import CustomerRollup, InvoiceDailyRollup, ProductRollup
+from app.services.invoice_query import parse_date
+
+# Length of the ISO date prefix that identifies a period.
+GRANULARITIES = {'day': 10, 'month': 7, 'year': 4}
+
+CUSTOMER_SORTS = {
+    'totalAmount': CustomerRollup.TotalAmount,
+    'invoiceCount': CustomerRollup.InvoiceCount
+}
+
+PRODUCT_SORTS = {
+    'revenue': ProductRollup.Revenue,
+    'quantity': ProductRollup.Quantity,
+    'lineCount': ProductRollup.LineCount
+}
+
+
+def _totals():
+    return [
+        func.sum(InvoiceDailyRollup.InvoiceCount).label('invoiceCount'),
+        func.sum(InvoiceDailyRollup.SubTotal).label('subTotal'),
+        func.sum(InvoiceDailyRollup.TaxAmount).label('taxAmount'),
+        func.sum(InvoiceDailyRollup.TotalAmount).label('totalAmount'),
+        func.sum(InvoiceDailyRollup.ItemQuantity).label('itemQuantity')
+    ]
+
+
+def _apply_daily_filters(stmt, args):
+    status = args.get('status')
+    if status:
+        stmt = stmt.where(InvoiceDailyRollup.Status.in_([s.strip() for s in status.split(',') if s.strip()]))
+
+    date_from = args.get('dateFrom')
+    if date_from:
+        stmt = stmt.where(InvoiceDailyRollup.Day >= parse_date(date_from))
+
+    date_to = args.get('dateTo')
+    if date_to:
+        stmt = stmt.where(InvoiceDailyRollup.Day <= parse_date(date_to))
+    return stmt
+
+
+def _row_dict(row) -> Dict[str, Any]:
+    data = dict(row._mapping)
+    for key in ('subTotal', 'taxAmount', 'totalAmount', 'revenue'):
+        if key in data:
+            data[key] = round(float(data[key] or 0), 2)
+    for key in ('invoiceCount', 'itemQuantity', 'quantity', 'lineCount'):
+        if key in data:
+            data[key] = int(data[key] or 0)
+    return data
+
+
+def summary_report(args) -> Dict[str, Any]:
+    row = db.session.execute(_apply_daily_filters(select(*_totals()), args)).one()
+    return _row_dict(row)
+
+
+def revenue_report(granularity: str, args) -> List[Dict[str, Any]]:
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of: {', '.join(GRANULARITIES)}")
+
+    # Both dialects render a DATE cast to text as YYYY-MM-DD.
+    period = func.substr(cast(InvoiceDailyRollup.Day, String), 1, GRANULARITIES[granularity]).label('period')
+    stmt = _apply_daily_filters(select(period, *_totals()), args).group_by(period).order_by(period)
+    return [_row_dict(row) for row in db.session.execute(stmt)]
+
+
+def status_report(args) -> List[Dict[str, Any]]:
+    status = InvoiceDailyRollup.Status.label('status')
+    stmt = _apply_daily_filters(select(status, *_totals()), args).group_by(status).order_by(status)
+    return [_row_dict(row) for row in db.session.execute(stmt)]
+
+
+def customer_report(sort: str, limit: int) -> List[Dict[str, Any]]:
+    if sort not in CUSTOMER_SORTS:
+        raise ValueError(f"sort must be one of: {', '.join(CUSTOMER_SORTS)}")
+
+    stmt = select(
+        CustomerRollup.CustomerName.label('customerName'),
+        CustomerRollup.InvoiceCount.label('invoiceCount'),
+        CustomerRollup.SubTotal.label('subTotal'),
+        CustomerRollup.TaxAmount.label('taxAmount'),
+        CustomerRollup.TotalAmount.label('totalAmount')
+    ).order_by(CUSTOMER_SORTS[sort].desc(), CustomerRollup.CustomerName).limit(limit)
+    return [_row_dict(row) for row in db.session.execute(stmt)]
+
+
+def product_report(sort: str, limit: int) -> List[Dict[str, Any]]:
+    if sort not in PRODUCT_SORTS:
+        raise ValueError(f"sort must be one of: {', '.join(PRODUCT_SORTS)}")
+
+    stmt = select(
+        ProductRollup.ProductName.label('productName'),
+        ProductRollup.LineCount.label('lineCount'),
+        ProductRollup.Quantity.label('quantity'),
+        ProductRollup.Revenue.label('revenue')
+    ).order_by(PRODUCT_SORTS[sort].desc(), ProductRollup.ProductName).limit(limit)
+    return [_row_dict(row) for row in db.session.execute(stmt)]
@@ -0,0 +1,167 @@
+from typing import Dict, Iterable, Tuple
+from sqlalchemy import delete, func, insert, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from app.extensions import db
+from app.models.invoice_rollup import CustomerRollup, InvoiceDailyRollup, ProductRollup
+from app.models.sales_order import SalesOrderHeader, SalesOrderDetail
+
+ROLLUP_DIALECTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert
+}
+
+# Rollup name -> (model, key columns, value columns).
+ROLLUPS = {
+    'daily': (InvoiceDailyRollup, ('Day', 'Status'), ('InvoiceCount', 'SubTotal', 'TaxAmount', 'TotalAmount', 'ItemQuantity')),
+    'customer': (CustomerRollup, ('CustomerName',), ('InvoiceCount', 'SubTotal', 'TaxAmount', 'TotalAmount')),
+    'product': (ProductRollup, ('ProductName',), ('LineCount', 'Quantity', 'Revenue'))
+}
+
+CHUNK_SIZE = 500
+
+Snapshot = Dict[Tuple, list]
+
+
+def rollup_snapshot(sales_order_ids: Iterable[int]) -> Snapshot:
+    # What the given invoices currently contribute to each rollup row. Taking
+    # one before and one after a write (in the same transaction) yields the
+    # exact delta to apply, whatever the write changed.
+    ids = sorted({sales_order_id for sales_order_id in sales_order_ids if sales_order_id is not None})
+    snapshot = {}
+    for start in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[start:start + CHUNK_SIZE]
+        # Locking the headers keeps a concurrent write to the same invoice
+        # from applying its delta against the same "before" state. The item
+        # aggregates come after the lock, so on Postgres they see the same
+        # committed state as the header values it waited for.
+        headers = db.session.execute(
+            select(
+                SalesOrderHeader.SalesOrderID, SalesOrderHeader.OrderDate, SalesOrderHeader.Status,
+                SalesOrderHeader.CustomerName, SalesOrderHeader.SubTotal, SalesOrderHeader.TaxAmount,
+                SalesOrderHeader.TotalAmount
+            )
+            .where(SalesOrderHeader.SalesOrderID.in_(chunk))
+            .with_for_update()
+        ).all()
+        quantities = dict(db.session.execute(
+            select(SalesOrderDetail.SalesOrderID, func.sum(SalesOrderDetail.Quantity))
+            .where(SalesOrderDetail.SalesOrderID.in_(chunk))
+            .group_by(SalesOrderDetail.SalesOrderID)
+        ).all())
+        for row in headers:
+            amounts = [1, row.SubTotal or 0, row.TaxAmount or 0, row.TotalAmount or 0]
+            _add(snapshot, ('daily', row.OrderDate, row.Status),
+                 amounts + [quantities.get(row.SalesOrderID) or 0])
+            _add(snapshot, ('customer', row.CustomerName), amounts)
+
+        products = db.session.execute(
+            select(
+                SalesOrderDetail.ProductName, func.count(), func.sum(SalesOrderDetail.Quantity),
+                func.sum(SalesOrderDetail.LineTotal)
+            )
+            .where(SalesOrderDetail.SalesOrderID.in_(chunk))
+            .group_by(SalesOrderDetail.ProductName)
+        ).all()
+        for product_name, line_count, quantity, revenue in products:
+            _add(snapshot, ('product', product_name), [line_count, quantity or 0, revenue or 0])
+    return snapshot
+
+
+def update_rollups(before: Snapshot, after: Snapshot) -> None:
+    deltas = {}
+    for key in before.keys() | after.keys():
+        old = before.get(key)
+        new = after.get(key)
+        if old is None:
+            delta = list(new)
+        elif new is None:
+            delta = [-value for value in old]
+        else:
+            delta = [n - o for n, o in zip(new, old)]
+        if any(delta):
+            deltas.setdefault(key[0], []).append((key[1:], delta))
+
+    for name, changes in deltas.items():
+        model, key_columns, value_columns = ROLLUPS[name]
+        # A fixed row order keeps concurrent transactions from deadlocking on
+        # each other's rollup rows.
+        rows = [
+            {**dict(zip(key_columns, key)), **dict(zip(value_columns, delta))}
+            for key, delta in sorted(changes, key=lambda change: tuple(str(part) for part in change[0]))
+        ]
+        for start in range(0, len(rows), CHUNK_SIZE):
+            db.session.execute(_increment(model, key_columns, value_columns, rows[start:start + CHUNK_SIZE]))
+
+        # Only rows whose count went down can have emptied, and the lookup by
+        # primary key avoids scanning the rollup for unindexed zero counts.
+        emptied = [key for key, delta in changes if delta[0] < 0]
+        count_column = getattr(model, value_columns[0])
+        columns = [getattr(model, column) for column in key_columns]
+        if len(columns) == 1:
+            key_expression, emptied = columns[0], [key[0] for key in emptied]
+        else:
+            key_expression = tuple_(*columns)
+        for start in range(0, len(emptied), CHUNK_SIZE):
+            db.session.execute(
+                delete(model)
+                .where(key_expression.in_(emptied[start:start + CHUNK_SIZE]))
+                .where(count_column <= 0)
+                .execution_options(synchronize_session=False)
+            )
+
+
+def rebuild_rollups() -> None:
+    # Recomputes every rollup from the invoice tables, for the first deploy
+    # on an existing database or after editing invoices outside the API.
+    for model, _, _ in ROLLUPS.values():
+        db.session.execute(delete(model))
+
+    quantities = select(
+        SalesOrderDetail.SalesOrderID, func.sum(SalesOrderDetail.Quantity).label('quantity')
+    ).group_by(SalesOrderDetail.SalesOrderID).subquery()
+    db.session.execute(insert(InvoiceDailyRollup).from_select(
+        ['Day', 'Status', 'InvoiceCount', 'SubTotal', 'TaxAmount', 'TotalAmount', 'ItemQuantity'],
+        select(
+            SalesOrderHeader.OrderDate, SalesOrderHeader.Status, func.count(), func.coalesce(func.sum(SalesOrderHeader.SubTotal), 0),
+            func.coalesce(func.sum(SalesOrderHeader.TaxAmount), 0),
+            func.coalesce(func.sum(SalesOrderHeader.TotalAmount), 0),
+            func.coalesce(func.sum(quantities.c.quantity), 0)
+        )
+        .select_from(SalesOrderHeader)
+        .outerjoin(quantities, quantities.c.SalesOrderID == SalesOrderHeader.SalesOrderID)
+        .group_by(SalesOrderHeader.OrderDate, SalesOrderHeader.Status)
+    ))
+    db.session.execute(insert(CustomerRollup).from_select(
+        ['CustomerName', 'InvoiceCount', 'SubTotal', 'TaxAmount', 'TotalAmount'],
+        select(
+            SalesOrderHeader.CustomerName, func.count(), func.coalesce(func.sum(SalesOrderHeader.SubTotal), 0),
+            func.coalesce(func.sum(SalesOrderHeader.TaxAmount), 0),
+            func.coalesce(func.sum(SalesOrderHeader.TotalAmount), 0)
+        ).group_by(SalesOrderHeader.CustomerName)
+    ))
+    db.session.execute(insert(ProductRollup).from_select(
+        ['ProductName', 'LineCount', 'Quantity', 'Revenue'],
+        select(
+            SalesOrderDetail.ProductName, func.count(), func.coalesce(func.sum(SalesOrderDetail.Quantity), 0),
+            func.coalesce(func.sum(SalesOrderDetail.LineTotal), 0)
+        ).group_by(SalesOrderDetail.ProductName)
+    ))
+    db.session.commit()
+
+
+def _add(snapshot: Snapshot, key: Tuple, values: list) -> None:
+    current = snapshot.get(key)
+    snapshot[key] = values if current is None else [a + b for a, b in zip(current, values)]
+
+
+def _increment(model, key_columns, value_columns, rows):
+    dialect = db.session.get_bind(mapper=model).dialect.name
+    if dialect not in ROLLUP_DIALECTS:
+        raise ValueError(f"Invoice rollups are not supported on the '{dialect}' database dialect")
+
+    table = model.__table__
+    stmt = ROLLUP_DIALECTS[dialect](table).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c[column] for column in key_columns],
+        set_={column: table.c[column] + stmt.excluded[column] for column in value_columns}
+    )
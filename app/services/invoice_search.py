@@ -0,0 +1,250 @@
+import re
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import and_, case, delete, func, insert, literal, literal_column, or_, select, text
+from sqlalchemy.dialects import postgresql
+from app.extensions import db
+from app.models.invoice_search import InvoiceSearchDocument, InvoiceSearchTerm
+from app.models.sales_order import SalesOrderHeader, SalesOrderDetail
+
+TOKEN = re.compile(r'[0-9a-z]+')
+
+# Field weights, highest first. On Postgres they map onto tsvector weights
+# A-D; on SQLite they are summed per matching term.
+FIELD_WEIGHTS = {
+    'InvoiceNumber': 4.0,
+    'CustomerName': 3.0,
+    'ProductName': 2.0,
+    'CustomerAddress': 1.0,
+    'ProductDescription': 1.0
+}
+
+# Prefix and typo matches rank below the exact term.
+PARTIAL_MATCH_FACTOR = 0.5
+# Shorter tokens have too many one-edit neighbours to be worth correcting.
+FUZZY_MIN_LENGTH = 4
+MAX_QUERY_TOKENS = 8
+MAX_TERM_LENGTH = 100
+
+CHUNK_SIZE = 500
+
+
+def tokenize(value) -> List[str]:
+    return [token[:MAX_TERM_LENGTH] for token in TOKEN.findall(str(value or '').lower())]
+
+
+def refresh_search_index(sales_order_ids: Iterable[int]) -> None:
+    # Re-indexes the given invoices inside the caller's transaction, so the
+    # index commits (or rolls back) together with the write that changed them.
+    ids = sorted({sales_order_id for sales_order_id in sales_order_ids if sales_order_id is not None})
+    if not ids:
+        return
+    refresh = _dialect_handler(REFRESH_DIALECTS)
+    for start in range(0, len(ids), CHUNK_SIZE):
+        refresh(ids[start:start + CHUNK_SIZE])
+
+
+def rebuild_search_index(batch_size: int = 1000) -> int:
+    # Re-indexes every invoice, for the first deploy on an existing database
+    # or after editing invoices outside the API.
+    db.session.execute(delete(InvoiceSearchDocument))
+    db.session.execute(delete(InvoiceSearchTerm))
+    indexed = 0
+    last_id = 0
+    while True:
+        ids = db.session.execute(
+            select(SalesOrderHeader.SalesOrderID)
+            .where(SalesOrderHeader.SalesOrderID > last_id)
+            .order_by(SalesOrderHeader.SalesOrderID)
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        refresh_search_index(ids)
+        indexed += len(ids)
+        last_id = ids[-1]
+    db.session.commit()
+    return indexed
+
+
+def search_invoices(query: str, limit: int, offset: int = 0,
+                    max_candidates: int = 2000) -> List[Tuple[int, float]]:
+    # Returns (SalesOrderID, score) pairs, best first. Every query token must
+    # match some indexed field, as a whole word, a word prefix or a near miss.
+    # Queries matching more than max_candidates invoices rank a sample of
+    # that size instead of every match.
+    tokens = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TOKENS]
+    if not tokens:
+        raise ValueError('q must contain at least one letter or digit')
+    return _dialect_handler(SEARCH_DIALECTS)(tokens, limit, offset, max_candidates)
+
+
+def _dialect_handler(handlers):
+    dialect = db.session.get_bind(mapper=SalesOrderHeader).dialect.name
+    if dialect not in handlers:
+        raise ValueError(f"Invoice search is not supported on the '{dialect}' database dialect")
+    return handlers[dialect]
+
+
+def _refresh_postgresql(ids: List[int]) -> None:
+    items = select(
+        SalesOrderDetail.SalesOrderID,
+        func.string_agg(SalesOrderDetail.ProductName, literal(' ')).label('names'),
+        func.string_agg(SalesOrderDetail.ProductDescription, literal(' ')).label('descriptions')
+    ).where(SalesOrderDetail.SalesOrderID.in_(ids)).group_by(SalesOrderDetail.SalesOrderID).subquery()
+
+    # setweight takes a "char", which a bound VARCHAR parameter does not match.
+    def weighted(value, weight):
+        return func.setweight(func.to_tsvector('simple', func.coalesce(value, '')), literal_column(f"'{weight}'"))
+
+    header = SalesOrderHeader
+    document = func.concat_ws(
+        ' ', header.InvoiceNumber, header.CustomerName, header.CustomerAddress, items.c.names, items.c.descriptions
+    )
+    vector = weighted(header.InvoiceNumber, 'A') \
+        .op('||')(weighted(header.CustomerName, 'B')) \
+        .op('||')(weighted(items.c.names, 'C')) \
+        .op('||')(weighted(func.concat_ws(' ', header.CustomerAddress, items.c.descriptions), 'D'))
+
+    table = InvoiceSearchDocument.__table__
+    stmt = postgresql.insert(table).from_select(
+        ['SalesOrderID', 'Document', 'SearchVector'],
+        select(header.SalesOrderID, document, vector)
+        .outerjoin(items, items.c.SalesOrderID == header.SalesOrderID)
+        .where(header.SalesOrderID.in_(ids))
+    )
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.SalesOrderID],
+        set_={'Document': stmt.excluded.Document, 'SearchVector': stmt.excluded.SearchVector}
+    ))
+    db.session.execute(
+        delete(InvoiceSearchDocument)
+        .where(InvoiceSearchDocument.SalesOrderID.in_(ids))
+        .where(~select(header.SalesOrderID).where(header.SalesOrderID == InvoiceSearchDocument.SalesOrderID).exists())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _refresh_sqlite(ids: List[int]) -> None:
+    weights: Dict[Tuple[str, int], float] = {}
+
+    def add(sales_order_id, field, value):
+        weight = FIELD_WEIGHTS[field]
+        for term in tokenize(value):
+            key = (term, sales_order_id)
+            if weights.get(key, 0) < weight:
+                weights[key] = weight
+
+    headers = db.session.execute(
+        select(
+            SalesOrderHeader.SalesOrderID, SalesOrderHeader.InvoiceNumber,
+            SalesOrderHeader.CustomerName, SalesOrderHeader.CustomerAddress
+        ).where(SalesOrderHeader.SalesOrderID.in_(ids))
+    ).all()
+    for row in headers:
+        add(row.SalesOrderID, 'InvoiceNumber', row.InvoiceNumber)
+        add(row.SalesOrderID, 'CustomerName', row.CustomerName)
+        add(row.SalesOrderID, 'CustomerAddress', row.CustomerAddress)
+
+    items = db.session.execute(
+        select(SalesOrderDetail.SalesOrderID, SalesOrderDetail.ProductName, SalesOrderDetail.ProductDescription)
+        .where(SalesOrderDetail.SalesOrderID.in_(ids))
+    ).all()
+    for row in items:
+        add(row.SalesOrderID, 'ProductName', row.ProductName)
+        add(row.SalesOrderID, 'ProductDescription', row.ProductDescription)
+
+    db.session.execute(
+        delete(InvoiceSearchTerm)
+        .where(InvoiceSearchTerm.SalesOrderID.in_(ids))
+        .execution_options(synchronize_session=False)
+    )
+    if weights:
+        db.session.execute(insert(InvoiceSearchTerm.__table__), [
+            {'Term': term, 'SalesOrderID': sales_order_id, 'Weight': weight}
+            for (term, sales_order_id), weight in weights.items()
+        ])
+
+
+def _search_postgresql(tokens: List[str], limit: int, offset: int, max_candidates: int) -> List[Tuple[int, float]]:
+    # Caps how many rows each GIN index scan returns, for the rest of the
+    # transaction only.
+    db.session.execute(select(func.set_config('gin_fuzzy_search_limit', str(max_candidates), True)))
+    # Tokens are plain [0-9a-z] runs, so they are safe to splice into a tsquery.
+    tsquery = func.to_tsquery('simple', ' & '.join(f'{token}:*' for token in tokens))
+    phrase = literal(' '.join(tokens))
+    document = InvoiceSearchDocument
+    score = (func.ts_rank(document.SearchVector, tsquery) + func.word_similarity(phrase, document.Document)).label('score')
+    # The trigram leg (<%, word similarity above pg_trgm's threshold) catches
+    # typos the prefix tsquery misses; both legs are GIN-indexed.
+    stmt = select(document.SalesOrderID, score) \
+        .where(or_(document.SearchVector.op('@@')(tsquery), phrase.op('<%')(document.Document))) \
+        .order_by(text('score DESC'), document.SalesOrderID.desc()) \
+        .limit(limit).offset(offset)
+    return [(row.SalesOrderID, float(row.score)) for row in db.session.execute(stmt)]
+
+
+def _search_sqlite(tokens: List[str], limit: int, offset: int, max_candidates: int) -> List[Tuple[int, float]]:
+    term = InvoiceSearchTerm.Term
+    conditions = []
+    for token in tokens:
+        # A range on the primary key is an index seek, unlike LIKE 'x%'.
+        condition = and_(term >= token, term < token + '\uffff')
+        if len(token) >= FUZZY_MIN_LENGTH:
+            condition = or_(condition, term.in_(_one_edit_variants(token)))
+        conditions.append(condition)
+
+    # Candidates come from the rarest token, counted no further than the cap,
+    # so a common token like "inv" never has its whole posting list scanned.
+    counts = [
+        db.session.execute(
+            select(func.count()).select_from(
+                select(InvoiceSearchTerm.SalesOrderID).where(condition).limit(max_candidates + 1).subquery()
+            )
+        ).scalar()
+        for condition in conditions
+    ]
+    rarest = conditions[counts.index(min(counts))]
+    candidates = select(InvoiceSearchTerm.SalesOrderID).where(rarest).limit(max_candidates).scalar_subquery()
+
+    # Each token is checked on its own: one indexed term can satisfy several
+    # tokens, as "acme" does for both "acme" and "acm".
+    every_token = and_(*[func.sum(case((condition, 1), else_=0)) > 0 for condition in conditions])
+    weight = case((term.in_(tokens), InvoiceSearchTerm.Weight), else_=InvoiceSearchTerm.Weight * PARTIAL_MATCH_FACTOR)
+    score = func.sum(weight).label('score')
+    stmt = select(InvoiceSearchTerm.SalesOrderID, score) \
+        .where(InvoiceSearchTerm.SalesOrderID.in_(candidates), or_(*conditions)) \
+        .group_by(InvoiceSearchTerm.SalesOrderID) \
+        .having(every_token) \
+        .order_by(text('score DESC'), InvoiceSearchTerm.SalesOrderID.desc()) \
+        .limit(limit).offset(offset)
+    return [(row.SalesOrderID, float(row.score)) for row in db.session.execute(stmt)]
+
+
+def _one_edit_variants(token: str) -> List[str]:
+    # Every string one deletion, transposition, substitution or insertion
+    # away; looked up exactly, so each is a primary-key probe.
+    letters = '0123456789abcdefghijklmnopqrstuvwxyz'
+    splits = [(token[:i], token[i:]) for i in range(len(token) + 1)]
+    variants = set()
+    for left, right in splits:
+        if right:
+            variants.add(left + right[1:])
+            for letter in letters:
+                variants.add(left + letter + right[1:])
+        if len(right) > 1:
+            variants.add(left + right[1] + right[0] + right[2:])
+        for letter in letters:
+            variants.add(left + letter + right)
+    variants.discard(token)
+    return sorted(variants)
+
+
+REFRESH_DIALECTS = {
+    'postgresql': _refresh_postgresql,
+    'sqlite': _refresh_sqlite
+}
+
+SEARCH_DIALECTS = {
+    'postgresql': _search_postgresql,
+    'sqlite': _search_sqlite
+}
@@ -0,0 +1,58 @@
+from itertools import groupby
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from sqlalchemy import select
+from app.extensions import db
+from app.models.sales_order import SalesOrderHeader, SalesOrderDetail
+from app.services.invoice_query import HEADER_FIELDS
+
+ITEM_FIELDS = [
+    'SalesOrderDetailID', 'SalesOrderID', 'ProductName', 'ProductDescription',
+    'Quantity', 'UnitPrice', 'LineTotal'
+]
+
+# Columns the keyset cursor needs even when the caller did not ask for them.
+CURSOR_FIELDS = ['SalesOrderID', 'CreatedAt']
+
+
+def header_select(fields: Optional[List[str]] = None):
+    names = list(fields or HEADER_FIELDS)
+    names += [name for name in CURSOR_FIELDS if name not in names]
+    return select(*[getattr(SalesOrderHeader, name) for name in names])
+
+
+def rows_to_dicts(rows: Iterable, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    # Rows carry raw column values; datetimes are left for the JSON provider
+    # to encode rather than calling isoformat() per row here. header_select
+    # puts the requested columns first, so zip() drops the cursor extras.
+    names = fields or HEADER_FIELDS
+    return [dict(zip(names, row)) for row in rows]
+
+
+def fetch_items(sales_order_ids: List[int], chunk_size: int = 1000) -> Dict[int, List[Dict[str, Any]]]:
+    columns = [getattr(SalesOrderDetail, name) for name in ITEM_FIELDS]
+    items = {}
+    # Chunked so very large id lists stay under driver bind-parameter limits.
+    for start in range(0, len(sales_order_ids), chunk_size):
+        stmt = select(*columns) \
+            .where(SalesOrderDetail.SalesOrderID.in_(sales_order_ids[start:start + chunk_size])) \
+            .order_by(SalesOrderDetail.SalesOrderID, SalesOrderDetail.SalesOrderDetailID)
+        for sales_order_id, rows in groupby(db.session.execute(stmt), key=lambda row: row.SalesOrderID):
+            items[sales_order_id] = [dict(zip(ITEM_FIELDS, row)) for row in rows]
+    return items
+
+
+def attach_items(invoices: List[Dict[str, Any]], sales_order_ids: List[int]) -> None:
+    items = fetch_items(sales_order_ids)
+    for invoice, sales_order_id in zip(invoices, sales_order_ids):
+        invoice['items'] = items.get(sales_order_id, [])
+
+
+def iter_json_array(values: Iterable[Any], dumps) -> Iterator[bytes]:
+    yield b'['
+    first = True
+    for value in values:
+        if not first:
+            yield b','
+        yield dumps(value)
+        first = False
+    yield b']'
@@ -0,0 +1,50 @@
+from typing import Any, Dict, List
+
+HEADER_KEYS = ['invoiceNumber', 'orderDate', 'dueDate', 'customerName', 'customerAddress']
+TOTAL_KEYS = ['subTotal', 'taxAmount', 'totalAmount']
+
+PAGE_PROMPT = """
+        You are given a single page of a document. The document may hold several invoices, or one
+        invoice spread over several pages. Extract only what appears on this page.
+        Also return "continuesPreviousPage": true when the page continues an invoice started on an
+        earlier page (no invoice header of its own, "continued", "page 2 of 3" and similar), otherwise false."""
+
+
+def starts_new_invoice(current: Dict[str, Any], page: Dict[str, Any]) -> bool:
+    number = (page.get('invoiceNumber') or '').strip()
+    current_number = (current.get('invoiceNumber') or '').strip()
+    if number and current_number:
+        return number != current_number
+    if page.get('continuesPreviousPage'):
+        return False
+    # A page without header details of its own continues the current invoice.
+    return bool(number or page.get('customerName'))
+
+
+def is_blank(page: Dict[str, Any]) -> bool:
+    return not page.get('items') and not any(page.get(key) for key in HEADER_KEYS + TOTAL_KEYS)
+
+
+def merge_pages(pages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    invoices = []
+    current = None
+    for page in pages:
+        if is_blank(page):
+            continue
+
+        if current is None or starts_new_invoice(current, page):
+            current = {key: page.get(key) for key in HEADER_KEYS + TOTAL_KEYS}
+            current['items'] = list(page.get('items') or [])
+            invoices.append(current)
+            continue
+
+        for key in HEADER_KEYS:
+            if not current.get(key) and page.get(key):
+                current[key] = page[key]
+        # Totals are printed on the last page of an invoice, so later pages win.
+        for key in TOTAL_KEYS:
+            if page.get(key) not in (None, ''):
+                current[key] = page[key]
+        current['items'].extend(page.get('items') or [])
+
+    return invoices
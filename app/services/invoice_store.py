@@ -0,0 +1,169 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import String, bindparam, delete, func, insert, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from app.extensions import db
+from app.models.sales_order import SalesOrderHeader, SalesOrderDetail
+from app.services.invoice_normalizer import UNIT_PRICE_PLACES, normalize_amount, normalize_date, normalize_quantity
+from app.services.invoice_rollups import rollup_snapshot, update_rollups
+from app.services.invoice_search import refresh_search_index
+from app.services.response_cache import invalidate_invoices
+
+UPSERT_DIALECTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert
+}
+
+# Bounded so a large batch stays under driver bind-parameter limits.
+UPSERT_CHUNK_SIZE = 500
+
+
+def save_invoice(data: dict, document_path: Optional[str]) -> int:
+    return save_invoices([(data, document_path)])[0]
+
+
+def save_invoices(records: List[Tuple[dict, Optional[str]]]) -> List[int]:
+    if not records:
+        return []
+
+    try:
+        now = datetime.now(timezone.utc)
+        headers = [_header_row(data, document_path, now) for data, document_path in records]
+
+        # ON CONFLICT cannot touch the same row twice in one statement, so
+        # duplicate invoice numbers collapse to the last record, matching the
+        # result of uploading them one after another.
+        numbered = {}
+        unnumbered = []
+        for index, header in enumerate(headers):
+            if header['InvoiceNumber']:
+                numbered[header['InvoiceNumber']] = index
+            else:
+                unnumbered.append(index)
+
+        ids = [None] * len(records)
+        latest = {}
+        numbers = list(numbered)
+        _lock_invoice_numbers(numbers)
+        # Rollups move by the difference between what these invoices
+        # contributed before the save and what they contribute after it.
+        existing = []
+        for start in range(0, len(numbers), UPSERT_CHUNK_SIZE):
+            existing += db.session.execute(
+                select(SalesOrderHeader.SalesOrderID)
+                .where(SalesOrderHeader.InvoiceNumber.in_(numbers[start:start + UPSERT_CHUNK_SIZE]))
+            ).scalars().all()
+        before = rollup_snapshot(existing)
+
+        for start in range(0, len(numbers), UPSERT_CHUNK_SIZE):
+            rows = [headers[numbered[number]] for number in numbers[start:start + UPSERT_CHUNK_SIZE]]
+            for sales_order_id, invoice_number in db.session.execute(_upsert_headers(rows)):
+                latest[invoice_number] = sales_order_id
+        for index, header in enumerate(headers):
+            if header['InvoiceNumber']:
+                ids[index] = latest[header['InvoiceNumber']]
+
+        if unnumbered:
+            stmt = insert(SalesOrderHeader).returning(SalesOrderHeader.SalesOrderID, sort_by_parameter_order=True)
+            result = db.session.execute(stmt, [headers[index] for index in unnumbered])
+            for index, sales_order_id in zip(unnumbered, result.scalars()):
+                ids[index] = sales_order_id
+
+        # The upsert holds the header row lock until commit, so a concurrent
+        # save of the same invoice waits here instead of interleaving items.
+        replaced = list(latest.values())
+        for start in range(0, len(replaced), UPSERT_CHUNK_SIZE):
+            db.session.execute(
+                delete(SalesOrderDetail)
+                .where(SalesOrderDetail.SalesOrderID.in_(replaced[start:start + UPSERT_CHUNK_SIZE]))
+                .execution_options(synchronize_session=False)
+            )
+
+        winners = set(numbered.values()) | set(unnumbered)
+        items = [
+            _item_row(ids[index], item)
+            for index, (data, _) in enumerate(records) if index in winners
+            for item in data.get('items') or []
+        ]
+        if items:
+            db.session.execute(insert(SalesOrderDetail), items)
+
+        update_rollups(before, rollup_snapshot(ids))
+        refresh_search_index(ids)
+        db.session.commit()
+        invalidate_invoices(ids)
+        return ids
+    except Exception as e:
+        db.session.rollback()
+        raise e
+
+
+def _lock_invoice_numbers(numbers: List[str]) -> None:
+    # Two first uploads of one invoice number would both find no existing
+    # row and take no "before" snapshot; the later upsert then replaces the
+    # earlier writer's items without subtracting them from the rollups.
+    # Holding a lock per number until commit makes the later save see the
+    # committed invoice. SQLite already runs one writer at a time.
+    if not numbers or db.session.get_bind(mapper=SalesOrderHeader).dialect.name != 'postgresql':
+        return
+    # Locks are taken in key order so overlapping batches cannot deadlock;
+    # OFFSET 0 keeps the ordered subquery from being flattened away.
+    db.session.execute(text(
+        'SELECT pg_advisory_xact_lock(key) FROM ('
+        'SELECT DISTINCT hashtext(number) AS key FROM unnest(:numbers) AS number ORDER BY key OFFSET 0'
+        ') AS keys'
+    ).bindparams(bindparam('numbers', value=numbers, type_=postgresql.ARRAY(String)))).all()
+
+
+def _upsert_headers(rows: List[Dict[str, Any]]):
+    dialect = db.session.get_bind(mapper=SalesOrderHeader).dialect.name
+    if dialect not in UPSERT_DIALECTS:
+        raise ValueError(f"Invoice upsert is not supported on the '{dialect}' database dialect")
+
+    table = SalesOrderHeader.__table__
+    stmt = UPSERT_DIALECTS[dialect](table).values(rows)
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.InvoiceNumber],
+        set_={
+            'OrderDate': excluded.OrderDate,
+            'DueDate': func.coalesce(excluded.DueDate, table.c.DueDate),
+            'CustomerName': excluded.CustomerName,
+            'CustomerAddress': func.coalesce(excluded.CustomerAddress, table.c.CustomerAddress),
+            'SubTotal': excluded.SubTotal,
+            'TaxAmount': excluded.TaxAmount,
+            'TotalAmount': excluded.TotalAmount,
+            'DocumentPath': excluded.DocumentPath,
+            'UpdatedAt': excluded.UpdatedAt
+        }
+    ).returning(table.c.SalesOrderID, table.c.InvoiceNumber)
+
+
+def _header_row(data: dict, document_path: Optional[str], now: datetime) -> Dict[str, Any]:
+    return {
+        'OrderDate': normalize_date(data.get('orderDate')) or now.date(),
+        'DueDate': normalize_date(data.get('dueDate')),
+        'CustomerName': data.get('customerName') or '',
+        'CustomerAddress': data.get('customerAddress'),
+        # Missing numbers are stored as NULL so the unique constraint does not
+        # make every number-less invoice collide with the first one.
+        'InvoiceNumber': (data.get('invoiceNumber') or '').strip() or None,
+        'SubTotal': normalize_amount(data.get('subTotal')) or 0,
+        'TaxAmount': normalize_amount(data.get('taxAmount')) or 0,
+        'TotalAmount': normalize_amount(data.get('totalAmount')) or 0,
+        'Status': 'Pending',
+        'CreatedAt': now,
+        'UpdatedAt': now,
+        'DocumentPath': document_path
+    }
+
+
+def _item_row(sales_order_id: int, item: dict) -> Dict[str, Any]:
+    return {
+        'SalesOrderID': sales_order_id,
+        'ProductName': item.get('productName') or '',
+        'ProductDescription': item.get('productDescription') or '',
+        'Quantity': normalize_quantity(item.get('quantity')) or 1,
+        'UnitPrice': normalize_amount(item.get('unitPrice'), UNIT_PRICE_PLACES) or 0,
+        'LineTotal': normalize_amount(item.get('lineTotal')) or 0
+    }
@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import signal
+import threading
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from flask import Flask, current_app
+from app.extensions import db
+from app.models.extraction_job import ExtractionJob
+from app.services.document_extractor import DocumentExtractor
+from app.services.invoice_store import save_invoices
+from app.services.r2_storage import get_r2_storage
+
+
+def enqueue_extraction_job(file_name: str, file_type: str, document_path: str,
+                           document_url: Optional[str] = None, bypass_cache: bool = False,
+                           backend: Optional[str] = None) -> ExtractionJob:
+    job = ExtractionJob(
+        FileName=file_name,
+        FileType=file_type,
+        DocumentPath=document_path,
+        DocumentUrl=document_url,
+        BypassCache=bypass_cache,
+        Backend=backend,
+        Status=ExtractionJob.STATUS_QUEUED
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def claim_jobs(limit: int) -> List[str]:
+    if limit <= 0:
+        return []
+
+    now = datetime.now(timezone.utc)
+    query = ExtractionJob.query.filter_by(Status=ExtractionJob.STATUS_QUEUED) \
+        .order_by(ExtractionJob.CreatedAt.asc()) \
+        .limit(limit)
+
+    if db.engine.dialect.name == 'postgresql':
+        # Row locks with SKIP LOCKED let several worker processes poll the
+        # same table without ever handing one job to two of them.
+        jobs = query.with_for_update(skip_locked=True).all()
+        for job in jobs:
+            job.Status = ExtractionJob.STATUS_RUNNING
+            job.StartedAt = now
+            job.Attempts = (job.Attempts or 0) + 1
+        db.session.commit()
+        return [job.JobID for job in jobs]
+
+    candidate_ids = [job.JobID for job in query.all()]
+    claimed = []
+    for job_id in candidate_ids:
+        updated = ExtractionJob.query.filter_by(
+            JobID=job_id,
+            Status=ExtractionJob.STATUS_QUEUED
+        ).update({
+            ExtractionJob.Status: ExtractionJob.STATUS_RUNNING,
+            ExtractionJob.StartedAt: now,
+            ExtractionJob.Attempts: ExtractionJob.Attempts + 1
+        }, synchronize_session=False)
+        if updated:
+            claimed.append(job_id)
+    db.session.commit()
+    return claimed
+
+
+def requeue_stale_jobs(timeout: int, max_attempts: int) -> int:
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=timeout)
+    stale_jobs = ExtractionJob.query.filter(
+        ExtractionJob.Status == ExtractionJob.STATUS_RUNNING,
+        ExtractionJob.StartedAt < cutoff
+    ).all()
+
+    for job in stale_jobs:
+        if job.Attempts < max_attempts:
+            job.Status = ExtractionJob.STATUS_QUEUED
+            job.StartedAt = None
+        else:
+            job.Status = ExtractionJob.STATUS_FAILED
+            job.Error = f'Extraction did not finish within {timeout}s after {job.Attempts} attempts'
+            job.CompletedAt = datetime.now(timezone.utc)
+    db.session.commit()
+    return len(stale_jobs)
+
+
+def process_job(job_id: str) -> None:
+    job = db.session.get(ExtractionJob, job_id)
+    if job is None or job.Status != ExtractionJob.STATUS_RUNNING:
+        return
+
+    use_r2 = current_app.config.get('USE_R2_STORAGE', False)
+    temp_file_path = None
+
+    try:
+        if use_r2:
+            temp_file_path = get_r2_storage().download_to_temp_file(job.DocumentPath)
+            file_path = temp_file_path
+        else:
+            file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], job.DocumentPath)
+
+        extractor = DocumentExtractor(job.Backend)
+        invoices = extractor.extract_invoices(file_path, job.FileType, bypass_cache=job.BypassCache)
+        sales_order_ids = save_invoices([(invoice, job.DocumentPath) for invoice in invoices])
+
+        job = db.session.get(ExtractionJob, job_id)
+        job.Status = ExtractionJob.STATUS_COMPLETED
+        job.SalesOrderID = sales_order_ids[0]
+        job.Result = json.dumps(invoices)
+        job.TruncatedPages = extractor.last_truncated_pages
+        job.Error = None
+        job.CompletedAt = datetime.now(timezone.utc)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Extraction job {job_id} failed: {str(e)}")
+        job = db.session.get(ExtractionJob, job_id)
+        if job is not None:
+            job.Status = ExtractionJob.STATUS_FAILED
+            job.Error = str(e)
+            job.CompletedAt = datetime.now(timezone.utc)
+            db.session.commit()
+    finally:
+        if temp_file_path and os.path.exists(temp_file_path):
+            try:
+                os.unlink(temp_file_path)
+            except Exception:
+                pass
+
+
+class ExtractionWorker:
+    def __init__(self, app: Flask, concurrency: Optional[int] = None, poll_interval: Optional[float] = None):
+        self.app = app
+        self.concurrency = concurrency or app.config.get('EXTRACTION_WORKER_CONCURRENCY', 4)
+        self.poll_interval = poll_interval or app.config.get('EXTRACTION_WORKER_POLL_INTERVAL', 1.0)
+        self.job_timeout = app.config.get('EXTRACTION_JOB_TIMEOUT', 300)
+        self.max_attempts = app.config.get('EXTRACTION_JOB_MAX_ATTEMPTS', 3)
+        self._stop = threading.Event()
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def stop(self, *args) -> None:
+        self._stop.set()
+
+    def _run_job(self, job_id: str) -> None:
+        try:
+            with self.app.app_context():
+                process_job(job_id)
+        finally:
+            with self._lock:
+                self._in_flight.discard(job_id)
+
+    def _free_slots(self) -> int:
+        with self._lock:
+            return self.concurrency - len(self._in_flight)
+
+    def run(self) -> None:
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        self.app.logger.info(f"Extraction worker started with concurrency {self.concurrency}")
+        last_stale_check = 0.0
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='extraction') as executor:
+            while not self._stop.is_set():
+                claimed = []
+                try:
+                    with self.app.app_context():
+                        if time.monotonic() - last_stale_check >= self.job_timeout / 2:
+                            requeue_stale_jobs(self.job_timeout, self.max_attempts)
+                            last_stale_check = time.monotonic()
+                        # Only claim what can start right away so queued jobs
+                        # stay visible to other worker processes.
+                        claimed = claim_jobs(self._free_slots())
+                except Exception as e:
+                    self.app.logger.error(f"Failed to poll extraction queue: {str(e)}")
+
+                for job_id in claimed:
+                    with self._lock:
+                        self._in_flight.add(job_id)
+                    executor.submit(self._run_job, job_id)
+
+                if not claimed:
+                    self._stop.wait(self.poll_interval)
+
+        self.app.logger.info("Extraction worker stopped")
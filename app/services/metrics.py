@@ -0,0 +1,196 @@
+import os
+import time
+from contextlib import contextmanager
+from flask import Flask, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.database import TimedQueuePool
+from app.extensions import db
+
+# Spans millisecond DB statements up to multi-minute model calls.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# A free pooled connection is handed out in microseconds; anything slower
+# is a new connection being opened or a thread queuing for one.
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency',
+    ['method', 'endpoint', 'status'], buckets=LATENCY_BUCKETS
+)
+STAGE_SECONDS = Histogram(
+    'invoice_stage_duration_seconds', 'Time spent in each stage of an upload or extraction',
+    ['stage'], buckets=LATENCY_BUCKETS
+)
+EXTRACTION_SECONDS = Histogram(
+    'extraction_backend_duration_seconds', 'Extraction backend call latency',
+    ['backend', 'outcome'], buckets=LATENCY_BUCKETS
+)
+OPENAI_REQUEST_SECONDS = Histogram(
+    'openai_request_duration_seconds', 'Latency of each OpenAI request attempt',
+    ['model', 'outcome'], buckets=LATENCY_BUCKETS
+)
+OPENAI_TOKENS = Counter('openai_tokens', 'Tokens consumed by OpenAI requests', ['model', 'kind'])
+OPENAI_RETRIES = Counter('openai_retries', 'OpenAI request retries', ['model', 'error'])
+EXTRACTION_CACHE_EVENTS = Counter('extraction_cache_events', 'Extraction cache lookups and writes', ['event'])
+RESPONSE_CACHE_EVENTS = Counter(
+    'response_cache_events', 'Invoice response cache lookups, 304s and invalidations', ['event']
+)
+R2_REQUEST_SECONDS = Histogram(
+    'r2_request_duration_seconds', 'R2 API call latency',
+    ['operation', 'status'], buckets=LATENCY_BUCKETS
+)
+DB_QUERY_SECONDS = Histogram(
+    'db_query_duration_seconds', 'Database statement latency',
+    ['statement'], buckets=LATENCY_BUCKETS
+)
+# Gauges sum over live worker processes, so they read as host-wide totals.
+DB_POOL_CHECKED_OUT = Gauge(
+    'db_pool_checked_out_connections', 'Connections currently checked out of the pool',
+    ['bind'], multiprocess_mode='livesum'
+)
+DB_POOL_OVERFLOW = Gauge(
+    'db_pool_overflow_connections', 'Connections open beyond pool_size',
+    ['bind'], multiprocess_mode='livesum'
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    'db_pool_wait_seconds', 'Time spent getting a connection from the pool',
+    ['bind'], buckets=POOL_WAIT_BUCKETS
+)
+DB_POOL_CHECKOUT_FAILURES = Counter(
+    'db_pool_checkout_failures', 'Pool checkouts that timed out or could not connect', ['bind']
+)
+
+
+def multiprocess_enabled() -> bool:
+    return bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+
+
+def observe_stage(name: str, seconds: float) -> None:
+    STAGE_SECONDS.labels(name).observe(seconds)
+
+
+@contextmanager
+def timed_stage(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - started)
+
+
+def render_metrics():
+    # Under gunicorn every worker writes its samples to PROMETHEUS_MULTIPROC_DIR,
+    # so whichever worker serves the scrape reports the sum over all of them.
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int) -> None:
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(pid)
+
+
+def instrument_r2_client(client) -> None:
+    client.meta.events.register('before-call.s3', _r2_before_call)
+    client.meta.events.register('after-call.s3', _r2_after_call)
+
+
+def _r2_before_call(context, **kwargs):
+    context['metrics_started'] = time.perf_counter()
+
+
+def _r2_after_call(http_response, model, context, **kwargs):
+    started = context.pop('metrics_started', None)
+    if started is not None:
+        status = getattr(http_response, 'status_code', None) or 'error'
+        R2_REQUEST_SECONDS.labels(model.name, str(status)).observe(time.perf_counter() - started)
+
+
+def instrument_db_pool(engine, bind: str) -> None:
+    pool = engine.pool
+    if not isinstance(pool, TimedQueuePool):
+        return
+    pool.bind_name = bind
+
+    # engine.pool rather than pool: dispose() swaps in a fresh pool.
+    def on_checkout(*args):
+        current = engine.pool
+        DB_POOL_CHECKED_OUT.labels(bind).set(current.checkedout())
+        DB_POOL_OVERFLOW.labels(bind).set(max(0, current.overflow()))
+
+    def on_checkin(*args):
+        # Fires before the connection is handed back, so count it as returned;
+        # when the pool is already full it will be closed, ending an overflow.
+        current = engine.pool
+        overflow = current.overflow() - (1 if current.checkedin() >= current.size() else 0)
+        DB_POOL_CHECKED_OUT.labels(bind).set(max(0, current.checkedout() - 1))
+        DB_POOL_OVERFLOW.labels(bind).set(max(0, overflow))
+
+    event.listen(engine, 'checkout', on_checkout)
+    event.listen(engine, 'checkin', on_checkin)
+
+
+def _observe_pool_wait(bind: str, seconds: float, failed: bool) -> None:
+    DB_POOL_WAIT_SECONDS.labels(bind).observe(seconds)
+    if failed:
+        DB_POOL_CHECKOUT_FAILURES.labels(bind).inc()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('metrics_started')
+    if started:
+        verb = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else 'other'
+        if verb not in ('select', 'insert', 'update', 'delete', 'with'):
+            verb = 'other'
+        DB_QUERY_SECONDS.labels(verb).observe(time.perf_counter() - started.pop())
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('metrics_started'):
+        connection.info['metrics_started'].pop()
+
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+
+
+def _after_request(response):
+    started = g.pop('metrics_started', None)
+    if started is not None:
+        # The URL rule rather than the path keeps ids out of the label values.
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        HTTP_REQUEST_SECONDS.labels(request.method, endpoint, str(response.status_code)).observe(
+            time.perf_counter() - started
+        )
+    return response
+
+
+def init_app(app: Flask) -> None:
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+    TimedQueuePool.on_wait = _observe_pool_wait
+    with app.app_context():
+        for key, engine in db.engines.items():
+            instrument_db_pool(engine, key or 'primary')
+
+    from app.routes.metrics import metrics_bp
+    app.register_blueprint(metrics_bp)
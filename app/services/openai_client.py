@@ -1,10 +1,30 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Optional
+import httpx
+import openai
 from openai import OpenAI
 from flask import current_app
+from app.services.metrics import OPENAI_REQUEST_SECONDS, OPENAI_RETRIES, OPENAI_TOKENS
+from app.services.rate_limiter import get_rate_limiter
+
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+# Vision inputs are billed per image tile rather than by their base64 length.
+IMAGE_TOKENS = {'low': 85}
+DEFAULT_IMAGE_TOKENS = 765
+ESTIMATED_OUTPUT_TOKENS = 1000
 
 
 class OpenAIClient:
     _instance = None
     _client = None
+    _semaphore = None
+    _pid = None
+    _init_lock = threading.Lock()
     
     def __new__(cls):
         if cls._instance is None:
@@ -12,7 +32,7 @@ class OpenAIClient:
         return cls._instance
     
     def __init__(self):
-        if self._client is None:
+        if self._client is None or self._pid != os.getpid():
             self._initialize_client()
     
     def _initialize_client(self):
@@ -21,11 +41,33 @@ class OpenAIClient:
             raise ValueError(
                 "OpenAI API key not configured. Please set OPENAI_API_KEY environment variable."
             )
-        self._client = OpenAI(api_key=api_key)
+        
+        with self._init_lock:
+            if self._client is not None and self._pid == os.getpid():
+                return
+            # Connection pools are not fork-safe, so a forked worker builds its
+            # own instead of reusing sockets inherited from the parent.
+            max_connections = current_app.config.get('OPENAI_MAX_CONCURRENCY', 8)
+            timeout = httpx.Timeout(
+                current_app.config.get('OPENAI_READ_TIMEOUT', 120.0),
+                connect=current_app.config.get('OPENAI_CONNECT_TIMEOUT', 5.0)
+            )
+            limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+            
+            # Retries are handled in chat_completion so they can honour
+            # Retry-After and coordinate with the shared rate limiter.
+            self._client = OpenAI(
+                api_key=api_key,
+                timeout=timeout,
+                max_retries=0,
+                http_client=httpx.Client(timeout=timeout, limits=limits)
+            )
+            self._semaphore = threading.BoundedSemaphore(max_connections)
+            self._pid = os.getpid()
     
     @property
     def client(self) -> OpenAI:
-        if self._client is None:
+        if self._client is None or self._pid != os.getpid():
             self._initialize_client()
         return self._client
     
@@ -36,6 +78,105 @@ class OpenAIClient:
     def is_configured(self) -> bool:
         api_key = current_app.config.get('OPENAI_API_KEY')
         return bool(api_key)
+    
+    def chat_completion(self, **kwargs) -> Any:
+        limiter = get_rate_limiter()
+        estimate = estimate_tokens(kwargs.get('messages', []))
+        attempt = 0
+        while True:
+            limiter.acquire(estimate)
+            started = time.perf_counter()
+            try:
+                with self._semaphore:
+                    response = self.client.chat.completions.create(**kwargs)
+            except Exception as e:
+                _observe_request(kwargs, started, e)
+                delay = _retry_delay(e, attempt) if isinstance(e, RETRYABLE_ERRORS) else None
+                if delay is None:
+                    raise
+                _on_retry(limiter, e, attempt, delay, kwargs)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            _observe_request(kwargs, started)
+            _record_usage(limiter, response, estimate, kwargs)
+            return response
+
+
+def estimate_tokens(messages) -> int:
+    chars = 0
+    tokens = ESTIMATED_OUTPUT_TOKENS
+    for message in messages:
+        content = message.get('content')
+        if isinstance(content, str):
+            chars += len(content)
+            continue
+        for part in content or []:
+            if part.get('type') == 'image_url':
+                tokens += IMAGE_TOKENS.get(part['image_url'].get('detail'), DEFAULT_IMAGE_TOKENS)
+            else:
+                chars += len(part.get('text', ''))
+    return tokens + chars // 4
+
+
+def _retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    if getattr(error, 'code', None) == 'insufficient_quota':
+        return None
+    if attempt >= current_app.config.get('OPENAI_MAX_RETRIES', 5):
+        return None
+    
+    backoff_max = current_app.config.get('OPENAI_BACKOFF_MAX', 60.0)
+    retry_after = _retry_after(getattr(error, 'response', None))
+    if retry_after is not None:
+        # Waiting longer than the backoff ceiling would outlast the request,
+        # so the error is surfaced instead.
+        return retry_after if retry_after <= backoff_max else None
+    
+    base = current_app.config.get('OPENAI_BACKOFF_BASE', 1.0)
+    return random.uniform(0, min(backoff_max, base * 2 ** attempt))
+
+
+def _retry_after(response) -> Optional[float]:
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        value = headers.get('retry-after')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _on_retry(limiter, error: Exception, attempt: int, delay: float, kwargs: dict) -> None:
+    if isinstance(error, openai.RateLimitError):
+        limiter.pause(delay)
+    OPENAI_RETRIES.labels(kwargs.get('model', ''), type(error).__name__).inc()
+    current_app.logger.warning(
+        f"OpenAI request failed ({type(error).__name__}), retry {attempt + 1} in {delay:.2f}s: {str(error)}"
+    )
+
+
+def _observe_request(kwargs: dict, started: float, error: Optional[Exception] = None) -> None:
+    outcome = 'success' if error is None else type(error).__name__
+    OPENAI_REQUEST_SECONDS.labels(kwargs.get('model', ''), outcome).observe(time.perf_counter() - started)
+
+
+def _record_usage(limiter, response, estimate: int, kwargs: dict) -> None:
+    usage = getattr(response, 'usage', None)
+    if usage is None:
+        return
+    model = kwargs.get('model', '')
+    OPENAI_TOKENS.labels(model, 'prompt').inc(getattr(usage, 'prompt_tokens', 0) or 0)
+    OPENAI_TOKENS.labels(model, 'completion').inc(getattr(usage, 'completion_tokens', 0) or 0)
+    if getattr(usage, 'total_tokens', None):
+        limiter.record_usage(usage.total_tokens - estimate)
 
 
 def get_openai_client() -> OpenAI:
@@ -43,7 +184,10 @@ def get_openai_client() -> OpenAI:
     return client_wrapper.client
 
 
+def create_chat_completion(**kwargs) -> Any:
+    return OpenAIClient().chat_completion(**kwargs)
+
+
 def get_openai_model() -> str:
     client_wrapper = OpenAIClient()
     return client_wrapper.model
-
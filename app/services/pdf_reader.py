@@ -0,0 +1,51 @@
+import io
+import threading
+from typing import Iterator, Iterable, Tuple
+import pypdfium2 as pdfium
+from pypdf import PdfReader
+from app.services.upload_buffer import open_source
+
+# pdfium keeps global state and is not thread-safe; every call into it is
+# serialised because requests, batches and page extraction run in threads.
+_pdfium_lock = threading.Lock()
+
+
+def iter_pdf_pages(source, max_pages: int = 0) -> Iterator[Tuple[int, str]]:
+    # PdfReader resolves page objects lazily from the open file, so only the
+    # page currently being extracted is held in memory.
+    with open_source(source) as f:
+        reader = PdfReader(f)
+        for page_number, page in enumerate(reader.pages):
+            if max_pages and page_number >= max_pages:
+                break
+            try:
+                text = page.extract_text() or ''
+            except Exception:
+                text = ''
+            yield page_number, text.strip()
+
+
+def count_pdf_pages(source) -> int:
+    with open_source(source) as f:
+        return len(PdfReader(f).pages)
+
+
+def rasterize_pdf_pages(source, page_numbers: Iterable[int], dpi: int = 150) -> Iterator[Tuple[int, bytes]]:
+    with open_source(source) as f:
+        with _pdfium_lock:
+            document = pdfium.PdfDocument(f)
+        try:
+            for page_number in page_numbers:
+                with _pdfium_lock:
+                    page = document[page_number]
+                    try:
+                        image = page.render(scale=dpi / 72).to_pil()
+                    finally:
+                        page.close()
+                # PNG encoding only touches the PIL image and runs unlocked.
+                buffer = io.BytesIO()
+                image.save(buffer, format='PNG', optimize=True)
+                yield page_number, buffer.getvalue()
+        finally:
+            with _pdfium_lock:
+                document.close()
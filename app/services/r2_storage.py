@@ -1,9 +1,14 @@
 import os
 import tempfile
-from typing import Optional, BinaryIO
+import threading
+from datetime import datetime
+from typing import Optional, BinaryIO, Dict, Any
 from flask import current_app
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError, BotoCoreError
+from app.services.metrics import instrument_r2_client
 
 
 class R2Storage:
@@ -20,14 +25,32 @@ class R2Storage:
                 "R2_ACCESS_KEY_ID, R2_SECRET_ACCESS_KEY, and R2_BUCKET_NAME environment variables."
             )
         
-        endpoint_url = f"https://{self.account_id}.r2.cloudflarestorage.com"
+        endpoint_url = current_app.config.get('R2_ENDPOINT_URL') or f"https://{self.account_id}.r2.cloudflarestorage.com"
         
-        self.s3_client = boto3.client(
+        # Sessions are not thread-safe, so each storage builds its own; the
+        # resulting client is thread-safe and shared by all requests.
+        self.s3_client = boto3.session.Session().client(
             's3',
             endpoint_url=endpoint_url,
             aws_access_key_id=self.access_key_id,
             aws_secret_access_key=self.secret_access_key,
-            region_name='auto'
+            region_name='auto',
+            config=BotoConfig(
+                max_pool_connections=current_app.config.get('R2_MAX_POOL_CONNECTIONS', 32),
+                connect_timeout=current_app.config.get('R2_CONNECT_TIMEOUT', 5),
+                read_timeout=current_app.config.get('R2_READ_TIMEOUT', 60),
+                retries={
+                    'total_max_attempts': current_app.config.get('R2_MAX_ATTEMPTS', 5),
+                    'mode': current_app.config.get('R2_RETRY_MODE', 'standard')
+                },
+                tcp_keepalive=True
+            )
+        )
+        instrument_r2_client(self.s3_client)
+        self.transfer_config = TransferConfig(
+            multipart_threshold=current_app.config.get('R2_MULTIPART_THRESHOLD', 8 * 1024 * 1024),
+            multipart_chunksize=current_app.config.get('R2_MULTIPART_CHUNKSIZE', 8 * 1024 * 1024),
+            max_concurrency=current_app.config.get('R2_TRANSFER_CONCURRENCY', 8)
         )
     
     def upload_file(self, file_obj: BinaryIO, object_key: str, content_type: Optional[str] = None) -> str:
@@ -40,17 +63,21 @@ class R2Storage:
                 file_obj,
                 self.bucket_name,
                 object_key,
-                ExtraArgs=extra_args
+                ExtraArgs=extra_args,
+                Config=self.transfer_config
             )
             
-            if self.public_url:
-                return f"{self.public_url.rstrip('/')}/{object_key}"
-            else:
-                return f"https://pub-{self.account_id}.r2.dev/{self.bucket_name}/{object_key}"
+            return self.public_object_url(object_key)
                 
         except (ClientError, BotoCoreError) as e:
             raise Exception(f"Failed to upload file to R2: {str(e)}")
     
+    def public_object_url(self, object_key: str) -> str:
+        if self.public_url:
+            return f"{self.public_url.rstrip('/')}/{object_key}"
+        else:
+            return f"https://pub-{self.account_id}.r2.dev/{self.bucket_name}/{object_key}"
+    
     def download_file(self, object_key: str) -> bytes:
         try:
             response = self.s3_client.get_object(
@@ -61,12 +88,38 @@ class R2Storage:
         except (ClientError, BotoCoreError) as e:
             raise Exception(f"Failed to download file from R2: {str(e)}")
     
-    def download_to_temp_file(self, object_key: str) -> str:
-        file_content = self.download_file(object_key)
+    def get_object_stream(self, object_key: str, byte_range: Optional[str] = None,
+                          if_none_match: Optional[str] = None,
+                          if_modified_since: Optional[datetime] = None) -> Dict[str, Any]:
+        params = {'Bucket': self.bucket_name, 'Key': object_key}
+        if byte_range:
+            params['Range'] = byte_range
+        if if_none_match:
+            params['IfNoneMatch'] = if_none_match
+        if if_modified_since:
+            params['IfModifiedSince'] = if_modified_since
         
+        try:
+            response = self.s3_client.get_object(**params)
+            response['StatusCode'] = response['ResponseMetadata']['HTTPStatusCode']
+            return response
+        except ClientError as e:
+            status = e.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+            if status in (304, 404, 412, 416):
+                return {'StatusCode': status, 'Body': None}
+            raise Exception(f"Failed to download file from R2: {str(e)}")
+        except BotoCoreError as e:
+            raise Exception(f"Failed to download file from R2: {str(e)}")
+    
+    def download_to_temp_file(self, object_key: str) -> str:
         suffix = os.path.splitext(object_key)[1] or ''
         temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-        temp_file.write(file_content)
+        try:
+            self.s3_client.download_fileobj(self.bucket_name, object_key, temp_file, Config=self.transfer_config)
+        except (ClientError, BotoCoreError) as e:
+            temp_file.close()
+            os.unlink(temp_file.name)
+            raise Exception(f"Failed to download file from R2: {str(e)}")
         temp_file.close()
         
         return temp_file.name
@@ -93,11 +146,67 @@ class R2Storage:
                 return False
             raise Exception(f"Failed to check file existence in R2: {str(e)}")
     
-    def get_presigned_url(self, object_key: str, expiration: int = 3600) -> str:
+    def get_object_info(self, object_key: str) -> Optional[Dict[str, Any]]:
+        try:
+            response = self.s3_client.head_object(
+                Bucket=self.bucket_name,
+                Key=object_key
+            )
+            return {
+                'size': response['ContentLength'],
+                'contentType': response.get('ContentType'),
+                'etag': response.get('ETag'),
+                'lastModified': response.get('LastModified')
+            }
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise Exception(f"Failed to read file metadata from R2: {str(e)}")
+        except BotoCoreError as e:
+            raise Exception(f"Failed to read file metadata from R2: {str(e)}")
+    
+    def get_presigned_put_url(self, object_key: str, content_type: str, content_length: int,
+                              expiration: int = 900) -> str:
+        # Content-Type and Content-Length are signed headers, so the client
+        # has to send exactly the type and size it asked for.
+        try:
+            return self.s3_client.generate_presigned_url(
+                'put_object',
+                Params={
+                    'Bucket': self.bucket_name,
+                    'Key': object_key,
+                    'ContentType': content_type,
+                    'ContentLength': content_length
+                },
+                ExpiresIn=expiration
+            )
+        except (ClientError, BotoCoreError) as e:
+            raise Exception(f"Failed to generate presigned upload URL: {str(e)}")
+    
+    def get_presigned_post(self, object_key: str, content_type: str, max_size: int,
+                           expiration: int = 900) -> Dict[str, Any]:
+        try:
+            return self.s3_client.generate_presigned_post(
+                self.bucket_name,
+                object_key,
+                Fields={'Content-Type': content_type},
+                Conditions=[
+                    {'Content-Type': content_type},
+                    ['content-length-range', 1, max_size]
+                ],
+                ExpiresIn=expiration
+            )
+        except (ClientError, BotoCoreError) as e:
+            raise Exception(f"Failed to generate presigned upload form: {str(e)}")
+    
+    def get_presigned_url(self, object_key: str, expiration: int = 3600, download_name: Optional[str] = None) -> str:
         try:
+            params = {'Bucket': self.bucket_name, 'Key': object_key}
+            if download_name:
+                params['ResponseContentDisposition'] = f'attachment; filename="{download_name}"'
             url = self.s3_client.generate_presigned_url(
                 'get_object',
-                Params={'Bucket': self.bucket_name, 'Key': object_key},
+                Params=params,
                 ExpiresIn=expiration
             )
             return url
@@ -105,6 +214,25 @@ class R2Storage:
             raise Exception(f"Failed to generate presigned URL: {str(e)}")
 
 
-def get_r2_storage() -> R2Storage:
-    return R2Storage()
+_storages = {}
+_storages_lock = threading.Lock()
 
+
+def reset_r2_storage() -> None:
+    with _storages_lock:
+        _storages.clear()
+
+
+def get_r2_storage() -> R2Storage:
+    # One storage, and so one client and connection pool, per process and
+    # app. Sockets must not cross a fork, so the pid is part of the key and a
+    # gunicorn worker forked from a preloaded master builds its own client.
+    key = (os.getpid(), current_app._get_current_object())
+    storage = _storages.get(key)
+    if storage is None:
+        with _storages_lock:
+            storage = _storages.get(key)
+            if storage is None:
+                storage = R2Storage()
+                _storages[key] = storage
+    return storage
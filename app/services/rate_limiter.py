@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import random
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Optional
+from flask import current_app
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class RateLimiter:
+    # Request and token buckets live in a small JSON file guarded by flock,
+    # so every worker process on the host draws from the same per-minute
+    # budget. Without fcntl (Windows) the budget is per process.
+    def __init__(self, path: str, requests_per_minute: int = 0, tokens_per_minute: int = 0):
+        self.path = path
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.requests_per_minute or self.tokens_per_minute)
+
+    @contextmanager
+    def _state(self):
+        with self._lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            with os.fdopen(fd, 'r+') as f:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    raw = f.read()
+                    try:
+                        state = json.loads(raw) if raw else {}
+                    except ValueError:
+                        state = {}
+                    yield state
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(state))
+                    f.flush()
+                finally:
+                    if fcntl:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _refill(self, state: dict, now: float) -> None:
+        elapsed = max(0.0, now - state.get('updated', now))
+        for key, capacity in (('requests', self.requests_per_minute), ('tokens', self.tokens_per_minute)):
+            if capacity:
+                state[key] = min(capacity, state.get(key, capacity) + elapsed * capacity / 60)
+        state['updated'] = now
+
+    def reserve(self, tokens: int = 0) -> float:
+        if not self.enabled:
+            return 0.0
+
+        with self._state() as state:
+            now = time.time()
+            self._refill(state, now)
+            paused = state.get('pausedUntil', 0) - now
+            if paused > 0:
+                return paused
+
+            waits = []
+            if self.requests_per_minute and state['requests'] < 1:
+                waits.append((1 - state['requests']) * 60 / self.requests_per_minute)
+            # A single request larger than the whole bucket still has to run
+            # eventually, so it only waits for a full bucket.
+            needed = min(tokens, self.tokens_per_minute)
+            if self.tokens_per_minute and state['tokens'] < needed:
+                waits.append((needed - state['tokens']) * 60 / self.tokens_per_minute)
+            if waits:
+                return max(waits)
+
+            if self.requests_per_minute:
+                state['requests'] -= 1
+            if self.tokens_per_minute:
+                state['tokens'] -= tokens
+            return 0.0
+
+    def acquire(self, tokens: int = 0, timeout: Optional[float] = None) -> None:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.reserve(tokens)
+            if wait <= 0:
+                return
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise TimeoutError('Timed out waiting for the OpenAI rate limit')
+            time.sleep(_jitter(wait))
+
+    def record_usage(self, extra_tokens: int) -> None:
+        # Reservations use an estimate; the difference to the reported usage
+        # is settled afterwards and may leave the bucket briefly negative.
+        if not self.tokens_per_minute or not extra_tokens:
+            return
+        with self._state() as state:
+            self._refill(state, time.time())
+            state['tokens'] = state['tokens'] - extra_tokens
+
+    def pause(self, seconds: float) -> None:
+        # A 429 stops every worker until Retry-After passes instead of each
+        # one discovering the throttle on its own.
+        if not self.enabled or seconds <= 0:
+            return
+        with self._state() as state:
+            state['pausedUntil'] = max(state.get('pausedUntil', 0), time.time() + seconds)
+
+
+def _jitter(wait: float) -> float:
+    return wait + random.uniform(0, min(wait, 1.0) * 0.1)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    path = current_app.config.get('OPENAI_RATE_LIMIT_FILE') or \
+        os.path.join(tempfile.gettempdir(), 'flask-doc-extractor-openai-ratelimit.json')
+    key = (
+        path,
+        current_app.config.get('OPENAI_RATE_LIMIT_RPM', 0),
+        current_app.config.get('OPENAI_RATE_LIMIT_TPM', 0)
+    )
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = RateLimiter(*key)
+        return _limiters[key]
@@ -0,0 +1,210 @@
+import hashlib
+import itertools
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional, Tuple
+from urllib.parse import urlencode
+from flask import Response, current_app, g, request
+from app.services.metrics import RESPONSE_CACHE_EVENTS
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+INVOICE_LIST_NAMESPACE = 'invoices'
+# Version tokens are only ever compared for equality, so any number of
+# them can be forgotten: a missing one is replaced by a fresh token, which
+# simply makes the entries stored under the old one unreachable.
+MAX_VERSIONS = 100000
+
+
+def invoice_namespace(sales_order_id: int) -> str:
+    return f'invoice:{sales_order_id}'
+
+
+class MemoryBackend:
+    # Per-process LRU bounded by the total size of the cached bodies, for
+    # RESPONSE_CACHE_URL=memory://. Invalidations only reach this process,
+    # so it is only correct when a single process serves the API.
+    _tokens = itertools.count(1)
+
+    def __init__(self, ttl: int, max_bytes: int):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._versions = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def version(self, namespace: str) -> str:
+        with self._lock:
+            token = self._versions.get(namespace)
+            if token is None:
+                token = self._bump(namespace)
+            else:
+                self._versions.move_to_end(namespace)
+            return token
+
+    def bump(self, namespace: str) -> None:
+        with self._lock:
+            self._bump(namespace)
+
+    def _bump(self, namespace: str) -> str:
+        token = str(next(self._tokens))
+        self._versions[namespace] = token
+        self._versions.move_to_end(namespace)
+        while len(self._versions) > MAX_VERSIONS:
+            self._versions.popitem(last=False)
+        return token
+
+    def get(self, key: str) -> Optional[Tuple[str, bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, etag, body = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return etag, body
+
+    def set(self, key: str, etag: str, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, etag, body)
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str) -> None:
+        _, _, body = self._entries.pop(key)
+        self._size -= len(body)
+
+
+class RedisBackend:
+    # Shared by every worker and host, so an invalidation is seen everywhere
+    # at once. Entries and version tokens both expire after ttl seconds.
+    def __init__(self, url: str, ttl: int):
+        if redis is None:
+            raise ValueError("RESPONSE_CACHE_URL requires redis. Install it with: pip install 'server[redis]'")
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def version(self, namespace: str) -> str:
+        key = f'response-cache:version:{namespace}'
+        token = self.client.get(key)
+        if token is None:
+            # NX so concurrent first readers agree on one token.
+            self.client.set(key, uuid.uuid4().hex, nx=True, ex=self.ttl)
+            token = self.client.get(key)
+        return token.decode('ascii') if token is not None else uuid.uuid4().hex
+
+    def bump(self, namespace: str) -> None:
+        self.client.set(f'response-cache:version:{namespace}', uuid.uuid4().hex, ex=self.ttl)
+
+    def get(self, key: str) -> Optional[Tuple[str, bytes]]:
+        raw = self.client.get(f'response-cache:entry:{key}')
+        if raw is None:
+            return None
+        etag, _, body = raw.partition(b'\n')
+        return etag.decode('ascii'), body
+
+    def set(self, key: str, etag: str, body: bytes) -> None:
+        self.client.set(f'response-cache:entry:{key}', etag.encode('ascii') + b'\n' + body, ex=self.ttl)
+
+
+class ResponseCache:
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.enabled = backend is not None
+
+    def respond(self, namespace: str, key: str, render: Callable[[], Tuple[bytes, Optional[str]]]) -> Response:
+        # render() returns the JSON body and its ETag, or None to use a digest
+        # of the body. The version is read before rendering so a write that
+        # commits meanwhile leaves the new entry under an outdated version.
+        version = self._call('version', namespace) if self.enabled else None
+        cache_key = f'{namespace}:{version}:{key}'
+        cached = self._call('get', cache_key) if version is not None else None
+
+        if cached is not None:
+            etag, body = cached
+            RESPONSE_CACHE_EVENTS.labels('hit').inc()
+        else:
+            if version is not None:
+                # Fill from the primary: a lagging replica could still return
+                # the rows from before the write that set this version.
+                g.db_replica = None
+            body, etag = render()
+            etag = etag or hashlib.blake2b(body, digest_size=16).hexdigest()
+            if version is not None:
+                RESPONSE_CACHE_EVENTS.labels('miss').inc()
+                self._call('set', cache_key, etag, body)
+
+        response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        # Clients may keep the body but must revalidate before reusing it.
+        response.cache_control.no_cache = True
+        response = response.make_conditional(request)
+        if response.status_code == 304:
+            RESPONSE_CACHE_EVENTS.labels('not_modified').inc()
+        return response
+
+    def invalidate(self, namespaces: Iterable[str]) -> None:
+        if not self.enabled:
+            return
+        for namespace in namespaces:
+            self._call('bump', namespace)
+            RESPONSE_CACHE_EVENTS.labels('invalidation').inc()
+
+    def _call(self, method: str, *args):
+        # A cache outage degrades to uncached responses, never to errors.
+        try:
+            return getattr(self.backend, method)(*args)
+        except Exception as e:
+            RESPONSE_CACHE_EVENTS.labels('error').inc()
+            current_app.logger.warning(f"Response cache {method} failed: {str(e)}")
+            return None
+
+
+def request_key(args) -> str:
+    # Same parameters in any order share one entry.
+    return urlencode(sorted(args.items(multi=True)))
+
+
+def invalidate_invoices(sales_order_ids: Iterable[int]) -> None:
+    # Call after the write commits; invalidating earlier lets a concurrent
+    # read cache the old rows again under the new version.
+    namespaces = [invoice_namespace(sales_order_id) for sales_order_id in set(sales_order_ids) if sales_order_id is not None]
+    get_response_cache().invalidate(namespaces + [INVOICE_LIST_NAMESPACE])
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    # Off unless RESPONSE_CACHE_URL names a backend every worker shares;
+    # ETags and 304s still work, computed from a fresh read each time.
+    key = (
+        current_app.config.get('RESPONSE_CACHE_URL', ''),
+        current_app.config.get('RESPONSE_CACHE_TTL', 30),
+        current_app.config.get('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+    )
+    with _caches_lock:
+        if key not in _caches:
+            url, ttl, max_bytes = key
+            if not url:
+                backend = None
+            elif url == 'memory://':
+                backend = MemoryBackend(ttl, max_bytes)
+            else:
+                backend = RedisBackend(url, ttl)
+            _caches[key] = ResponseCache(backend)
+        return _caches[key]
@@ -0,0 +1,158 @@
+from datetime import date
+from typing import Dict
+from sqlalchemy import bindparam, column, inspect, select, table, text, update
+from sqlalchemy.schema import CreateIndex
+from app.extensions import db
+from app.models.invoice_rollup import CustomerRollup, InvoiceDailyRollup, ProductRollup
+from app.models.sales_order import SalesOrderHeader, SalesOrderDetail
+from app.services.invoice_normalizer import normalize_date
+from app.services.invoice_rollups import rebuild_rollups
+from app.services.invoice_search import rebuild_search_index
+
+# Table -> column -> decimal places, or None for dates. Matches the types
+# declared in app.models.sales_order.
+TYPED_COLUMNS = {
+    'SalesOrderHeader': {'OrderDate': None, 'DueDate': None, 'SubTotal': 2, 'TaxAmount': 2, 'TotalAmount': 2},
+    'SalesOrderDetail': {'UnitPrice': 4, 'LineTotal': 2}
+}
+
+ROLLUP_MODELS = (InvoiceDailyRollup, CustomerRollup, ProductRollup)
+
+# Superseded by an index with the same leading column.
+DROPPED_INDEXES = ('ix_SalesOrderDetail_SalesOrderID',)
+
+# Columns added to tables that existing databases already have; create_all
+# only creates missing tables, never missing columns.
+ADDED_COLUMNS = {
+    'ExtractionJob': {
+        'BypassCache': 'BOOLEAN NOT NULL DEFAULT FALSE',
+        'Backend': 'VARCHAR(20)',
+        'TruncatedPages': 'INTEGER NOT NULL DEFAULT 0'
+    }
+}
+
+
+def migrate_typed_columns(batch_size: int = 1000) -> Dict[str, int]:
+    # Upgrades a database created by an earlier version: adds new columns and
+    # converts text dates and float amounts to the DATE / NUMERIC schema.
+    # Safe to re-run: every step skips work already done.
+    bind = db.session.connection()
+    dialect = bind.dialect.name
+    if dialect not in ('postgresql', 'sqlite'):
+        raise ValueError(f"Schema migration is not supported on the '{dialect}' database dialect")
+
+    summary = {'columnsAdded': add_missing_columns(bind)}
+    summary['datesNormalized'] = _normalize_dates(batch_size)
+
+    if dialect == 'postgresql':
+        summary['columnsConverted'] = _convert_postgresql_columns(bind)
+    else:
+        # SQLite keeps its declared column types (they only set affinity, and
+        # the ISO text already stored is what the DATE type reads), so the
+        # amounts are just rounded to the new scales.
+        summary['columnsConverted'] = 0
+        for table_name, columns in TYPED_COLUMNS.items():
+            for column_name, places in columns.items():
+                if places is not None:
+                    bind.execute(text(
+                        f'UPDATE "{table_name}" SET "{column_name}" = round("{column_name}", {places})'
+                    ))
+
+    # IF NOT EXISTS rather than reflection, which skips SQLite's expression
+    # indexes.
+    indexes = [index for model in (SalesOrderHeader, SalesOrderDetail) for index in model.__table__.indexes]
+    for index in indexes:
+        bind.execute(CreateIndex(index, if_not_exists=True))
+    summary['indexesEnsured'] = len(indexes)
+    for index_name in DROPPED_INDEXES:
+        bind.execute(text(f'DROP INDEX IF EXISTS "{index_name}"'))
+
+    # Rollups are derived data: recreate them with the new key and amount
+    # types and refill them from the converted invoices.
+    for model in ROLLUP_MODELS:
+        model.__table__.drop(bind, checkfirst=True)
+        model.__table__.create(bind)
+    db.session.commit()
+    rebuild_rollups()
+    # Databases from before invoice search have an empty index.
+    summary['invoicesIndexed'] = rebuild_search_index()
+    return summary
+
+
+def add_missing_columns(bind) -> int:
+    # Checked against the live table rather than ADD COLUMN IF NOT EXISTS,
+    # which SQLite does not support.
+    inspector = inspect(bind)
+    added = 0
+    for table_name, columns in ADDED_COLUMNS.items():
+        if not inspector.has_table(table_name):
+            continue
+        existing = {info['name'] for info in inspector.get_columns(table_name)}
+        for column_name, ddl in columns.items():
+            if column_name not in existing:
+                bind.execute(text(f'ALTER TABLE "{table_name}" ADD COLUMN "{column_name}" {ddl}'))
+                added += 1
+    return added
+
+
+def _normalize_dates(batch_size: int) -> int:
+    # Untyped columns read the raw stored values, which the DATE type would
+    # reject when they are not ISO dates.
+    headers = table('SalesOrderHeader', column('SalesOrderID'), column('OrderDate'), column('DueDate'), column('CreatedAt'))
+    stmt = update(headers) \
+        .where(headers.c.SalesOrderID == bindparam('id')) \
+        .values(OrderDate=bindparam('order_date'), DueDate=bindparam('due_date'))
+
+    normalized = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(headers.c.SalesOrderID, headers.c.OrderDate, headers.c.DueDate, headers.c.CreatedAt)
+            .where(headers.c.SalesOrderID > last_id)
+            .order_by(headers.c.SalesOrderID)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].SalesOrderID
+
+        changes = []
+        for row in rows:
+            # An unreadable order date falls back to when the invoice was
+            # stored, as it would have on ingest.
+            order_date = normalize_date(row.OrderDate) or normalize_date(row.CreatedAt) or date.today()
+            due_date = normalize_date(row.DueDate)
+            if _stored(row.OrderDate) != order_date.isoformat() or _stored(row.DueDate) != _iso(due_date):
+                changes.append({'id': row.SalesOrderID, 'order_date': order_date.isoformat(), 'due_date': _iso(due_date)})
+        if changes:
+            db.session.execute(stmt, changes)
+            normalized += len(changes)
+    return normalized
+
+
+def _convert_postgresql_columns(bind) -> int:
+    # Dates were normalized to ISO text first, so the plain cast cannot fail.
+    converted = 0
+    for table_name, columns in TYPED_COLUMNS.items():
+        current = {info['name']: info['type'] for info in inspect(bind).get_columns(table_name)}
+        changes = []
+        for column_name, places in columns.items():
+            if places is None:
+                column_type, using = 'DATE', f'"{column_name}"::date'
+            else:
+                column_type, using = f'NUMERIC(14, {places})', f'round("{column_name}"::numeric, {places})'
+            if current[column_name].compile(dialect=bind.dialect) != column_type:
+                changes.append(f'ALTER COLUMN "{column_name}" TYPE {column_type} USING {using}')
+        if changes:
+            # One ALTER rewrites the table once, however many columns change.
+            bind.execute(text(f'ALTER TABLE "{table_name}" ' + ', '.join(changes)))
+            converted += len(changes)
+    return converted
+
+
+def _stored(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def _iso(value):
+    return value.isoformat() if value else None
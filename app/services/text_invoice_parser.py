@@ -0,0 +1,125 @@
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+DATE = r'(\d{4}-\d{2}-\d{2}|\d{1,2}[/.]\d{1,2}[/.]\d{2,4}|[A-Za-z]{3,9}\.? \d{1,2},? \d{4}|\d{1,2} [A-Za-z]{3,9}\.? \d{4})'
+AMOUNT = r'(\d[\d,]*(?:\.\d+)?)'
+
+INVOICE_NUMBER = re.compile(r'invoice\s*(?:no\.?|number|num\.?|#)\s*[:#.]?\s*([A-Za-z0-9][A-Za-z0-9\-/_.]*)', re.I)
+ORDER_DATE = re.compile(r'(?:invoice\s+date|order\s+date|issue\s+date|date\s+of\s+issue|^\s*date)\s*[:.]?\s*' + DATE, re.I | re.M)
+DUE_DATE = re.compile(r'(?:due\s+date|payment\s+due|due\s+on)\s*[:.]?\s*' + DATE, re.I)
+CUSTOMER = re.compile(r'^\s*(?:bill(?:ed)?\s+to|sold\s+to|customer(?:\s+name)?)\s*[:.]?[ \t]*(.*)$', re.I | re.M)
+SUBTOTAL = re.compile(r'^\s*sub\s*-?\s*total\b.*?' + AMOUNT + r'\s*$', re.I | re.M)
+TAX = re.compile(r'^\s*(?:sales\s+)?(?:tax|vat|gst)\b.*?' + AMOUNT + r'\s*$', re.I | re.M)
+TOTAL = re.compile(r'^\s*(?:grand\s+total|total(?!\s+tax)(?:\s+(?:amount|due))?|amount\s+due|balance\s+due)\b.*?' + AMOUNT + r'\s*$', re.I | re.M)
+ITEM = re.compile(
+    r'^\s*(?P<name>[A-Za-z].*?)\s+(?P<quantity>\d+(?:\.\d+)?)\s+(?:x\s+)?\$?(?P<price>\d[\d,]*\.\d{2})\s+\$?(?P<total>\d[\d,]*\.\d{2})\s*$',
+    re.M
+)
+
+# Month-first is tried before day-first for ambiguous numeric dates.
+DATE_FORMATS = [
+    '%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y', '%m/%d/%y', '%d/%m/%y', '%d.%m.%Y',
+    '%B %d, %Y', '%b %d, %Y', '%B %d %Y', '%b %d %Y', '%d %B %Y', '%d %b %Y'
+]
+
+
+def parse_invoice_text(text: str) -> Dict[str, Any]:
+    items = [
+        {
+            'productName': match.group('name').strip(),
+            'productDescription': '',
+            'quantity': _number(match.group('quantity')),
+            'unitPrice': _number(match.group('price')),
+            'lineTotal': _number(match.group('total'))
+        }
+        for match in ITEM.finditer(text)
+        if _close(_number(match.group('quantity')) * _number(match.group('price')), _number(match.group('total')))
+    ]
+    for item in items:
+        if float(item['quantity']).is_integer():
+            item['quantity'] = int(item['quantity'])
+
+    customer_name, customer_address = _customer(text)
+    sub_total = _last_amount(SUBTOTAL, text)
+    tax_amount = _last_amount(TAX, text)
+    total_amount = _last_amount(TOTAL, text)
+    items_total = round(sum(item['lineTotal'] for item in items), 2)
+    if sub_total is None and items:
+        sub_total = items_total
+    if tax_amount is None and sub_total is not None and total_amount is not None:
+        tax_amount = round(total_amount - sub_total, 2)
+
+    return {
+        'invoiceNumber': _first(INVOICE_NUMBER, text),
+        'orderDate': _date(_first(ORDER_DATE, text)),
+        'dueDate': _date(_first(DUE_DATE, text)),
+        'customerName': customer_name,
+        'customerAddress': customer_address,
+        'items': items,
+        'subTotal': sub_total,
+        'taxAmount': tax_amount,
+        'totalAmount': total_amount
+    }
+
+
+def missing_fields(data: Dict[str, Any]) -> List[str]:
+    missing = [field for field in ('invoiceNumber', 'customerName', 'totalAmount', 'items') if not data.get(field)]
+    if missing:
+        return missing
+    items_total = sum(item['lineTotal'] for item in data['items'])
+    if data.get('subTotal') is not None and not _close(items_total, data['subTotal']):
+        missing.append('items (line totals do not add up to the subtotal)')
+    if not _close((data.get('subTotal') or 0) + (data.get('taxAmount') or 0), data['totalAmount']):
+        missing.append('totalAmount (subtotal and tax do not add up to the total)')
+    return missing
+
+
+def _first(pattern: re.Pattern, text: str) -> Optional[str]:
+    match = pattern.search(text)
+    return match.group(1).strip() if match else None
+
+
+def _last_amount(pattern: re.Pattern, text: str) -> Optional[float]:
+    matches = pattern.findall(text)
+    return _number(matches[-1]) if matches else None
+
+
+def _customer(text: str):
+    match = CUSTOMER.search(text)
+    if not match:
+        return None, None
+
+    lines = text[match.end():].splitlines()[1:]
+    name = match.group(1).strip()
+    if not name:
+        while lines and not lines[0].strip():
+            lines.pop(0)
+        name = lines.pop(0).strip() if lines else ''
+
+    address = []
+    for line in lines[:3]:
+        if not line.strip() or ':' in line:
+            break
+        address.append(line.strip())
+    return name or None, ', '.join(address) or None
+
+
+def _date(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    value = value.replace('.', ' ').replace('  ', ' ') if re.search(r'[A-Za-z]', value) else value
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+
+def _number(value: str) -> float:
+    return float(value.replace(',', ''))
+
+
+def _close(a: float, b: float) -> bool:
+    return abs(a - b) <= max(0.01, abs(b) * 0.001)
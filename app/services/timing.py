@@ -0,0 +1,29 @@
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict
+from app.services.metrics import observe_stage
+
+
+class StageTimer:
+    def __init__(self):
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            observe_stage(name, elapsed / 1000)
+            with self._lock:
+                self.timings[name] = round(self.timings.get(name, 0.0) + elapsed, 2)
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            timings = dict(self.timings)
+        timings['total'] = round((time.perf_counter() - self._started) * 1000, 2)
+        return timings
@@ -0,0 +1,87 @@
+import io
+import shutil
+import threading
+from contextlib import contextmanager
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Union
+from flask import Request, current_app
+
+
+class SpooledUploadRequest(Request):
+    # Werkzeug already buffers each uploaded file once; this only makes the
+    # memory-versus-disk threshold configurable.
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        max_size = current_app.config.get('UPLOAD_SPOOL_MAX_SIZE', 1024 * 1024)
+        return SpooledTemporaryFile(max_size=max_size, mode='rb+')
+
+
+class SharedReader(io.RawIOBase):
+    def __init__(self, buffer: 'UploadBuffer'):
+        self._buffer = buffer
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        elif whence == io.SEEK_END:
+            self._position = self._buffer.size + offset
+        return self._position
+
+    def readinto(self, target) -> int:
+        data = self._buffer.read_at(self._position, len(target))
+        target[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+
+class UploadBuffer:
+    def __init__(self, fileobj: BinaryIO):
+        self._file = fileobj
+        self._lock = threading.Lock()
+        self._file.seek(0, io.SEEK_END)
+        self.size = self._file.tell()
+
+    @classmethod
+    def from_stream(cls, stream: BinaryIO, max_size: int) -> 'UploadBuffer':
+        spooled = SpooledTemporaryFile(max_size=max_size, mode='rb+')
+        shutil.copyfileobj(stream, spooled)
+        return cls(spooled)
+
+    def read_at(self, position: int, size: int) -> bytes:
+        with self._lock:
+            self._file.seek(position)
+            return self._file.read(size)
+
+    def reader(self) -> SharedReader:
+        # Each consumer gets its own position, so the R2 upload and the
+        # extractor can read the same buffer from different threads.
+        return SharedReader(self)
+
+    def getvalue(self) -> bytes:
+        return self.read_at(0, self.size)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+@contextmanager
+def open_source(source: Union[str, BinaryIO, UploadBuffer]):
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            yield f
+    elif isinstance(source, UploadBuffer):
+        yield source.reader()
+    else:
+        source.seek(0)
+        yield source
@@ -1,13 +1,39 @@
 import os
+import shutil
+import tempfile
 import multiprocessing
 
+# Each worker writes its metrics to files in this directory so a scrape of any
+# worker reports totals across all of them. It must be set before the app is
+# imported, and is emptied so samples from a previous run do not linger.
+metrics_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'flask-doc-extractor-metrics')
+)
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir, exist_ok=True)
+
 # Server socket
 bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8080')
 backlog = int(os.environ.get('GUNICORN_BACKLOG', '2048'))
 
 # Worker processes
-workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
-worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+# 'sync' serves one request per process. 'threaded' serves GUNICORN_THREADS
+# requests per process on gthread workers, which suits requests that mostly
+# wait on OpenAI, R2 and the database. gevent/eventlet are not supported: the
+# rate limiter's flock, pdfium and psycopg2 block the whole event loop.
+profile = os.environ.get('GUNICORN_PROFILE', 'sync')
+if profile == 'threaded':
+    default_workers, default_worker_class, default_threads = multiprocessing.cpu_count() + 1, 'gthread', 16
+else:
+    default_workers, default_worker_class, default_threads = multiprocessing.cpu_count() * 2 + 1, 'sync', 1
+workers = int(os.environ.get('GUNICORN_WORKERS', default_workers))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', default_worker_class)
+threads = int(os.environ.get('GUNICORN_THREADS', default_threads))
+# Read by app.config to size the DB, OpenAI and R2 pools for this many
+# concurrent requests, and to split DB_MAX_CONNECTIONS across this many
+# workers; the app is imported after this file.
+os.environ['GUNICORN_THREADS'] = str(threads)
+os.environ['GUNICORN_WORKERS'] = str(workers)
 worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', '1000'))
 timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
 keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '2'))
@@ -39,3 +65,20 @@ preload_app = True
 # Worker timeout
 graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
 
+
+def post_fork(server, worker):
+    # Clients created in the master while preloading must not share their
+    # sockets with workers; each worker builds its own on first use.
+    from app.extensions import db
+    from app.services.r2_storage import reset_r2_storage
+    reset_r2_storage()
+    # Same for pooled DB connections the master opened at startup; close=False
+    # leaves the master's sockets alone and gives the worker empty pools.
+    with worker.app.wsgi().app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    from app.services.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
@@ -0,0 +1,506 @@
+import io
+import os
+import sys
+import json
+import math
+import time
+import queue
+import random
+import socket
+import hashlib
+import logging
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+SCENARIOS = ['upload', 'list', 'get', 'update', 'download']
+
+parser = argparse.ArgumentParser(
+    description='End-to-end load test of the API against local stand-ins for the database, R2 and OpenAI.'
+)
+parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma separated, run in this order')
+parser.add_argument('--requests', type=int, default=200, help='Requests per scenario')
+parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients')
+parser.add_argument('--corpus', type=int, default=100, help='Synthetic invoices to generate')
+parser.add_argument('--image-share', type=float, default=0.0, help='Fraction of the corpus rendered as PNG instead of text')
+parser.add_argument('--seed', type=int, default=1234)
+parser.add_argument('--llm', choices=['stub', 'fake'], default='stub',
+                    help="'stub' serves an OpenAI-compatible endpoint so the real client, pool and rate limiter run; "
+                         "'fake' uses the in-process fake extraction backend")
+parser.add_argument('--llm-latency-ms', type=float, default=800)
+parser.add_argument('--llm-latency-stddev-ms', type=float, default=300)
+parser.add_argument('--storage', choices=['local', 'moto'], default='local',
+                    help="'moto' runs an in-process S3-compatible server (pip install 'moto[server]')")
+parser.add_argument('--r2-endpoint-url', default=None, help='Use this S3-compatible endpoint (e.g. MinIO) for R2')
+parser.add_argument('--database-url', default=None, help='Defaults to a throwaway SQLite file')
+parser.add_argument('--server', choices=['werkzeug', 'gunicorn'], default='werkzeug')
+parser.add_argument('--workers', type=int, default=4, help='gunicorn workers')
+parser.add_argument('--profile', choices=['sync', 'threaded'], default='sync', help='GUNICORN_PROFILE for --server gunicorn')
+parser.add_argument('--threads', type=int, default=None, help='GUNICORN_THREADS for the threaded profile')
+parser.add_argument('--bypass-cache', action='store_true', help='Force extraction on repeated uploads')
+parser.add_argument('--label', default=None, help='Free-form label stored with the results')
+parser.add_argument('--output', default=None, help='Write the JSON results to this file instead of stdout')
+parser.add_argument('--compare', default=None, help='Earlier results file to print latency deltas against')
+args = parser.parse_args()
+
+scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+unknown = set(scenarios) - set(SCENARIOS)
+if unknown:
+    parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# Synthetic corpus ---------------------------------------------------------
+
+def make_invoice(rng: random.Random, index: int) -> dict:
+    order_date = date(2024, 1, 1) + timedelta(days=rng.randrange(365))
+    items = []
+    for _ in range(rng.randint(1, 8)):
+        quantity = rng.randint(1, 20)
+        unit_price = round(rng.uniform(1, 500), 2)
+        items.append({
+            'productName': f"Widget {''.join(rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZ') for _ in range(3))}",
+            'quantity': quantity,
+            'unitPrice': unit_price,
+            'lineTotal': round(quantity * unit_price, 2)
+        })
+    sub_total = round(sum(item['lineTotal'] for item in items), 2)
+    tax_amount = round(sub_total * 0.1, 2)
+    return {
+        'invoiceNumber': f'BENCH-{args.seed}-{index:06d}',
+        'orderDate': order_date.isoformat(),
+        'dueDate': (order_date + timedelta(days=30)).isoformat(),
+        'customerName': f'Customer {rng.randrange(500)}',
+        'customerAddress': f'{rng.randint(1, 999)} Example Street',
+        'items': items,
+        'subTotal': sub_total,
+        'taxAmount': tax_amount,
+        'totalAmount': round(sub_total + tax_amount, 2)
+    }
+
+
+def invoice_text(invoice: dict) -> str:
+    # Laid out the way text_invoice_parser reads invoices, so the stub model
+    # can answer with real field values.
+    lines = [
+        'INVOICE',
+        f"Invoice No: {invoice['invoiceNumber']}",
+        f"Invoice Date: {invoice['orderDate']}",
+        f"Due Date: {invoice['dueDate']}",
+        f"Bill To: {invoice['customerName']}",
+        invoice['customerAddress'],
+        ''
+    ]
+    for item in invoice['items']:
+        lines.append(f"{item['productName']} {item['quantity']} {item['unitPrice']:.2f} {item['lineTotal']:.2f}")
+    lines += [
+        '',
+        f"Subtotal {invoice['subTotal']:.2f}",
+        f"Tax {invoice['taxAmount']:.2f}",
+        f"Total {invoice['totalAmount']:.2f}"
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def render_png(text: str) -> bytes:
+    from PIL import Image, ImageDraw
+    lines = text.splitlines()
+    image = Image.new('RGB', (1240, 40 + 28 * len(lines)), 'white')
+    draw = ImageDraw.Draw(image)
+    for number, line in enumerate(lines):
+        draw.text((40, 20 + 28 * number), line, fill='black')
+    output = io.BytesIO()
+    image.save(output, format='PNG')
+    return output.getvalue()
+
+
+def build_corpus() -> list:
+    rng = random.Random(args.seed)
+    corpus = []
+    for index in range(args.corpus):
+        text = invoice_text(make_invoice(rng, index))
+        if rng.random() < args.image_share:
+            corpus.append((f'invoice-{index:06d}.png', render_png(text), 'image/png'))
+        else:
+            corpus.append((f'invoice-{index:06d}.txt', text.encode('utf-8'), 'text/plain'))
+    return corpus
+
+
+# OpenAI stand-in ----------------------------------------------------------
+
+class StubOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    rng = random.Random(args.seed)
+    rng_lock = threading.Lock()
+
+    def log_message(self, format, *log_args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if not self.path.endswith('/chat/completions'):
+            self._send(404, {'error': {'message': 'not found'}})
+            return
+
+        request_data = json.loads(body)
+        time.sleep(self._latency_ms() / 1000)
+        content = json.dumps(self._answer(request_data['messages'][-1]['content']))
+        prompt_tokens = len(body) // 4
+        completion_tokens = len(content) // 4
+        self._send(200, {
+            'id': 'chatcmpl-bench',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request_data.get('model'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop'
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            }
+        })
+
+    def _latency_ms(self) -> float:
+        mean, stddev = args.llm_latency_ms, args.llm_latency_stddev_ms
+        if mean <= 0:
+            return 0.0
+        if stddev <= 0:
+            return mean
+        sigma = math.sqrt(math.log(1 + (stddev / mean) ** 2))
+        with self.rng_lock:
+            return self.rng.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+
+    def _answer(self, user_content) -> dict:
+        from app.services.text_invoice_parser import parse_invoice_text
+        if isinstance(user_content, str):
+            return parse_invoice_text(user_content)
+        # Images cannot be read here; answer with a record derived from the
+        # request so repeated uploads map to the same invoice.
+        digest = hashlib.sha256(json.dumps(user_content, sort_keys=True).encode('utf-8')).hexdigest()
+        return make_invoice(random.Random(digest), int(digest[:6], 16))
+
+    def _send(self, status: int, payload: dict) -> None:
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+# Environment --------------------------------------------------------------
+
+temp_dir = tempfile.TemporaryDirectory()
+background = []
+env = {
+    'DATABASE_URL': args.database_url or f"sqlite:///{temp_dir.name}/bench.db",
+    'UPLOAD_FOLDER': os.path.join(temp_dir.name, 'uploads'),
+    'PROMETHEUS_MULTIPROC_DIR': os.path.join(temp_dir.name, 'metrics'),
+    'OPENAI_RATE_LIMIT_FILE': os.path.join(temp_dir.name, 'ratelimit.json'),
+    'EXTRACTION_CACHE_ENABLED': 'true',
+    'ASYNC_EXTRACTION': 'false',
+    'OPENAI_API_KEY': 'bench'
+}
+os.makedirs(env['PROMETHEUS_MULTIPROC_DIR'])
+
+if args.llm == 'stub':
+    stub = ThreadingHTTPServer(('127.0.0.1', free_port()), StubOpenAIHandler)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    background.append(stub.shutdown)
+    env.update({
+        'EXTRACTION_BACKEND': 'openai',
+        'OPENAI_BASE_URL': f'http://127.0.0.1:{stub.server_address[1]}/v1',
+        'OPENAI_MAX_CONCURRENCY': str(max(8, args.concurrency))
+    })
+else:
+    env.update({
+        'EXTRACTION_BACKEND': 'fake',
+        'FAKE_EXTRACTION_LATENCY_MS': str(args.llm_latency_ms),
+        'FAKE_EXTRACTION_LATENCY_STDDEV_MS': str(args.llm_latency_stddev_ms),
+        'FAKE_EXTRACTION_SEED': str(args.seed)
+    })
+
+r2_endpoint_url = args.r2_endpoint_url
+if args.storage == 'moto' and not r2_endpoint_url:
+    from moto.server import ThreadedMotoServer
+    moto_port = free_port()
+    moto_server = ThreadedMotoServer(ip_address='127.0.0.1', port=moto_port, verbose=False)
+    moto_server.start()
+    background.append(moto_server.stop)
+    r2_endpoint_url = f'http://127.0.0.1:{moto_port}'
+
+if r2_endpoint_url:
+    import boto3
+    env.update({
+        'USE_R2_STORAGE': 'true',
+        'R2_ENDPOINT_URL': r2_endpoint_url,
+        'R2_ACCOUNT_ID': os.environ.get('R2_ACCOUNT_ID', 'bench'),
+        'R2_ACCESS_KEY_ID': os.environ.get('R2_ACCESS_KEY_ID', 'bench'),
+        'R2_SECRET_ACCESS_KEY': os.environ.get('R2_SECRET_ACCESS_KEY', 'bench'),
+        'R2_BUCKET_NAME': os.environ.get('R2_BUCKET_NAME', 'bench-api')
+    })
+    # S3 stand-ins want us-east-1 to create a bucket without a location constraint.
+    setup_client = boto3.client(
+        's3',
+        endpoint_url=r2_endpoint_url,
+        aws_access_key_id=env['R2_ACCESS_KEY_ID'],
+        aws_secret_access_key=env['R2_SECRET_ACCESS_KEY'],
+        region_name='us-east-1'
+    )
+    try:
+        setup_client.create_bucket(Bucket=env['R2_BUCKET_NAME'])
+    except (setup_client.exceptions.BucketAlreadyOwnedByYou, setup_client.exceptions.BucketAlreadyExists):
+        pass
+else:
+    env['USE_R2_STORAGE'] = 'false'
+
+os.environ.update(env)
+
+import httpx
+
+
+def start_server() -> str:
+    port = free_port()
+    if args.server == 'gunicorn':
+        server_env = dict(os.environ, GUNICORN_PROFILE=args.profile)
+        server_env.pop('GUNICORN_THREADS', None)
+        if args.threads:
+            server_env['GUNICORN_THREADS'] = str(args.threads)
+        process = subprocess.Popen(
+            [
+                sys.executable, '-m', 'gunicorn', '-c', str(ROOT / 'gunicorn.conf.py'),
+                '--bind', f'127.0.0.1:{port}', '--workers', str(args.workers),
+                '--access-logfile', os.devnull, 'wsgi:application'
+            ],
+            cwd=str(ROOT),
+            env=server_env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        background.append(lambda: (process.terminate(), process.wait(timeout=30)))
+    else:
+        from werkzeug.serving import make_server
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        from app import create_app
+        from app.config import Config
+        server = make_server('127.0.0.1', port, create_app(Config), threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        background.append(server.shutdown)
+
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f'{base_url}/api/health', timeout=2).status_code == 200:
+                return base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError('The API did not become healthy within 60s')
+
+
+# Load generation ----------------------------------------------------------
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return round(sorted_values[index], 2)
+
+
+def run_scenario(base_url: str, name: str, make_request) -> dict:
+    # Clients are built before the clock starts: creating one loads the TLS
+    # trust store, which would otherwise show up as tail latency.
+    clients = queue.SimpleQueue()
+    all_clients = [httpx.Client(base_url=base_url, timeout=300) for _ in range(args.concurrency)]
+    for http_client in all_clients:
+        clients.put(http_client)
+
+    def one(index: int):
+        http_client = clients.get()
+        started = time.perf_counter()
+        try:
+            response = make_request(http_client, index)
+            status = response.status_code
+            payload = response
+        except httpx.HTTPError as e:
+            status, payload = type(e).__name__, None
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            clients.put(http_client)
+        return elapsed_ms, status, payload
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        outcomes = list(executor.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - started
+    for http_client in all_clients:
+        http_client.close()
+
+    statuses = {}
+    for _, status, _ in outcomes:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    latencies = sorted(ms for ms, status, _ in outcomes if isinstance(status, int) and status < 400)
+    result = {
+        'requests': len(outcomes),
+        'ok': len(latencies),
+        'errors': len(outcomes) - len(latencies),
+        'statuses': statuses,
+        'seconds': round(elapsed, 3),
+        'throughputRps': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'meanMs': round(sum(latencies) / len(latencies), 2) if latencies else None,
+        'p50Ms': percentile(latencies, 0.50),
+        'p95Ms': percentile(latencies, 0.95),
+        'p99Ms': percentile(latencies, 0.99),
+        'maxMs': round(latencies[-1], 2) if latencies else None
+    }
+    return result, outcomes
+
+
+def stage_means(base_url: str) -> dict:
+    from prometheus_client.parser import text_string_to_metric_families
+    try:
+        text = httpx.get(f'{base_url}/metrics', timeout=10).text
+    except httpx.HTTPError:
+        return {}
+    sums, counts = {}, {}
+    for family in text_string_to_metric_families(text):
+        if family.name != 'invoice_stage_duration_seconds':
+            continue
+        for sample in family.samples:
+            stage = sample.labels.get('stage')
+            if sample.name.endswith('_sum'):
+                sums[stage] = sums.get(stage, 0) + sample.value
+            elif sample.name.endswith('_count'):
+                counts[stage] = counts.get(stage, 0) + sample.value
+    return {stage: round(sums[stage] / counts[stage] * 1000, 2) for stage in sorted(sums) if counts.get(stage)}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=str(ROOT), text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+corpus = build_corpus()
+sales_order_ids = []
+results = {
+    'label': args.label,
+    'commit': git_revision(),
+    'startedAt': datetime.now(timezone.utc).isoformat(),
+    'python': platform.python_version(),
+    'config': {
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'corpus': args.corpus,
+        'imageShare': args.image_share,
+        'seed': args.seed,
+        'llm': args.llm,
+        'llmLatencyMs': args.llm_latency_ms,
+        'llmLatencyStddevMs': args.llm_latency_stddev_ms,
+        'storage': 'r2' if r2_endpoint_url else 'local',
+        'database': env['DATABASE_URL'].split(':', 1)[0],
+        'server': args.server,
+        'workers': args.workers if args.server == 'gunicorn' else 1,
+        'profile': args.profile if args.server == 'gunicorn' else None,
+        'threads': args.threads if args.server == 'gunicorn' else None,
+        'bypassCache': args.bypass_cache
+    },
+    'scenarios': {}
+}
+
+
+def upload(client: httpx.Client, index: int):
+    filename, content, content_type = corpus[index % len(corpus)]
+    params = {'bypass_cache': 'true'} if args.bypass_cache else None
+    return client.post('/api/upload', params=params, files={'file': (filename, content, content_type)})
+
+
+def ensure_ids(client: httpx.Client) -> None:
+    # Scenarios after upload need invoices; seed them once if upload was skipped.
+    if sales_order_ids:
+        return
+    for index in range(min(len(corpus), args.requests)):
+        response = upload(client, index)
+        if response.status_code == 200:
+            sales_order_ids.extend(response.json()['salesOrderIds'])
+    if not sales_order_ids:
+        raise RuntimeError('Could not create any invoices to run the read scenarios against')
+
+
+def pick_id(index: int) -> int:
+    return sales_order_ids[index % len(sales_order_ids)]
+
+
+requests_by_scenario = {
+    'upload': upload,
+    'list': lambda client, index: client.get('/api/invoices', params={'limit': 50}),
+    'get': lambda client, index: client.get(f'/api/invoices/{pick_id(index)}'),
+    'update': lambda client, index: client.put(
+        f'/api/invoices/{pick_id(index)}', json={'status': 'Reviewed' if index % 2 else 'Pending'}
+    ),
+    'download': lambda client, index: client.get(f'/api/files/{pick_id(index)}')
+}
+
+try:
+    base_url = start_server()
+    results['baseUrl'] = base_url
+    for name in scenarios:
+        if name != 'upload':
+            with httpx.Client(base_url=base_url, timeout=300) as seed_client:
+                ensure_ids(seed_client)
+        summary, outcomes = run_scenario(base_url, name, requests_by_scenario[name])
+        if name == 'upload':
+            for _, status, response in outcomes:
+                if status == 200:
+                    sales_order_ids.extend(response.json()['salesOrderIds'])
+            sales_order_ids[:] = sorted(set(sales_order_ids))
+        results['scenarios'][name] = summary
+        print(f"{name}: {summary['ok']}/{summary['requests']} ok, {summary['throughputRps']} req/s, "
+              f"p50 {summary['p50Ms']} ms, p95 {summary['p95Ms']} ms, p99 {summary['p99Ms']} ms", file=sys.stderr)
+    results['serverStageMeansMs'] = stage_means(base_url)
+finally:
+    for stop in reversed(background):
+        try:
+            stop()
+        except Exception:
+            pass
+
+output = json.dumps(results, indent=2)
+if args.output:
+    Path(args.output).write_text(output + '\n')
+else:
+    print(output)
+
+if args.compare:
+    baseline = json.loads(Path(args.compare).read_text())
+    print(f"\ncompared with {args.compare} ({baseline.get('label') or baseline.get('commit')})", file=sys.stderr)
+    print(f"{'scenario':>10} {'metric':>13} {'before':>10} {'after':>10} {'change':>8}", file=sys.stderr)
+    for name, summary in results['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        for metric in ('throughputRps', 'p50Ms', 'p95Ms', 'p99Ms'):
+            if before.get(metric) and summary.get(metric) is not None:
+                change = (summary[metric] - before[metric]) / before[metric] * 100
+                print(f"{name:>10} {metric:>13} {before[metric]:>10} {summary[metric]:>10} {change:>+7.1f}%",
+                      file=sys.stderr)
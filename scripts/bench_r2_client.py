@@ -0,0 +1,137 @@
+import io
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+parser = argparse.ArgumentParser(
+    description='Compare a new R2 client per request with the shared R2Storage client against an S3-compatible server.'
+)
+parser.add_argument('--endpoint-url', default=None,
+                    help="S3-compatible endpoint, e.g. MinIO. Defaults to an in-process moto server (pip install 'moto[server]')")
+parser.add_argument('--bucket', default='bench-r2-client')
+parser.add_argument('--requests', type=int, default=200, help='Requests per measurement')
+parser.add_argument('--object-size', type=int, default=64 * 1024, help='Bytes of the object read per request')
+parser.add_argument('--upload-size', type=int, default=32 * 1024 * 1024, help='Bytes of the multipart upload (0 to skip)')
+parser.add_argument('--json', action='store_true', help='Print results as JSON')
+args = parser.parse_args()
+
+server = None
+endpoint_url = args.endpoint_url
+if not endpoint_url:
+    from moto.server import ThreadedMotoServer
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    server = ThreadedMotoServer(ip_address='127.0.0.1', port=port, verbose=False)
+    server.start()
+    endpoint_url = f'http://127.0.0.1:{port}'
+
+temp_dir = tempfile.TemporaryDirectory()
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{temp_dir.name}/bench.db")
+os.environ.update({
+    'USE_R2_STORAGE': 'true',
+    'R2_ENDPOINT_URL': endpoint_url,
+    'R2_ACCOUNT_ID': os.environ.get('R2_ACCOUNT_ID', 'bench'),
+    'R2_ACCESS_KEY_ID': os.environ.get('R2_ACCESS_KEY_ID', 'bench'),
+    'R2_SECRET_ACCESS_KEY': os.environ.get('R2_SECRET_ACCESS_KEY', 'bench'),
+    'R2_BUCKET_NAME': args.bucket
+})
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from app import create_app
+from app.config import Config
+from app.services.r2_storage import get_r2_storage
+
+app = create_app(Config)
+
+
+def per_request_client():
+    # What get_r2_storage() used to do on every request.
+    return boto3.client(
+        's3',
+        endpoint_url=endpoint_url,
+        aws_access_key_id=os.environ['R2_ACCESS_KEY_ID'],
+        aws_secret_access_key=os.environ['R2_SECRET_ACCESS_KEY'],
+        region_name='auto'
+    )
+
+
+def shared_client():
+    return get_r2_storage().s3_client
+
+
+def measure(make_client, key: str):
+    timings = []
+    for _ in range(args.requests):
+        started = time.perf_counter()
+        make_client().get_object(Bucket=args.bucket, Key=key)['Body'].read()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'meanMs': round(sum(timings) / len(timings), 2),
+        'p50Ms': round(timings[len(timings) // 2], 2),
+        'p95Ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2)
+    }
+
+
+def measure_upload(transfer_config: TransferConfig, key: str) -> float:
+    payload = io.BytesIO(os.urandom(args.upload_size))
+    started = time.perf_counter()
+    shared_client().upload_fileobj(payload, args.bucket, key, Config=transfer_config)
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+results = {'endpoint': endpoint_url, 'requests': args.requests, 'objectBytes': args.object_size}
+
+try:
+    with app.app_context():
+        client = shared_client()
+        # R2 has no regions; S3 stand-ins want us-east-1 to create a bucket
+        # without a location constraint.
+        setup_client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url,
+            aws_access_key_id=os.environ['R2_ACCESS_KEY_ID'],
+            aws_secret_access_key=os.environ['R2_SECRET_ACCESS_KEY'],
+            region_name='us-east-1'
+        )
+        try:
+            setup_client.create_bucket(Bucket=args.bucket)
+        except (setup_client.exceptions.BucketAlreadyOwnedByYou, setup_client.exceptions.BucketAlreadyExists):
+            pass
+        client.put_object(Bucket=args.bucket, Key='bench/object', Body=os.urandom(args.object_size))
+
+        # Warm the shared pool so the comparison is steady state against steady state.
+        shared_client().head_object(Bucket=args.bucket, Key='bench/object')
+        results['perRequestClient'] = measure(per_request_client, 'bench/object')
+        results['sharedClient'] = measure(shared_client, 'bench/object')
+        results['speedup'] = round(results['perRequestClient']['meanMs'] / results['sharedClient']['meanMs'], 2)
+
+        if args.upload_size:
+            results['uploadBytes'] = args.upload_size
+            results['defaultTransferMs'] = measure_upload(TransferConfig(), 'bench/upload-default')
+            results['tunedTransferMs'] = measure_upload(get_r2_storage().transfer_config, 'bench/upload-tuned')
+finally:
+    if server is not None:
+        server.stop()
+
+if args.json:
+    print(json.dumps(results, indent=2))
+else:
+    print(f"endpoint {endpoint_url}, {args.requests} GETs of {args.object_size} bytes")
+    print(f"{'':>22} {'mean (ms)':>10} {'p50 (ms)':>10} {'p95 (ms)':>10}")
+    for label, key in (('client per request', 'perRequestClient'), ('shared client', 'sharedClient')):
+        row = results[key]
+        print(f"{label:>22} {row['meanMs']:>10} {row['p50Ms']:>10} {row['p95Ms']:>10}")
+    print(f"speedup {results['speedup']}x")
+    if args.upload_size:
+        print(f"multipart upload of {args.upload_size} bytes: default TransferConfig {results['defaultTransferMs']} ms, "
+              f"tuned {results['tunedTransferMs']} ms")
@@ -0,0 +1,131 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+parser = argparse.ArgumentParser(description='Compare the to_dict/jsonify path with the row-tuple/orjson path.')
+parser.add_argument('--sizes', default='1000,10000,100000', help='Comma separated invoice counts')
+parser.add_argument('--items', type=int, default=3, help='Line items per invoice')
+parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement, the fastest is reported')
+parser.add_argument('--database-url', default=None, help='Defaults to a throwaway SQLite file')
+parser.add_argument('--json', action='store_true', help='Print results as JSON')
+args = parser.parse_args()
+
+temp_dir = tempfile.TemporaryDirectory()
+os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{temp_dir.name}/bench.db"
+os.environ.setdefault('UPLOAD_FOLDER', temp_dir.name)
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import insert, select
+from sqlalchemy.orm import selectinload
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models.sales_order import SalesOrderHeader, SalesOrderDetail
+from app.services.invoice_serializer import attach_items, header_select, rows_to_dicts
+
+app = create_app(Config)
+
+
+def seed(count: int, items_per_invoice: int) -> None:
+    created = datetime(2024, 1, 1)
+    headers = [
+        {
+            'SalesOrderID': i + 1,
+            'OrderDate': (created + timedelta(days=i % 365)).date(),
+            'DueDate': None,
+            'CustomerName': f'Customer {i % 500}',
+            'CustomerAddress': f'{i} Example Street',
+            'InvoiceNumber': f'BENCH-{i:08d}',
+            'SubTotal': 100.0,
+            'TaxAmount': 10.0,
+            'TotalAmount': 110.0,
+            'Status': 'Pending',
+            'CreatedAt': created + timedelta(seconds=i),
+            'UpdatedAt': created + timedelta(seconds=i),
+            'DocumentPath': None
+        }
+        for i in range(count)
+    ]
+    items = [
+        {
+            'SalesOrderID': i + 1,
+            'ProductName': f'Product {j}',
+            'ProductDescription': 'Benchmark item',
+            'Quantity': j + 1,
+            'UnitPrice': 10.0,
+            'LineTotal': 10.0 * (j + 1)
+        }
+        for i in range(count)
+        for j in range(items_per_invoice)
+    ]
+    db.session.execute(insert(SalesOrderHeader), headers)
+    db.session.execute(insert(SalesOrderDetail), items)
+    db.session.commit()
+
+
+def orm_path(limit: int) -> bytes:
+    invoices = SalesOrderHeader.query \
+        .options(selectinload(SalesOrderHeader.items)) \
+        .order_by(SalesOrderHeader.CreatedAt.desc(), SalesOrderHeader.SalesOrderID.desc()) \
+        .limit(limit) \
+        .all()
+    return DefaultJSONProvider(app).dumps([invoice.to_dict() for invoice in invoices]).encode('utf-8')
+
+
+def rows_path(limit: int) -> bytes:
+    stmt = header_select() \
+        .order_by(SalesOrderHeader.CreatedAt.desc(), SalesOrderHeader.SalesOrderID.desc()) \
+        .limit(limit)
+    rows = db.session.execute(stmt).all()
+    invoices = rows_to_dicts(rows)
+    attach_items(invoices, [row.SalesOrderID for row in rows])
+    return app.json.dumps_bytes(invoices)
+
+
+def measure(func, limit: int):
+    best = None
+    size = 0
+    for _ in range(args.repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        size = len(func(limit))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, size
+
+
+sizes = [int(size) for size in args.sizes.split(',')]
+results = []
+
+with app.app_context():
+    SalesOrderDetail.query.delete()
+    SalesOrderHeader.query.delete()
+    db.session.commit()
+    seed(max(sizes), args.items)
+
+    for size in sizes:
+        orm_seconds, orm_bytes = measure(orm_path, size)
+        rows_seconds, rows_bytes = measure(rows_path, size)
+        results.append({
+            'invoices': size,
+            'items': size * args.items,
+            'ormToDictMs': round(orm_seconds * 1000, 1),
+            'rowsOrjsonMs': round(rows_seconds * 1000, 1),
+            'speedup': round(orm_seconds / rows_seconds, 2),
+            'ormBytes': orm_bytes,
+            'rowsBytes': rows_bytes
+        })
+
+if args.json:
+    print(json.dumps(results, indent=2))
+else:
+    print(f"{'invoices':>10} {'to_dict+json (ms)':>18} {'rows+orjson (ms)':>17} {'speedup':>8}")
+    for result in results:
+        print(f"{result['invoices']:>10} {result['ormToDictMs']:>18} {result['rowsOrjsonMs']:>17} {result['speedup']:>7}x")
@@ -0,0 +1,26 @@
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+from app import create_app
+from app.config import Config
+from app.services.extraction_cache import get_extraction_cache
+
+
+env_path = Path(__file__).parent.parent / '.env'
+if env_path.exists():
+    load_dotenv(dotenv_path=env_path)
+else:
+    load_dotenv()
+
+app = create_app(Config)
+
+
+with app.app_context():
+    print("Evicting expired and least recently used extraction cache entries...")
+    started = time.perf_counter()
+    evicted = get_extraction_cache().evict()
+    print(f"Evicted {evicted} entries in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,47 @@
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+from app import create_app
+from app.config import Config
+from app.services.invoice_export import EXPORT_FORMATS, export_invoices
+
+
+env_path = Path(__file__).parent.parent / '.env'
+if env_path.exists():
+    load_dotenv(dotenv_path=env_path)
+else:
+    load_dotenv()
+
+parser = argparse.ArgumentParser(description='Stream invoices joined with their line items to a file.')
+parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='ndjson')
+parser.add_argument('--output', '-o', default='-', help='Output file, "-" for stdout')
+parser.add_argument('--date-from', help='Earliest OrderDate (YYYY-MM-DD)')
+parser.add_argument('--date-to', help='Latest OrderDate (YYYY-MM-DD)')
+parser.add_argument('--status', help='Comma separated statuses')
+parser.add_argument('--batch-size', type=int, default=None)
+args = parser.parse_args()
+
+app = create_app(Config)
+
+filters = {
+    'dateFrom': args.date_from,
+    'dateTo': args.date_to,
+    'status': args.status
+}
+
+with app.app_context():
+    batch_size = args.batch_size or app.config.get('EXPORT_BATCH_SIZE', 1000)
+    output = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    try:
+        for chunk in export_invoices(args.format, filters, batch_size=batch_size):
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+
+if args.output != '-':
+    print(f"Exported invoices to {args.output}", file=sys.stderr)
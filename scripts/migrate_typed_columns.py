@@ -0,0 +1,28 @@
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from dotenv import load_dotenv
+from app import create_app
+from app.config import Config
+from app.services.schema_migrations import migrate_typed_columns
+
+
+env_path = Path(__file__).parent.parent / '.env'
+if env_path.exists():
+    load_dotenv(dotenv_path=env_path)
+else:
+    load_dotenv()
+
+app = create_app(Config)
+
+
+with app.app_context():
+    print("Adding new columns and migrating invoice dates to DATE and amounts to NUMERIC...")
+    started = time.perf_counter()
+    summary = migrate_typed_columns()
+    for key, value in summary.items():
+        print(f"  {key}: {value}")
+    print(f"Schema migrated in {time.perf_counter() - started:.2f}s")
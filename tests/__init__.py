@@ -0,0 +1,22 @@
+import os
+import tempfile
+
+# app.config reads the environment when it is first imported, so this runs
+# before any test module imports the app.
+_data_dir = tempfile.TemporaryDirectory()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_data_dir.name, 'test.db')}"
+os.environ['UPLOAD_FOLDER'] = os.path.join(_data_dir.name, 'uploads')
+os.environ['OPENAI_API_KEY'] = 'test'
+os.environ['USE_R2_STORAGE'] = 'false'
+
+
+def make_app():
+    # Every test module starts from empty tables.
+    from app import create_app
+    from app.config import Config
+    from app.extensions import db
+    app = create_app(Config)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app
@@ -0,0 +1,38 @@
+import os
+import unittest
+from app.services.invoice_store import save_invoices
+from tests import make_app
+
+
+class DeleteSplitInvoiceTest(unittest.TestCase):
+    def setUp(self):
+        self.app = make_app()
+        self.client = self.app.test_client()
+        upload_folder = self.app.config['UPLOAD_FOLDER']
+        os.makedirs(upload_folder, exist_ok=True)
+        self.document_path = 'invoices/split.pdf'
+        self.file_path = os.path.join(upload_folder, self.document_path)
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+        with open(self.file_path, 'wb') as f:
+            f.write(b'%PDF-1.4 two invoices')
+        # What the upload of a two-page PDF with one invoice per page saves.
+        with self.app.app_context():
+            self.first, self.second = save_invoices([
+                ({'invoiceNumber': 'SPLIT-1', 'customerName': 'Acme'}, self.document_path),
+                ({'invoiceNumber': 'SPLIT-2', 'customerName': 'Acme'}, self.document_path)
+            ])
+
+    def test_shared_document_survives_until_last_invoice_is_deleted(self):
+        self.assertEqual(self.client.delete(f'/api/invoices/{self.first}').status_code, 200)
+        self.assertTrue(os.path.exists(self.file_path))
+        response = self.client.get(f'/api/files/{self.second}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, b'%PDF-1.4 two invoices')
+        response.close()
+
+        self.assertEqual(self.client.delete(f'/api/invoices/{self.second}').status_code, 200)
+        self.assertFalse(os.path.exists(self.file_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from app.services.invoice_store import save_invoices
+from app.testing import assert_max_queries
+from tests import make_app
+
+
+class InvoiceListQueriesTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = make_app()
+        with cls.app.app_context():
+            save_invoices([
+                ({'invoiceNumber': f'INV-{number}', 'customerName': 'Acme Corp',
+                  'items': [{'productName': 'Steel Bolts'}, {'productName': 'Copper Wire'}]}, None)
+                for number in range(30)
+            ])
+
+    def list_queries(self, serialization, limit):
+        self.app.config['INVOICE_SERIALIZATION'] = serialization
+        client = self.app.test_client()
+        with self.app.app_context():
+            with assert_max_queries(2) as counter:
+                response = client.get(f'/api/invoices?include=items&limit={limit}')
+        self.assertEqual(response.status_code, 200)
+        invoices = response.get_json()['invoices']
+        self.assertEqual(len(invoices), limit)
+        self.assertTrue(all(len(invoice['items']) == 2 for invoice in invoices))
+        return counter.count
+
+    def test_rows_query_count_does_not_grow_with_page_size(self):
+        self.assertEqual(self.list_queries('rows', 5), self.list_queries('rows', 25))
+
+    def test_orm_query_count_does_not_grow_with_page_size(self):
+        self.assertEqual(self.list_queries('orm', 5), self.list_queries('orm', 25))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+from app.services.invoice_search import search_invoices
+from app.services.invoice_store import save_invoices
+from tests import make_app
+
+
+class SqliteInvoiceSearchTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = make_app()
+        with cls.app.app_context():
+            cls.acme, cls.other = save_invoices([
+                ({'invoiceNumber': 'INV-100', 'customerName': 'Acme Corp',
+                  'items': [{'productName': 'Steel Bolts'}]}, None),
+                ({'invoiceNumber': 'INV-200', 'customerName': 'Globex',
+                  'items': [{'productName': 'Copper Wire'}]}, None)
+            ])
+
+    def search(self, query):
+        with self.app.app_context():
+            return [sales_order_id for sales_order_id, _ in search_invoices(query, limit=10)]
+
+    def test_every_token_must_match(self):
+        self.assertEqual(self.search('acme bolts'), [self.acme])
+        self.assertEqual(self.search('acme wire'), [])
+
+    def test_overlapping_tokens_match_the_same_term(self):
+        # "acm" is a prefix and "acmee" a typo of "acme"; all three are
+        # satisfied by the single indexed term.
+        self.assertEqual(self.search('acme acm'), [self.acme])
+        self.assertEqual(self.search('acmee acme'), [self.acme])
+
+    def test_prefix_and_typo(self):
+        self.assertEqual(self.search('glob'), [self.other])
+        self.assertEqual(self.search('coppr'), [self.other])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import io
+import unittest
+from pypdf import PdfWriter
+from tests import make_app
+
+
+def blank_pdf(page_count: int) -> bytes:
+    writer = PdfWriter()
+    for _ in range(page_count):
+        writer.add_blank_page(width=200, height=200)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+class PdfTruncationTest(unittest.TestCase):
+    def setUp(self):
+        self.app = make_app()
+        self.app.config.update(EXTRACTION_BACKEND='fake', PDF_MAX_PAGES=2, FAKE_EXTRACTION_LATENCY_MS=0)
+        self.client = self.app.test_client()
+
+    def upload(self, page_count: int):
+        return self.client.post('/api/upload', data={
+            'file': (io.BytesIO(blank_pdf(page_count)), 'invoice.pdf')
+        })
+
+    def test_pages_past_the_limit_are_reported(self):
+        response = self.upload(3)
+        self.assertEqual(response.status_code, 200, response.get_json())
+        self.assertEqual(response.get_json()['truncatedPages'], 1)
+
+    def test_pdf_within_the_limit_is_not_truncated(self):
+        response = self.upload(2)
+        self.assertEqual(response.status_code, 200, response.get_json())
+        self.assertEqual(response.get_json()['truncatedPages'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()